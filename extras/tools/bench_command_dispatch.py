@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Shell command-dispatch benchmark — measures how long a session waits for a
+fast command while other sessions in the same SSH server process are waiting
+on slow ones.
+
+No SSH server or Celery worker is needed: ``parse_command.delay`` is replaced
+by a simulated worker pool whose tasks just sleep for a fixed latency, so the
+numbers isolate ``MooPrompt.handle_command`` and how it waits for results.
+Use ``ssh_soak_test.py --measure`` for the same question against a real
+server and real workers.
+
+Usage:
+    uv run python extras/tools/bench_command_dispatch.py --sessions 40 --slow 8
+
+Reports the latency of the fast sessions' commands, which ideally stays close
+to ``--fast-latency`` however many slow commands are in flight.
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from bench_common import report, setup_django
+
+
+class SimulatedResult:
+    """
+    The parts of ``AsyncResult`` the shell uses, backed by a future.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, future):
+        self.id = f"simulated-{next(self._ids)}"
+        self._future = future
+
+    def ready(self):
+        return self._future.done()
+
+    def maybe_throw(self, propagate=True):  # pylint: disable=unused-argument
+        return self._future.result()
+
+    def get(self, timeout=None, propagate=True):  # pylint: disable=unused-argument
+        return self._future.result(timeout)
+
+
+def simulated_delay(pool, args, inbox):
+    """
+    Return a stand-in for ``parse_command.delay`` that sends each task's done
+    notice to `inbox`, as the worker's ``task_postrun`` handler would.
+    """
+
+    def run(latency):
+        time.sleep(latency)
+        return [], 0, []
+
+    def delay(caller_pk, line):  # pylint: disable=unused-argument
+        latency = args.slow_latency if line == "slow" else args.fast_latency
+        result = SimulatedResult(pool.submit(run, latency))
+        result._future.add_done_callback(lambda _: inbox.finish(result.id))  # pylint: disable=protected-access
+        return result
+
+    return delay
+
+
+async def run_sessions(user, args, pool):
+    from moo.core import tasks
+    from moo.shell.messages import SessionInbox
+    from moo.shell.prompt import MooPrompt
+
+    samples = []
+    done = asyncio.Event()
+    # Every session shares one inbox; each waits only for its own task's notice.
+    inbox = SessionInbox(user.pk, asyncio.get_running_loop())
+
+    def session():
+        prompt = MooPrompt(user)
+        prompt._session_inbox = inbox  # pylint: disable=protected-access
+        return prompt
+
+    async def fast_session():
+        prompt = session()
+        for _ in range(args.commands):
+            start = time.perf_counter()
+            await prompt.handle_command("fast")
+            samples.append(time.perf_counter() - start)
+
+    async def slow_session():
+        prompt = session()
+        while not done.is_set():
+            await prompt.handle_command("slow")
+
+    with patch.object(tasks.parse_command, "delay", simulated_delay(pool, args, inbox)):
+        slow = [asyncio.create_task(slow_session()) for _ in range(args.slow)]
+        # Let the slow commands get in flight first.
+        await asyncio.sleep(0.05)
+        await asyncio.gather(*(fast_session() for _ in range(args.sessions - args.slow)))
+        done.set()
+        await asyncio.gather(*slow)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40, help="concurrent sessions in total")
+    parser.add_argument("--slow", type=int, default=8, help="sessions that only run slow commands")
+    parser.add_argument("--commands", type=int, default=10, help="commands per fast session")
+    parser.add_argument("--fast-latency", type=float, default=0.01)
+    parser.add_argument("--slow-latency", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=64, help="simulated Celery worker concurrency")
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from django.contrib.auth import get_user_model
+
+        user = get_user_model().objects.get(username="wizard")
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            start = time.perf_counter()
+            samples = asyncio.run(run_sessions(user, args, pool))
+            elapsed = time.perf_counter() - start
+        print(
+            f"{args.sessions - args.slow} fast sessions ({args.fast_latency * 1000:.0f}ms tasks) alongside "
+            f"{args.slow} slow sessions ({args.slow_latency * 1000:.0f}ms tasks), {elapsed:.1f}s total"
+        )
+        report("fast command latency", samples)
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Shared setup for the ``bench_*.py`` scripts in this directory.
+
+Each benchmark runs against a throwaway database created from the test
+settings (``moo.settings.test``, in-memory SQLite unless overridden), so it
+never touches a real world. Point ``DJANGO_SETTINGS_MODULE`` at another
+settings module to benchmark against PostgreSQL.
+"""
+
+import contextlib
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+def setup_django():
+    """
+    Configure Django and create a fresh test database.
+
+    :returns: a callable that destroys the database again
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "moo.settings.test")
+    import django
+
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    from moo.celery import app
+
+    # Same as the test suite: run invoked verbs inline instead of via a broker.
+    app.conf.update(broker_url="memory://", task_always_eager=True, task_store_eager_result=True)
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    return lambda: connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextlib.contextmanager
+def count_queries():
+    """
+    Yield a list that is filled with the executed queries once the block exits.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    captured = []
+    # The query log is a bounded deque; start from empty so long runs never
+    # overflow it mid-block and miscount.
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        yield captured
+    captured.extend(ctx.captured_queries)
+
+
+def report(label, samples):
+    """
+    Print min / median / max of `samples` (seconds) in milliseconds.
+    """
+    samples = sorted(samples)
+    print(
+        f"{label}: n={len(samples)} "
+        f"min={samples[0] * 1000:.2f}ms "
+        f"median={statistics.median(samples) * 1000:.2f}ms "
+        f"max={samples[-1] * 1000:.2f}ms"
+    )
+
+
+def timed(fn, repeat=5):
+    """
+    Run `fn` `repeat` times and return the wall-clock duration of each run.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+End-to-end command latency benchmark — times ``look`` through
+``MooPrompt.handle_command`` with commands run by Celery and with commands
+run in the SSH server process (``MOO_LOCAL_COMMANDS``).
+
+By default the Celery mode runs eagerly against the throwaway test database,
+which is a lower bound: it measures everything except the broker and
+result-backend round trips. Pass ``--broker`` and ``--backend`` to send the
+Celery mode through a real broker instead; a worker must then be consuming
+from it against the same database (``DJANGO_SETTINGS_MODULE`` pointing at a
+real world).
+
+Usage:
+    uv run python extras/tools/bench_look_latency.py --repeat 200
+    uv run python extras/tools/bench_look_latency.py --broker redis://localhost:6379/0 \\
+        --backend redis://localhost:6379/0
+"""
+
+import argparse
+import asyncio
+import time
+
+from bench_common import report, setup_django
+
+
+async def time_commands(prompt, line, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await prompt.handle_command(line)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--command", default="look")
+    parser.add_argument("--mode", choices=["celery", "local", "both"], default="both")
+    parser.add_argument("--broker", help="send the celery mode through this broker instead of running eagerly")
+    parser.add_argument("--backend", help="result backend to use with --broker")
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from django.conf import settings
+        from django.contrib.auth import get_user_model
+
+        from moo.celery import app
+        from moo.shell.prompt import MooPrompt
+
+        if args.broker:
+            app.conf.update(broker_url=args.broker, result_backend=args.backend, task_always_eager=False)
+        user = get_user_model().objects.get(username="wizard")
+        modes = ["celery", "local"] if args.mode == "both" else [args.mode]
+        for mode in modes:
+            settings.MOO_LOCAL_COMMANDS = mode == "local"
+            prompt = MooPrompt(user)
+            # Warm the verb caches so both modes are timed in the steady state.
+            asyncio.run(time_commands(prompt, args.command, 5))
+            samples = asyncio.run(time_commands(prompt, args.command, args.repeat))
+            label = "celery (eager)" if mode == "celery" and not args.broker else mode
+            report(f"{args.command!r} via {label}", samples)
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Reparenting benchmark — measures the cost of ``parents.add()`` /
+``parents.remove()`` on an object with a large subtree, i.e. AncestorCache
+maintenance.
+
+Builds a class hierarchy rooted at ``root`` with ``--descendants`` objects
+below it (``--fanout`` children per node), then repeatedly attaches and
+detaches an extra parent (itself with a short ancestor chain) to ``root``.
+Every object in the subtree gains or loses those ancestors, so this is the
+worst case for the ancestor cache. The fixture is written with
+``bulk_create`` so only the measured operations go through the model layer.
+
+Usage:
+    uv run python extras/tools/bench_reparent.py --descendants 10000
+
+Reports per-operation wall time, SQL statement count and AncestorCache rows
+touched.
+"""
+
+import argparse
+import time
+
+from bench_common import count_queries, report, setup_django
+
+
+def build_tree(descendants, fanout, chain):
+    from moo.core.managers import get_default_site
+    from moo.core.models.object import AncestorCache, Object, Relationship, _rebuild_ancestor_cache_for
+
+    site = get_default_site()
+
+    def make(name):
+        return Object(name=name, site=site, _initialized=True)
+
+    root = Object.objects.bulk_create([make("root")])[0]
+    nodes = Object.objects.bulk_create([make(f"node {i}") for i in range(descendants)])
+    # Breadth-first: node i's parent is root for the first `fanout`, else nodes[i // fanout - 1].
+    parents_of = [root.pk if i < fanout else nodes[i // fanout - 1].pk for i in range(descendants)]
+    Relationship.objects.bulk_create(
+        [Relationship(child_id=n.pk, parent_id=p, weight=0) for n, p in zip(nodes, parents_of)]
+    )
+    # Seed the subtree's rows directly: ancestors of node i are its parent's plus the parent.
+    ancestors = {root.pk: []}
+    rows = []
+    for node, parent in zip(nodes, parents_of):
+        chain_rows = [(parent, 1)] + [(a, d + 1) for a, d in ancestors[parent]]
+        ancestors[node.pk] = chain_rows
+        rows.extend(AncestorCache(descendant_id=node.pk, ancestor_id=a, depth=d, path_weight=0) for a, d in chain_rows)
+    AncestorCache.objects.bulk_create(rows, batch_size=5000)
+
+    # An extra parent with its own `chain`-long ancestor chain.
+    extra = Object.objects.bulk_create([make(f"extra {i}") for i in range(chain)])
+    for child, parent in zip(extra, extra[1:]):
+        Relationship.objects.create(child_id=child.pk, parent_id=parent.pk)
+        _rebuild_ancestor_cache_for(child)
+    return Object.objects.get(pk=root.pk), Object.objects.get(pk=extra[0].pk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--descendants", type=int, default=10_000)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--chain", type=int, default=3, help="ancestor chain length of the attached parent")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from django.db import transaction
+
+        from moo.core.models.object import AncestorCache
+
+        root, extra = build_tree(args.descendants, args.fanout, args.chain)
+        print(f"Subtree: {args.descendants} descendants, fanout {args.fanout}; attached parent chain: {args.chain}")
+        print(f"AncestorCache rows before: {AncestorCache.objects.count()}")
+
+        add_samples, remove_samples = [], []
+        for _ in range(args.repeat):
+            with count_queries() as add_queries:
+                start = time.perf_counter()
+                with transaction.atomic():
+                    root.parents.add(extra)
+                add_samples.append(time.perf_counter() - start)
+            rows_with_extra = AncestorCache.objects.count()
+            with count_queries() as remove_queries:
+                start = time.perf_counter()
+                with transaction.atomic():
+                    root.parents.remove(extra)
+                remove_samples.append(time.perf_counter() - start)
+
+        report("parents.add()", add_samples)
+        print(f"  statements: {len(add_queries)}, rows after: {rows_with_extra}")
+        report("parents.remove()", remove_samples)
+        print(f"  statements: {len(remove_queries)}, rows after: {AncestorCache.objects.count()}")
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
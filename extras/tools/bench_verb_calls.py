@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Verb-call overhead benchmark — measures the fixed cost of calling a verb
+from another verb, independent of what the verb does.
+
+A chain of ``--depth`` trivial verbs is installed on one object, each
+calling the next (``return this.hop_3()`` and so on). One run of the chain
+therefore makes ``--depth`` nested ``Verb.__call__`` invocations, each of
+which compiles (LRU hit), builds a sandbox environment and executes.
+
+Usage:
+    uv run python extras/tools/bench_verb_calls.py --depth 20 --repeat 50
+
+Reports the wall time per chain and per nested call, plus the cost of
+``get_restricted_environment()`` on its own.
+"""
+
+import argparse
+
+from bench_common import report, setup_django, timed
+
+
+def install_chain(wizard, depth):
+    from moo.sdk import create
+
+    obj = create("verb call bench", location=None)
+    obj.add_verb("hop_0", code="return 0")
+    for i in range(1, depth):
+        obj.add_verb(f"hop_{i}", code=f"return this.hop_{i - 1}() + 1")
+    return obj, f"hop_{depth - 1}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from moo.core import code
+        from moo.core.models import Object
+
+        wizard = Object.objects.get(name="Wizard")
+        with code.ContextManager(wizard, lambda _: None):
+            obj, top = install_chain(wizard, args.depth)
+            verb = obj.get_verb(top)
+            assert verb() == args.depth - 1
+            samples = timed(verb, repeat=args.repeat)
+        report(f"chain of {args.depth} verbs", samples)
+        report("  per nested call", [s / args.depth for s in samples])
+
+        def writer(_):
+            pass
+
+        batch = 1000
+        env_samples = timed(
+            lambda: [code.get_restricted_environment("bench", writer) for _ in range(batch)], repeat=args.repeat
+        )
+        report("get_restricted_environment()", [s / batch for s in env_samples])
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Verb dispatch benchmark — times ``Parser.get_verb()`` for one command with the
+process-local dispatch index disabled and enabled (``MOO_VERB_INDEX_SIZE``).
+
+Each sample runs in a fresh ``ContextManager`` session, as a command does, so
+the per-session verb and generation memos start empty every time. Parsing is
+done outside the timed section; only the dispatch is measured.
+
+Usage:
+    uv run python extras/tools/bench_verb_dispatch.py --command "look" --repeat 200
+"""
+
+import argparse
+import time
+
+from bench_common import count_queries, report, setup_django
+
+
+def dispatch_samples(caller, line, repeat):
+    from moo.core import code, parse
+
+    samples = []
+    queries = 0
+    for _ in range(repeat):
+        with code.ContextManager(caller, lambda _: None):
+            parser = parse.Parser(parse.Lexer(line), caller)
+            list(parser.scope.inventory)
+            with count_queries() as captured:
+                start = time.perf_counter()
+                parser.get_verb()
+                samples.append(time.perf_counter() - start)
+            queries += len(captured)
+    return samples, queries / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--command", default="look")
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from django.conf import settings
+
+        from moo.core.models import Object
+
+        wizard = Object.objects.get(name="Wizard")
+        for size in (0, 2048):
+            settings.MOO_VERB_INDEX_SIZE = size
+            # Warm the index (and the compiled-verb caches) first.
+            dispatch_samples(wizard, args.command, 5)
+            samples, queries = dispatch_samples(wizard, args.command, args.repeat)
+            label = "index" if size else "database"
+            report(f"{args.command!r} dispatch via {label} ({queries:.1f} queries)", samples)
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+World-creation benchmark — measures the cost of ``create()`` for objects that
+inherit properties from ``$thing``, with and without implicit default ACLs
+(``MOO_IMPLICIT_DEFAULT_ACLS``).
+
+Every created Object, and every Property copied onto it from its parents,
+gets the default ACL policy. In explicit mode that is three ``Access`` rows
+each; in implicit mode it is a flag on the entity.
+
+Usage:
+    uv run python extras/tools/bench_world_create.py --objects 500
+
+Reports per-object wall time and SQL statement count, and the ``Access`` rows
+added, for each mode.
+"""
+
+import argparse
+import time
+
+from bench_common import count_queries, report, setup_django
+
+
+def create_batch(wizard, parent, count, prefix):
+    from moo.core import code
+    from moo.sdk import create
+
+    samples, statements = [], 0
+    with code.ContextManager(wizard, lambda _: None):
+        for i in range(count):
+            with count_queries() as queries:
+                start = time.perf_counter()
+                create(f"{prefix} {i}", parents=[parent])
+                samples.append(time.perf_counter() - start)
+            statements += len(queries)
+    return samples, statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=500)
+    args = parser.parse_args()
+
+    teardown = setup_django()
+    try:
+        from django.conf import settings
+
+        from moo.core.models import Access, Object
+
+        wizard = Object.objects.get(name="Wizard")
+        thing = Object.objects.get(name="Generic Thing")
+        print(f"Creating {args.objects} children of {thing} ({thing.properties.count()} properties each)")
+
+        for implicit in (False, True):
+            settings.MOO_IMPLICIT_DEFAULT_ACLS = implicit
+            label = "implicit" if implicit else "explicit"
+            before = Access.objects.count()
+            start = time.perf_counter()
+            samples, statements = create_batch(wizard, thing, args.objects, label)
+            elapsed = time.perf_counter() - start
+            report(f"create() [{label}]", samples)
+            print(
+                f"  {args.objects / elapsed:.1f} objects/s, "
+                f"{statements / args.objects:.1f} statements/object, "
+                f"{Access.objects.count() - before} Access rows added"
+            )
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
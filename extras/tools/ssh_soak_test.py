@@ -13,35 +13,75 @@ The script does not implement an IAC parser — server-emitted IAC handshake
 bytes flow into stdout as garbage characters. Sufficient for soak testing
 the connection lifecycle, but not for parsing command output.
 
+With ``--measure``, each agent instead reads its output and times every
+command from the newline to the next prompt. ``--slow-agents`` of the agents
+send ``--slow-command`` instead, so the summary shows whether slow verbs in
+some sessions hold up the prompt in the others.
+
 Usage:
     uv run python extras/tools/ssh_soak_test.py \
         --host localhost --port 8022 \
         --user <username> --password <password> \
         --agents 6
 
+    uv run python extras/tools/ssh_soak_test.py ... --agents 50 --measure \
+        --interval 0.5 --duration 60 --slow-agents 5 \
+        --slow-command '@eval sum(range(3000000))'
+
 Ctrl-C to stop; prints a summary on exit.
 """
 
 import argparse
 import asyncio
 import datetime
+import statistics
 import sys
 
 import asyncssh
 
 
-SEND_INTERVAL = 5.0  # seconds between commands
+SEND_INTERVAL = 5.0  # default seconds between commands
 RECONNECT_DELAY = 2.0  # seconds to wait before reconnecting after a drop
+PROMPT_MARKER = b">>> "  # the shell's prompt, see MooPrompt.generate_prompt()
+COMMAND_TIMEOUT = 60.0  # give up waiting for a prompt after this long
 
 _stats: dict[int, dict] = {}
 
 
+async def _read_until_prompt(proc) -> None:
+    buf = b""
+    while PROMPT_MARKER not in buf:
+        chunk = await proc.stdout.read(4096)
+        if not chunk:
+            raise asyncssh.ConnectionLost("channel closed while waiting for the prompt")
+        # Keep only a tail long enough to hold a marker split across reads.
+        buf = buf[-len(PROMPT_MARKER) :] + chunk
+
+
+async def _timed_command(proc, command: str) -> float:
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    proc.stdin.write((command + "\n").encode())
+    await asyncio.wait_for(_read_until_prompt(proc), timeout=COMMAND_TIMEOUT)
+    return loop.time() - start
+
+
 def _ts() -> str:
     return datetime.datetime.now().strftime("%H:%M:%S")
 
 
-async def run_agent(agent_id: int, host: str, port: int, user: str, password: str, stop: asyncio.Event) -> None:
-    stats = _stats[agent_id] = {"connects": 0, "drops": 0, "last_drop": None}
+async def run_agent(
+    agent_id: int,
+    host: str,
+    port: int,
+    user: str,
+    password: str,
+    stop: asyncio.Event,
+    command: str = "look",
+    interval: float = SEND_INTERVAL,
+    measure: bool = False,
+) -> None:
+    stats = _stats[agent_id] = {"connects": 0, "drops": 0, "last_drop": None, "command": command, "latencies": []}
 
     while not stop.is_set():
         try:
@@ -56,11 +96,21 @@ async def run_agent(agent_id: int, host: str, port: int, user: str, password: st
             ) as conn:
                 stats["connects"] += 1
                 print(f"[{_ts()}] agent-{agent_id} connected (total connects: {stats['connects']})")
-                async with conn.create_process(request_pty=True, term_type="xterm-256-basic") as proc:
+                # Bytes, not text: the IAC handshake is not valid UTF-8.
+                async with conn.create_process(request_pty=True, term_type="xterm-256-basic", encoding=None) as proc:
+                    if measure:
+                        await asyncio.wait_for(_read_until_prompt(proc), timeout=COMMAND_TIMEOUT)
                     while not stop.is_set():
                         try:
-                            proc.stdin.write("look\n")
-                            await asyncio.sleep(SEND_INTERVAL)
+                            if measure:
+                                stats["latencies"].append(await _timed_command(proc, command))
+                            else:
+                                proc.stdin.write((command + "\n").encode())
+                            await asyncio.sleep(interval)
+                        # TimeoutError is an OSError, so it has to be caught first.
+                        except TimeoutError:
+                            print(f"[{_ts()}] agent-{agent_id} no prompt after {COMMAND_TIMEOUT}s")
+                            break
                         except (asyncssh.DisconnectError, asyncssh.ConnectionLost, BrokenPipeError, OSError):
                             break
         except asyncssh.ConnectionLost as e:
@@ -89,6 +139,12 @@ async def main() -> None:
     parser.add_argument("--user", required=True)
     parser.add_argument("--password", required=True)
     parser.add_argument("--agents", type=int, default=6)
+    parser.add_argument("--command", default="look", help="command each agent sends")
+    parser.add_argument("--interval", type=float, default=SEND_INTERVAL, help="seconds between commands")
+    parser.add_argument("--measure", action="store_true", help="time each command until the next prompt")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--slow-agents", type=int, default=0, help="agents that send --slow-command instead")
+    parser.add_argument("--slow-command", default="@eval sum(range(3000000))")
     args = parser.parse_args()
 
     print(f"Starting {args.agents} agent(s) → {args.host}:{args.port} as '{args.user}'")
@@ -96,9 +152,23 @@ async def main() -> None:
 
     stop = asyncio.Event()
     tasks = [
-        asyncio.create_task(run_agent(i, args.host, args.port, args.user, args.password, stop))
+        asyncio.create_task(
+            run_agent(
+                i,
+                args.host,
+                args.port,
+                args.user,
+                args.password,
+                stop,
+                command=args.slow_command if i < args.slow_agents else args.command,
+                interval=args.interval,
+                measure=args.measure,
+            )
+        )
         for i in range(args.agents)
     ]
+    if args.duration is not None:
+        asyncio.get_running_loop().call_later(args.duration, stop.set)
 
     try:
         await asyncio.gather(*tasks)
@@ -116,6 +186,26 @@ async def main() -> None:
         print(
             f"  agent-{i}: connects={s.get('connects', 0)}  drops={s.get('drops', 0)}  last_drop={s.get('last_drop')}"
         )
+    if args.measure:
+        _print_latencies()
+
+
+def _print_latencies() -> None:
+    by_command: dict[str, list[float]] = {}
+    for s in _stats.values():
+        by_command.setdefault(s["command"], []).extend(s["latencies"])
+    print("\n--- Command latency (newline to next prompt) ---")
+    for command, samples in by_command.items():
+        if not samples:
+            print(f"  {command!r}: no completed commands")
+            continue
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        print(
+            f"  {command!r}: n={len(samples)} "
+            f"median={statistics.median(samples) * 1000:.1f}ms "
+            f"p95={p95 * 1000:.1f}ms max={samples[-1] * 1000:.1f}ms"
+        )
 
 
 if __name__ == "__main__":
@@ -293,12 +293,12 @@ def load_verbs(repo, verb_package, replace=False):
     :param replace: If ``True``, update existing verbs in place rather than skipping them.
     :type replace: bool
     """
-    from moo.core.models.object import Object
+    from moo.core import system_object
 
     if replace:
         _remove_stale_repo_verbs(repo)
 
-    system = Object.objects.get(unique_name=True, name="System Object")
+    system = system_object.get_system()
 
     def _iterate_file_paths(ref):
         if ref.is_dir():
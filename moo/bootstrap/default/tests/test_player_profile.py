@@ -1,5 +1,5 @@
 # pylint: disable=protected-access
-import datetime
+import time
 from unittest.mock import patch
 
 import pytest
@@ -37,14 +37,33 @@ def test_look_self_shows_sleeping(t_init: Object, t_wizard: Object):
     assert any("sleeping" in line for line in printed)
 
 
+@pytest.fixture
+def join_session():
+    """Register presence sessions for avatars, dropping them afterwards."""
+    from django.core.cache import cache
+    from moo.core import presence
+
+    tokens = []
+
+    def join(avatar, seconds_ago=0):
+        with patch("moo.core.presence.time.time", return_value=time.time() - seconds_ago):
+            tokens.append(presence.join(avatar.pk, avatar.site_id))
+        # The server's heartbeat keeps an idle session live.
+        presence.beat()
+
+    yield join
+    for token in tokens:
+        presence.leave(token)
+    cache.clear()
+
+
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
 @pytest.mark.parametrize("t_init", ["default"], indirect=True)
-def test_look_self_shows_alert(t_init: Object, t_wizard: Object):
+def test_look_self_shows_alert(t_init: Object, t_wizard: Object, join_session):
     """look_self() on a recently active player prints an alert status message."""
-    now = datetime.datetime.now(datetime.timezone.utc)
+    join_session(t_wizard)
     printed = []
     with code.ContextManager(t_wizard, printed.append):
-        t_wizard.set_property("last_connected_time", now)
         t_wizard.look_self()
     # Pronoun agreement: "looks" for he/she/it, "look" for they.
     assert any("awake and look" in line and "alert" in line for line in printed)
@@ -52,12 +71,11 @@ def test_look_self_shows_alert(t_init: Object, t_wizard: Object):
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
 @pytest.mark.parametrize("t_init", ["default"], indirect=True)
-def test_look_self_shows_idle(t_init: Object, t_wizard: Object):
+def test_look_self_shows_idle(t_init: Object, t_wizard: Object, join_session):
     """look_self() on an idle connected player prints a staring-off message."""
-    two_minutes_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=2)
+    join_session(t_wizard, seconds_ago=120)
     printed = []
     with code.ContextManager(t_wizard, printed.append):
-        t_wizard.set_property("last_connected_time", two_minutes_ago)
         t_wizard.look_self()
     assert any("staring off into space" in line for line in printed)
 
@@ -161,20 +179,16 @@ def test_password_entry_emits_input_prompt(t_init, t_wizard):
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
 @pytest.mark.parametrize("t_init", ["default"], indirect=True)
-def test_password_entry_records_event_in_cache(t_init, t_wizard):
-    """parse_command records ``input_prompt`` in the cache so the shell can skip the prompt race."""
+def test_password_entry_returns_input_prompt_event(t_init, t_wizard):
+    """parse_command reports ``input_prompt`` in its result so the shell can skip the prompt race."""
     import warnings
-    from django.core.cache import cache
     from moo.core import tasks
 
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", RuntimeWarning)
         result = tasks.parse_command.apply(args=[t_wizard.pk, "@password"])
-    try:
-        events = cache.get(f"moo:task_events:{result.id}")
-        assert events == ["input_prompt"]
-    finally:
-        cache.delete(f"moo:task_events:{result.id}")
+    _output, _exit_status, events = result.get()
+    assert events == ["input_prompt"]
 
 
 # --- confunc / disfunc ---
@@ -334,21 +348,19 @@ def test_who_no_connected_players(t_init: Object, t_wizard: Object):
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
 @pytest.mark.parametrize("t_init", ["default"], indirect=True)
-def test_connected_players_dedupes_shared_avatar(t_init: Object, t_wizard: Object):
-    """An avatar referenced by multiple Player records should appear once.
-    Player.avatar is a ForeignKey, so the JOIN in connected_players() can
-    produce duplicate rows; the function must dedupe by origin."""
+def test_connected_players_dedupes_shared_avatar(t_init: Object, t_wizard: Object, join_session):
+    """An avatar with several live sessions (e.g. one SSH and one webssh
+    connection, possibly through different Player records) should appear once."""
     from django.contrib.auth import get_user_model
     from moo.core.models.auth import Player
     from moo.sdk import connected_players
 
-    now = datetime.datetime.now(datetime.timezone.utc)
     with code.ContextManager(t_wizard, lambda _: None):
-        t_wizard.set_property("last_connected_time", now)
-        # Add a second Player row pointing at the same avatar — simulates the
-        # multi-Player-per-avatar state that produces the duplicate @who rows.
+        # A second Player row pointing at the same avatar, with its own session.
         extra_user = get_user_model().objects.create_user(username="ghost-session", password="x")
         Player.objects.create(user=extra_user, avatar=t_wizard)
+        join_session(t_wizard)
+        join_session(t_wizard)
         result = connected_players()
     pks = [p.pk for p in result]
     assert pks.count(t_wizard.pk) == 1, f"avatar {t_wizard.pk} appeared multiple times: {pks}"
@@ -4,8 +4,8 @@
 
 """
 Override the `$root_class` definition to provide an indication to other players of whether this player is
-currently active or not. It uses `passthrough()` to allow the parent class to print a description, and then looks at
-the `connected_players()` list to determine if this player is currently connected. If not, then the text
+currently active or not. It uses `passthrough()` to allow the parent class to print a description, and then asks
+`idle_seconds()` how long ago this player last sent a command. If the player is not connected, then the text
 
     He is sleeping
 
@@ -23,22 +23,20 @@ from the pronoun list for the player. This means it can vary with the gender of
 If the player is carrying any objects, a simple list of these is printed.
 """
 
-import datetime
-from moo.sdk import connected_players
+from moo.sdk import idle_seconds
 
 passthrough()
 
-now = datetime.datetime.now(datetime.timezone.utc)
-
 pronoun = this.psc
 is_plural = this.ps == "they"
 to_be = "are" if is_plural else "is"
 to_have = "have" if is_plural else "has"
 look_v = "look" if is_plural else "looks"
-if this not in connected_players():
+idle_time = idle_seconds(this)
+if idle_time is None:
     print(f"{pronoun} {to_be} sleeping.")
 else:
-    idle_time = (now - this.get_property("last_connected_time", recurse=False)).total_seconds()
+    idle_time = int(idle_time)
     if idle_time < 60:
         print(f"{pronoun} {to_be} awake and {look_v} alert.")
     else:
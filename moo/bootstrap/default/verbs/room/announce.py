@@ -8,8 +8,6 @@ it. This is intended to be the way other verbs pass messages to objects in a roo
 activated, it uses `announce` to inform the other players in the room of what has happened.
 """
 
-from moo.sdk import context
+from moo.sdk import broadcast, context
 
-for obj in this.contents.all():
-    if obj != context.player:
-        obj.tell(" ".join(args))
+broadcast(this.contents.all(), " ".join(args), exclude=context.player)
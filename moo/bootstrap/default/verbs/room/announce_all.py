@@ -7,6 +7,6 @@ Send a message to every object in the room. It is used for messages
 that we wish everyone to see, with no exceptions.
 """
 
-messages = args
-for obj in this.contents.all():
-    obj.tell(" ".join(messages))
+from moo.sdk import broadcast
+
+broadcast(this.contents.all(), " ".join(args))
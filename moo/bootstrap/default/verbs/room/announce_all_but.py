@@ -11,6 +11,8 @@ on themselves from recursing, using something like
 place.announce_all_but(this, "message");
 """
 
+from moo.sdk import broadcast
+
 skip, *messages = args
 # If the caller pre-fetched room contents and passed them as the last arg,
 # use them directly to avoid a redundant contents.all() query.
@@ -18,6 +20,4 @@ if messages and isinstance(messages[-1], list):
     contents = messages.pop()
 else:
     contents = this.contents.all()
-for obj in contents:
-    if obj != skip:
-        obj.tell(" ".join(messages))
+broadcast(contents, " ".join(messages), exclude=skip)
@@ -7,7 +7,7 @@ Display server version and memory information (wizard only).
 
 Usage:
     @version    — show server version, Python version, and process ID
-    @memory     — show current process memory usage (RSS)
+    @memory     — show current process memory usage (RSS) and attribute cache and verb index counters
 """
 
 from moo.sdk import context, server_info
@@ -22,6 +22,12 @@ if verb_name == "@memory":
         print(f"Memory usage: {info['memory_mb']} MB (RSS)")
     else:
         print("Memory info unavailable on this platform.")
+    for label, key in (("Attribute cache", "attribute_cache"), ("Verb index", "verb_index")):
+        stats = info[key]
+        print(
+            f"{label}: {stats['size']}/{stats['maxsize']} entries, "
+            f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions"
+        )
 else:
     print(f"Version: {info['version']}")
     print(f"Python:  {info['python']}")
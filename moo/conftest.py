@@ -11,7 +11,7 @@ from django.conf import settings
 from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
 
 from moo.bootstrap import load_python
-from moo.core.models import Object, Player, Repository
+from moo.core.models import Object, Player, Repository, auth
 
 log = logging.getLogger(__name__)
 
@@ -29,13 +29,32 @@ def configure_celery_for_tests():
 
 @pytest.fixture(autouse=True)
 def mock_player_connected(monkeypatch):
-    """Patch is_connected to return True for all objects during tests.
+    """Patch is_connected (and its batched form) to report everyone connected.
 
-    In production, is_connected() checks a Redis cache key set by the SSH shell.
-    That key is never set during tests, so without this patch every player avatar
-    appears disconnected and tell() / write() never fires.
+    In production, is_connected() checks the presence registry the SSH shell
+    joins at login. No session joins it during tests, so without this patch
+    every player avatar appears disconnected and tell() / write() never fires.
     """
     monkeypatch.setattr(Object, "is_connected", lambda self: True)
+    monkeypatch.setattr(auth, "connected_avatars", set)
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches():
+    """Start every test with an empty cache backend and process-local caches.
+
+    Both outlive a test, and the primary keys their entries are tagged with
+    are reused once sequences are reset.
+    """
+    from django.core.cache import cache
+
+    from moo.core import _routes, attribute_cache, system_object, verb_index
+
+    cache.clear()
+    for lru in (attribute_cache.local_cache, attribute_cache.ancestries, verb_index.index, _routes):
+        lru.clear()
+    system_object.clear()
+    yield
 
 
 @pytest.fixture(autouse=True)
@@ -57,6 +76,29 @@ def _reset_site_context():
     Site.objects.clear_cache()
 
 
+@pytest.fixture()
+def redis_cache(settings):
+    """Point the default cache at a real Redis server and return its client.
+
+    The server is read from ``MOO_TEST_REDIS_URL`` (database 15 of a local
+    server by default); tests using this fixture are skipped when none
+    answers. The database is shared, so tests must use keys of their own.
+    """
+    import os
+
+    import redis
+
+    url = os.environ.get("MOO_TEST_REDIS_URL", "redis://localhost:6379/15")
+    client = redis.Redis.from_url(url)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip(f"no Redis server at {url}")
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": url}}
+    yield client
+    client.close()
+
+
 @pytest.fixture()
 def t_init(request):
     """
@@ -29,10 +29,12 @@ from moo.sdk import (
     AmbiguousObjectError,
 )
 
+from .attribute_cache import LocalAttributeCache
 from .code import ContextManager
 
 __all__ = [
     "_publish_to_player",
+    "_publish_to_players",
     "_build_envelope",
     "current_provenance",
     "lookup",
@@ -102,6 +104,13 @@ def _build_envelope(message, kind="text"):
     )
 
 
+#: Message header carrying the id of a finished task; see :func:`_publish_task_done`.
+TASK_DONE_HEADER = "moo_task_done"
+
+#: Avatar pk -> the user pks its output is routed to; see :func:`_session_routes`.
+_routes = LocalAttributeCache(size_setting="MOO_SESSION_ROUTE_CACHE_SIZE", default_size=4096)
+
+
 def _publish_to_player(obj, message, kind="text"):
     """
     Publish a message directly to a player's Kombu queue without a permission check.
@@ -112,10 +121,124 @@ def _publish_to_player(obj, message, kind="text"):
     :param kind: structural output tag carried in the envelope (see
         :func:`_build_envelope`)
     """
-    from .models.auth import Player
+    _publish_to_players([obj], message, kind=kind)
+
+
+def _publish_to_players(objs, message, kind="text", routes=None):
+    """
+    Publish one message to several players' Kombu queues without a permission
+    check, building the envelope once and publishing every copy through a
+    single producer. This is the primitive behind :func:`moo.sdk.broadcast`.
+
+    Inside a ContextManager opened with ``coalesce_output=True`` the envelope
+    is handed to its :class:`~moo.core.outbox.Outbox` instead, and published
+    with the rest of the task's output when the transaction commits.
+
+    :param objs: the Objects (player avatars) to write to
+    :param message: any pickle-able object
+    :param kind: structural output tag carried in the envelope (see
+        :func:`_build_envelope`)
+    :param routes: ``{avatar pk: user pks}`` for avatars whose session routes
+        the caller has already read; the rest are looked up with
+        :func:`_session_routes`
+    """
+    objs = [obj for obj in objs if _admit(obj, message)]
+    if not objs:
+        return
+    envelope = _build_envelope(message, kind=kind)
+    outbox = ContextManager.get("outbox")
+    if outbox is not None:
+        outbox.add(objs, envelope, routes=routes)
+        return
+    _publish_envelopes([(obj, [envelope]) for obj in objs], routes=routes)
+
+
+def _publish_envelopes(deliveries, routes=None):
+    """
+    Publish built envelopes, one Kombu message per recipient.
+
+    A single envelope is sent as it is; several are sent as
+    ``{"batch": [envelope, ...]}`` so the client handles them in order.
+
+    :param deliveries: ``(avatar, [envelope, ...])`` pairs
+    :param routes: ``{avatar pk: user pks}`` already known to the caller
+    """
+    from ..celery import app
+
+    if app.conf.broker_url == "memory://":
+        for obj, envelopes in deliveries:
+            for envelope in envelopes:
+                warnings.warn(RuntimeWarning(f"ConnectionError({obj}): {envelope['message']}"))
+        return
+    # Use the producer's own pooled channel for both publishing and queue
+    # declaration. The prior pattern allocated a separate channel via
+    # ``app.default_connection().channel()`` for the Queue/Exchange binding,
+    # but that connection came from a separate pool that could hand back a
+    # stale (transport.connection is None) entry under sustained load —
+    # ``conn.channel()`` then raised ``AttributeError: 'NoneType' object
+    # has no attribute '_used_channel_ids'`` and every page/tell verb that
+    # routed through here failed for the rest of the worker's life.
+    # ``producer.publish(..., retry=True)`` binds the Queue/Exchange to the
+    # producer's channel at publish time and reconnects on transport errors,
+    # so no separate channel allocation is needed.
+    with app.producer_or_acquire() as producer:
+        for obj, envelopes in deliveries:
+            body = envelopes[0] if len(envelopes) == 1 else {"batch": envelopes}
+            user_pks = routes[obj.pk] if routes is not None and obj.pk in routes else _session_routes(obj)
+            for user_pk in user_pks:
+                queue = _session_queue(user_pk)
+                producer.publish(
+                    body,
+                    serializer="moojson",
+                    exchange=queue.exchange,
+                    routing_key=queue.routing_key,
+                    declare=_undeclared(producer, queue),
+                    retry=True,
+                )
+
+
+def _publish_task_done(avatar_pk, task_id):
+    """
+    Tell the sessions of the avatar `avatar_pk` that the task `task_id` has
+    finished and its result is stored.
+
+    The notice is an empty message with the task id in its
+    :data:`TASK_DONE_HEADER` header, sent on the same queues as the avatar's
+    output. The shell's message hub hands it to the command waiting on that
+    task (see :func:`moo.shell.prompt.await_task_result`) rather than to the
+    output stream, so the shell reads the result backend once instead of
+    polling it.
+    """
+    from ..celery import app
+
+    if app.conf.broker_url == "memory://":
+        return
+    with app.producer_or_acquire() as producer:
+        for user_pk in _session_routes(avatar_pk):
+            queue = _session_queue(user_pk)
+            producer.publish(
+                "",
+                serializer="moojson",
+                exchange=queue.exchange,
+                routing_key=queue.routing_key,
+                headers={TASK_DONE_HEADER: task_id},
+                declare=_undeclared(producer, queue),
+                retry=True,
+            )
+
+
+def _session_queue(user_pk):
     from kombu import Exchange, Queue
+
+    return Queue(f"messages.{user_pk}", Exchange("moo", type="direct"), f"user-{user_pk}", auto_delete=True)
+
+
+def _admit(obj, message) -> bool:
+    """
+    Record `message` against the running task and charge it to the sender's
+    flood budget; return ``False`` if it must be dropped.
+    """
     from django.conf import settings
-    from ..celery import app
 
     if isinstance(message, dict) and "event" in message:
         tracked = ContextManager.get("published_events")
@@ -140,39 +263,60 @@ def _publish_to_player(obj, message, kind="text"):
                     getattr(obj, "pk", None),
                     account_id,
                 )
-                return
-    if app.conf.broker_url == "memory://":
-        warnings.warn(RuntimeWarning(f"ConnectionError({obj}): {message}"))
-        return
-    envelope = _build_envelope(message, kind=kind)
-    matching_players = Player.objects.filter(avatar=obj)
-    # Use the producer's own pooled channel for both publishing and queue
-    # declaration. The prior pattern allocated a separate channel via
-    # ``app.default_connection().channel()`` for the Queue/Exchange binding,
-    # but that connection came from a separate pool that could hand back a
-    # stale (transport.connection is None) entry under sustained load —
-    # ``conn.channel()`` then raised ``AttributeError: 'NoneType' object
-    # has no attribute '_used_channel_ids'`` and every page/tell verb that
-    # routed through here failed for the rest of the worker's life.
-    # ``producer.publish(..., declare=[queue], retry=True)`` binds the
-    # Queue/Exchange to the producer's channel at publish time and reconnects
-    # on transport errors, so no separate channel allocation is needed.
-    with app.producer_or_acquire() as producer:
-        for player in matching_players:
-            # this is an uncommon scenario, but applies to the stock Player object if it hasn't been configured for login
-            if not player.user:
-                continue
-            queue = Queue(
-                f"messages.{player.user.pk}",
-                Exchange("moo", type="direct"),
-                f"user-{player.user.pk}",
-                auto_delete=True,
-            )
-            producer.publish(
-                envelope,
-                serializer="moojson",
-                exchange=queue.exchange,
-                routing_key=f"user-{player.user.pk}",
-                declare=[queue],
-                retry=True,
-            )
+                return False
+    return True
+
+
+def _session_routes(obj):
+    """
+    Return the pks of the users whose session queues receive output for the
+    avatar `obj` (an Object or its pk).
+
+    Players without a user (the stock Player object, if it hasn't been
+    configured for login) have no queue and are left out. The answer is kept in
+    :data:`_routes`, tagged with the avatar's attribute generation, which
+    :func:`moo.core.models.auth.player_changed` bumps whenever a Player is bound
+    to or released from it.
+
+    The tag is read from the cache backend rather than trusted to that signal
+    alone, because Players are also bound and released in other processes (the
+    SSH server at account setup, the admin, wizard verbs in another worker), and
+    the signal only runs in the one that made the change. A route kept past a
+    rebinding would send the avatar's output to its previous user. The read is
+    memoized for the rest of the task and is the one the avatar's own verb and
+    property lookups make, so the task's further lines to it cost nothing.
+    """
+    from . import attribute_cache
+    from .models.auth import Player
+
+    pk = obj if isinstance(obj, int) else getattr(obj, "pk", None)
+    if pk is None:
+        return ()
+    cached = attribute_cache.generation(pk) if _routes.maxsize > 0 else None
+    if cached is not None:
+        routes = _routes.get(pk, cached)
+        if routes is not attribute_cache.MISSING:
+            return routes
+    routes = tuple(Player.objects.filter(avatar_id=pk, user__isnull=False).values_list("user_id", flat=True))
+    if cached is not None:
+        _routes.set(pk, cached, routes)
+    return routes
+
+
+def _undeclared(producer, queue):
+    """
+    Return ``[queue]`` the first time `queue` is published to over the
+    producer's connection, and ``[]`` after that.
+
+    Kombu only caches declarations of durable entities, so passing
+    ``declare=[queue]`` for an ``auto_delete`` session queue re-declares it on
+    every message. The names are recorded in the connection's own
+    ``declared_entities`` set, which Kombu clears whenever the connection is
+    closed or re-established, so a reconnected producer declares again.
+    """
+    declared = producer.connection.declared_entities
+    key = f"moo:{queue.name}"
+    if key in declared:
+        return []
+    declared.add(key)
+    return [queue]
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled access control lists.
+
+``Object.is_allowed()`` used to run an ``Access`` query for every check that was
+not already cached as ``True`` for the current session. Instead, the ``Access``
+rows of a subject are compiled once into allow/deny bitmasks, one pair for each
+group plus one pair per explicit accessor, with a bit per ``Permission`` id. A
+check then reduces to a few dict lookups and bitwise ``&``, and denials are as
+cheap as grants.
+
+Compiled ACLs are memoized for the ``ContextManager`` session and, when
+``MOO_ACL_CACHE_TTL`` is positive, shared across processes through the
+configured cache backend. :func:`invalidate` drops both copies; it runs on every
+``Access`` save or delete, on the ``Access`` bulk writes that skip those
+signals, and whenever the subject's owner changes. :func:`flush` drops every
+compiled ACL at once by moving the generation that the shared keys carry.
+
+Subjects created in ``MOO_IMPLICIT_DEFAULT_ACLS`` mode have no rows for the
+default policy; it is folded into their compiled ACL instead.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import utils
+
+#: Bumped by :func:`flush`; part of every cross-process ACL key.
+GENERATION_KEY = "moo:acl:generation"
+#: Cross-process cache key for the compiled ACL of one subject, by generation,
+#: kind and pk.
+ACL_KEY = "moo:acl:{}:{}:{}"
+
+# perm_cache key used to memoize compiled ACLs for one ContextManager session.
+_SESSION_ACLS_KEY = "__compiled_acls__"
+
+# perm_cache key used to memoize the ACL generation for one ContextManager session.
+_SESSION_GENERATION_KEY = "__acl_generation__"
+
+# perm_cache key for the read checks the sandbox attribute guard has already
+# passed in this session; see session_reads().
+_SESSION_READS_KEY = "__read_checks__"
+
+_NO_MASKS = (0, 0)
+
+
+class CompiledACL:
+    """
+    The ``Access`` rows of one Object, Verb or Property, resolved into
+    ``(allow, deny)`` bitmask pairs.
+    """
+
+    __slots__ = ("groups", "accessors")
+
+    def __init__(self, groups=None, accessors=None):
+        #: ``{"everyone" | "owners" | "wizards": (allow_mask, deny_mask)}``
+        self.groups = groups or {}
+        #: ``{accessor_pk: (allow_mask, deny_mask)}``
+        self.accessors = accessors or {}
+
+    @classmethod
+    def from_rules(cls, rules):
+        """
+        Build a compiled ACL from ``(rule, permission_id, type, accessor_id, group)``
+        tuples.
+        """
+        compiled = cls()
+        for rule, permission_id, kind, accessor_id, group in rules:
+            if kind == "accessor":
+                table, key = compiled.accessors, accessor_id
+            else:
+                table, key = compiled.groups, group
+            allow, deny = table.get(key, _NO_MASKS)
+            if rule == "deny":
+                deny |= 1 << permission_id
+            else:
+                allow |= 1 << permission_id
+            table[key] = (allow, deny)
+        return compiled
+
+    def decide(self, mask: int, accessor_pk, owner: bool, wizard: bool) -> bool:
+        """
+        Return whether `accessor_pk` holds any permission bit in `mask`.
+
+        A matching deny rule always wins over a matching allow rule, and no
+        matching rule at all is a denial, as in the uncompiled query.
+        """
+        allow, deny = self.accessors.get(accessor_pk, _NO_MASKS)
+        groups = self.groups
+        applicable = [groups.get("everyone", _NO_MASKS)]
+        if owner:
+            applicable.append(groups.get("owners", _NO_MASKS))
+        if wizard:
+            applicable.append(groups.get("wizards", _NO_MASKS))
+        for group_allow, group_deny in applicable:
+            allow |= group_allow
+            deny |= group_deny
+        if deny & mask:
+            return False
+        return bool(allow & mask)
+
+
+def _ttl() -> int:
+    return getattr(settings, "MOO_ACL_CACHE_TTL", 300)
+
+
+def _session_acls():
+    from .code import ContextManager  # pylint: disable=import-outside-toplevel
+
+    perm_cache = ContextManager.get_perm_cache()
+    if perm_cache is None:
+        return None
+    return perm_cache.setdefault(_SESSION_ACLS_KEY, {})
+
+
+def _perm_cache():
+    from .code import ContextManager  # pylint: disable=import-outside-toplevel
+
+    return ContextManager.get_perm_cache()
+
+
+def generation():
+    """
+    Return the current ACL generation, memoized for the session.
+    """
+    perm_cache = _perm_cache()
+    if perm_cache is not None and _SESSION_GENERATION_KEY in perm_cache:
+        return perm_cache[_SESSION_GENERATION_KEY]
+    current = cache.get(GENERATION_KEY)
+    if current is None:
+        # Seeded from the clock so an evicted counter never counts back up
+        # into generations that compiled ACLs are still stored under.
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        current = cache.get(GENERATION_KEY)
+    if perm_cache is not None:
+        perm_cache[_SESSION_GENERATION_KEY] = current
+    return current
+
+
+def _shared_key(kind, pk):
+    return ACL_KEY.format(generation(), kind, pk)
+
+
+def session_reads():
+    """
+    Return the session's set of passed read checks, or ``None`` outside a
+    session.
+
+    The sandbox attribute guard adds ``(caller pk, kind, pk, owner pk)`` once
+    a caller has been allowed to read a subject, so a loop over the same
+    objects checks each one only once. Any ACL change in the session or any
+    Player change (see :func:`forget_session_reads`) clears the whole set.
+    """
+    from .code import ContextManager  # pylint: disable=import-outside-toplevel
+
+    perm_cache = ContextManager.get_perm_cache()
+    if perm_cache is None:
+        return None
+    return perm_cache.setdefault(_SESSION_READS_KEY, set())
+
+
+def forget_session_reads():
+    from .code import ContextManager  # pylint: disable=import-outside-toplevel
+
+    perm_cache = ContextManager.get_perm_cache()
+    if perm_cache is not None:
+        perm_cache.pop(_SESSION_READS_KEY, None)
+
+
+def compile_acl(kind: str, pk, implicit: bool = False) -> CompiledACL:
+    """
+    Compile the ``Access`` rows of the subject identified by `kind` and `pk`
+    with a single query.
+
+    :param implicit: also apply the default policy, for subjects created
+        without materialized default rows
+    """
+    from .models.acl import Access, _get_permission_id  # pylint: disable=import-outside-toplevel
+
+    rules = list(
+        Access.objects.filter(**{kind: pk}).values_list("rule", "permission_id", "type", "accessor_id", "group")
+    )
+    if implicit:
+        rules.extend(
+            ("allow", _get_permission_id(permission), "group", None, group)
+            for group, permission in utils.default_permission_grants(kind)
+        )
+    return CompiledACL.from_rules(rules)
+
+
+def get_acl(subject) -> CompiledACL:
+    """
+    Return the compiled ACL for `subject`, from the session memo, then the
+    cross-process cache, then the database.
+    """
+    memo = _session_acls()
+    memo_key = (subject.kind, subject.pk)
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+    ttl = _ttl()
+    compiled = None
+    key = _shared_key(subject.kind, subject.pk) if ttl > 0 else None
+    if key is not None:
+        compiled = cache.get(key)
+    if compiled is None:
+        compiled = compile_acl(subject.kind, subject.pk, implicit=getattr(subject, "_implicit_acl", False))
+        if key is not None:
+            cache.set(key, compiled, ttl)
+    if memo is not None:
+        memo[memo_key] = compiled
+    return compiled
+
+
+def invalidate(kind: str, pk):
+    """
+    Drop the compiled ACL for one subject.
+
+    The shared entry is deleted now, so the writing session sees its own
+    change, and again on transaction commit, so another process cannot keep an
+    entry it compiled from pre-commit rows.
+    """
+    memo = _session_acls()
+    if memo is not None:
+        memo.pop((kind, pk), None)
+    forget_session_reads()
+    if _ttl() <= 0:
+        return
+    key = _shared_key(kind, pk)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_rows(rows):
+    """
+    Drop the compiled ACLs of the subjects of `rows`, ``Access`` instances
+    written by a bulk operation.
+    """
+    subjects = set()
+    for row in rows:
+        for kind in ("object", "verb", "property"):
+            pk = getattr(row, f"{kind}_id")
+            if pk is not None:
+                subjects.add((kind, pk))
+    for kind, pk in subjects:
+        invalidate(kind, pk)
+
+
+def _incr_generation():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def flush():
+    """
+    Drop every compiled ACL in every process, for writes that cannot name the
+    subjects they touched: ``Access`` queryset updates, migrations and other
+    bulk loaders. The generation is bumped now and again on transaction commit,
+    as :func:`invalidate` deletes.
+    """
+    perm_cache = _perm_cache()
+    if perm_cache is not None:
+        perm_cache.pop(_SESSION_ACLS_KEY, None)
+        perm_cache.pop(_SESSION_GENERATION_KEY, None)
+    forget_session_reads()
+    if _ttl() <= 0:
+        return
+    _incr_generation()
+    transaction.on_commit(_incr_generation)
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Process-local attribute lookup cache.
+
+A bounded LRU that sits between the per-session lookup dicts held by
+:class:`~moo.core.code.ContextManager` and the cross-process
+``MOO_ATTRIB_CACHE_TTL`` cache. It holds fully materialized results — ``Verb``
+instances and decoded property values — so a hit skips both the cache-backend
+round-trip and the ORM/moojson work a Redis hit still requires.
+
+Entries are tagged with the object's attribute *generation* (see
+:func:`generation`), built from counters kept in the shared cache backend.
+A write bumps the written object's counter, which makes the affected entries
+in every process stale at once without having to reach into other processes'
+memory.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+
+#: Bumped by :func:`flush`; invalidates every cached attribute lookup.
+EPOCH_KEY = "moo:attrib:epoch"
+#: Per-object counter, bumped by writes to the object. It is part of the
+#: generation of the object and of every object that inherits from it.
+OBJECT_KEY = "moo:attrib:obj:{}"
+
+# perm_cache key used to memoize generation counters for one ContextManager session.
+_SESSION_GENERATIONS_KEY = "__attrib_generations__"
+
+# Re-parenting an object with more descendants than this flushes every cached
+# lookup instead of bumping each descendant's counter.
+_SUBTREE_BUMP_LIMIT = 100
+
+#: Returned by :meth:`LocalAttributeCache.get` on a miss (never stored).
+MISSING = object()
+
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+class LocalAttributeCache:
+    """
+    Thread-safe LRU keyed by lookup tuples, with generation-checked entries.
+
+    The capacity is read from the `size_setting` setting (by default
+    ``MOO_ATTRIB_LOCAL_CACHE_SIZE``) on every access so it can be changed (or the
+    cache disabled with ``0``) at runtime.
+    """
+
+    def __init__(self, size_setting="MOO_ATTRIB_LOCAL_CACHE_SIZE", default_size=4096):
+        self._size_setting = size_setting
+        self._default_size = default_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def maxsize(self) -> int:
+        return getattr(settings, self._size_setting, self._default_size)
+
+    def get(self, key, tag):
+        """
+        Return the value stored under `key`, or :data:`MISSING` if it is absent or
+        was stored under a different generation `tag`.
+        """
+        if self.maxsize <= 0:
+            return MISSING
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != tag:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, tag, value):
+        maxsize = self.maxsize
+        if maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (tag, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return a snapshot of the cache counters.
+
+        Keys: ``size``, ``maxsize``, ``hits``, ``misses``, ``evictions``.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+local_cache = LocalAttributeCache()
+
+#: Object pk -> ``((epoch, its counter) when read, ancestor pks)``; see :func:`generations`.
+ancestries = LocalAttributeCache(size_setting="MOO_ATTRIB_ANCESTRY_CACHE_SIZE", default_size=4096)
+
+
+def is_enabled() -> bool:
+    return local_cache.maxsize > 0
+
+
+def generations_enabled() -> bool:
+    return (
+        is_enabled()
+        or getattr(settings, "MOO_ATTRIB_CACHE_TTL", 120) > 0
+        or getattr(settings, "MOO_VERB_INDEX_SIZE", 2048) > 0
+        or getattr(settings, "MOO_SYSTEM_OBJECT_CACHE", True)
+        or getattr(settings, "MOO_SESSION_ROUTE_CACHE_SIZE", 4096) > 0
+    )
+
+
+def _session_generations():
+    from .code import ContextManager  # pylint: disable=import-outside-toplevel
+
+    perm_cache = ContextManager.get_perm_cache()
+    if perm_cache is None:
+        return {}
+    return perm_cache.setdefault(_SESSION_GENERATIONS_KEY, {})
+
+
+def generation(pk) -> str:
+    """
+    Return the cache generation for attribute lookups on object `pk`.
+
+    The generation combines the global epoch, the object's own counter and the
+    counters of all its ancestors, and is folded into every cache key
+    (process-local and cross-session) for the object's lookups. A write to an
+    object therefore orphans its own entries and those of its descendants,
+    and nothing else; nothing is ever scanned or deleted.
+
+    Counters are memoized for the rest of the ``ContextManager`` session.
+    """
+    return generations([pk])[pk]
+
+
+def generations(pks) -> dict:
+    """
+    Return ``{pk: generation(pk)}`` for every object in `pks`.
+
+    An object's ancestors are read from ``AncestorCache`` and remembered
+    alongside the epoch and the object's counter, which every re-parenting in
+    its lineage bumps. With those already known, the counters the session has
+    not seen are fetched with one ``get_many``; otherwise the ancestors'
+    counters take a second.
+    """
+    memo = _session_generations()
+    ancestry = {pk: _known_ancestry(memo, pk) for pk in pks}
+    _fetch_counters(
+        memo,
+        [
+            EPOCH_KEY,
+            *(OBJECT_KEY.format(pk) for pk in pks),
+            *(OBJECT_KEY.format(a) for entry in ancestry.values() if entry is not None for a in entry[1]),
+        ],
+    )
+    epoch = memo[EPOCH_KEY]
+    stale = [pk for pk, entry in ancestry.items() if entry is None or entry[0] != (epoch, memo[OBJECT_KEY.format(pk)])]
+    if stale:
+        from .models.object import AncestorCache  # pylint: disable=import-outside-toplevel
+
+        loaded: dict = {pk: [] for pk in stale}
+        for descendant, ancestor in AncestorCache.objects.filter(descendant_id__in=stale).values_list(
+            "descendant_id", "ancestor_id"
+        ):
+            loaded[descendant].append(ancestor)
+        for pk in stale:
+            ancestry[pk] = ((epoch, memo[OBJECT_KEY.format(pk)]), tuple(sorted(loaded[pk])))
+            memo[("ancestry", pk)] = ancestry[pk]
+            ancestries.set(pk, None, ancestry[pk])
+        _fetch_counters(memo, [OBJECT_KEY.format(a) for pk in stale for a in ancestry[pk][1]])
+    return {
+        pk: f"{epoch}.{memo[OBJECT_KEY.format(pk)]}.{sum(memo[OBJECT_KEY.format(a)] for a in ancestry[pk][1])}"
+        for pk in pks
+    }
+
+
+def _known_ancestry(memo, pk):
+    entry = memo.get(("ancestry", pk))
+    if entry is None:
+        entry = ancestries.get(pk, None)
+    return None if entry is MISSING else entry
+
+
+def _fetch_counters(memo, keys):
+    wanted = [k for k in dict.fromkeys(keys) if k not in memo]
+    if not wanted:
+        return
+    found = cache.get_many(wanted)
+    if EPOCH_KEY in wanted and EPOCH_KEY not in found:
+        # Seed the epoch from the clock rather than 0 so that a counter lost to
+        # backend eviction can never count back up into a range of generations
+        # that long-lived entries were tagged with.
+        cache.add(EPOCH_KEY, time.time_ns(), timeout=None)
+        found[EPOCH_KEY] = cache.get(EPOCH_KEY)
+    for key in wanted:
+        memo[key] = found.get(key, 0)
+
+
+def _incr(key, seed=None):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, seed if seed is not None else time.time_ns(), timeout=None)
+
+
+def _bump(key):
+    """
+    Bump `key` now, so the writing session sees its own write, and again on
+    transaction commit, so an entry another process populated from pre-commit
+    rows cannot outlive the write.
+    """
+    _incr(key)
+    transaction.on_commit(lambda: _incr(key))
+    _session_generations().pop(key, None)
+
+
+def invalidate(pk):
+    """
+    Invalidate cached attribute lookups affected by a write to object `pk`:
+    its own, and those of every object that inherits from it.
+
+    :param pk: the object whose verbs or properties changed
+    """
+    if not generations_enabled():
+        return
+    _bump(OBJECT_KEY.format(pk))
+
+
+def invalidate_subtree(pk):
+    """
+    Invalidate cached attribute lookups for `pk` and all its descendants after
+    `pk`'s parents changed, which changes the ancestors of each of them.
+    Large subtrees are handled with :func:`flush` instead.
+    """
+    if not generations_enabled():
+        return
+    from .models.object import AncestorCache  # pylint: disable=import-outside-toplevel
+
+    descendants = list(
+        AncestorCache.objects.filter(ancestor_id=pk).values_list("descendant_id", flat=True)[: _SUBTREE_BUMP_LIMIT + 1]
+    )
+    if len(descendants) > _SUBTREE_BUMP_LIMIT:
+        flush()
+        return
+    for member in (pk, *descendants):
+        _bump(OBJECT_KEY.format(member))
+
+
+def flush():
+    """
+    Invalidate every cached attribute lookup in every process with a single
+    counter bump.
+    """
+    if not generations_enabled():
+        return
+    _bump(EPOCH_KEY)
+
+
+def remember(key, tag, value):
+    """
+    Store a copy of `value` under `key` with the generation `tag`. A ``None``
+    key (cache disabled or not applicable to this lookup) is a no-op, so call
+    sites need no guard.
+    """
+    if key is None:
+        return
+    local_cache.set(key, tag, clone(value))
+
+
+def clone(value):
+    """
+    Return a copy of a cached value that is safe to hand to a single caller.
+
+    Containers are copied recursively and model instances shallow-copied, so
+    one task mutating a result cannot leak into another task's view of it.
+    ``copy.deepcopy`` is avoided for model instances because it probes
+    ``__deepcopy__`` on the instance, which ``Object.__getattr__`` would turn
+    into a verb/property lookup.
+    """
+    # Bare ``object()`` instances are miss sentinels compared by identity; every
+    # value is an instance of ``object``, so only an exact type check finds them.
+    if isinstance(value, _IMMUTABLE_TYPES) or type(value) is object:  # pylint: disable=unidiomatic-typecheck
+        return value
+    if isinstance(value, list):
+        return [clone(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(clone(v) for v in value)
+    if isinstance(value, dict):
+        return {k: clone(v) for k, v in value.items()}
+    if isinstance(value, set):
+        return {clone(v) for v in value}
+    if isinstance(value, models.Model):
+        return copy.copy(value)
+    return copy.deepcopy(value)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent cache of compiled verb code.
+
+RestrictedPython's AST transform is the most expensive part of running a verb
+for the first time in a process. :func:`moo.core.code.compile_verb_code` keeps
+a bounded in-process LRU, but every new worker process, every restart and
+every eviction used to pay for the transform again.
+
+This module adds a content-addressed store behind that LRU. A compile result
+is marshalled and kept under a hash of the verb source, its filename, the
+RestrictedPython version, the version of moo's own additions to its transform
+and the interpreter's bytecode magic number, so an
+entry can never be served for different source or to an incompatible
+interpreter. Entries live on local disk (``MOO_BYTECODE_CACHE_DIR``), in the
+shared cache backend (``MOO_BYTECODE_CACHE_TTL``), or both.
+
+Entries are executable code: anyone who can write to the cache directory or
+the cache backend can already run code in the worker, so they are trusted as
+they are read.
+"""
+
+import hashlib
+import importlib.metadata
+import importlib.util
+import logging
+import marshal
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from RestrictedPython.compile import CompileResult
+
+log = logging.getLogger(__name__)
+
+#: Cross-process cache key for one compiled verb.
+BYTECODE_KEY = "moo:bytecode:{}"
+
+RESTRICTED_PYTHON_VERSION = importlib.metadata.version("RestrictedPython")
+
+#: Version of the changes :class:`moo.core.code.VerbTransformer` makes on top
+#: of RestrictedPython's transform. Bump it whenever they change.
+TRANSFORM_VERSION = "1"
+
+
+def _cache_dir():
+    path = getattr(settings, "MOO_BYTECODE_CACHE_DIR", None)
+    return Path(path) if path else None
+
+
+def _ttl() -> int:
+    return getattr(settings, "MOO_BYTECODE_CACHE_TTL", 0)
+
+
+def is_enabled() -> bool:
+    return _cache_dir() is not None or _ttl() > 0
+
+
+def digest(body, filename) -> str:
+    """
+    Return the content address of a compiled verb.
+    """
+    h = hashlib.sha256()
+    for part in (
+        RESTRICTED_PYTHON_VERSION.encode(),
+        TRANSFORM_VERSION.encode(),
+        importlib.util.MAGIC_NUMBER,
+        filename.encode(),
+        body.encode(),
+    ):
+        h.update(len(part).to_bytes(8, "little"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def _dumps(result) -> bytes:
+    return marshal.dumps((result.code, tuple(result.errors), tuple(result.warnings), dict(result.used_names)))
+
+
+def _loads(data):
+    code, errors, warnings, used_names = marshal.loads(data)
+    return CompileResult(code, errors, warnings, used_names)
+
+
+def _path(key):
+    return _cache_dir() / key[:2] / f"{key}.marshal"
+
+
+def load(key):
+    """
+    Return the cached :class:`~RestrictedPython.compile.CompileResult` for
+    `key`, or ``None``. Disk is tried before the cache backend; a backend hit
+    is written through to disk.
+    """
+    data = None
+    if _cache_dir() is not None:
+        try:
+            data = _path(key).read_bytes()
+        except OSError:
+            data = None
+    from_disk = data is not None
+    if data is None and _ttl() > 0:
+        data = cache.get(BYTECODE_KEY.format(key))
+    if data is None:
+        return None
+    try:
+        result = _loads(data)
+    except (EOFError, ValueError, TypeError):
+        log.warning("Discarding unreadable compiled verb %s", key)
+        return None
+    if not from_disk and _cache_dir() is not None:
+        _write(key, data)
+    return result
+
+
+def _write(key, data):
+    path = _path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so a concurrent reader never sees a partial file.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError as e:
+        log.warning("Could not write compiled verb %s: %s", key, e)
+
+
+def store(key, result):
+    """
+    Store a compile result in every configured tier.
+    """
+    data = _dumps(result)
+    if _cache_dir() is not None:
+        _write(key, data)
+    if _ttl() > 0:
+        cache.set(BYTECODE_KEY.format(key), data, _ttl())
+
+
+def get_or_compile(body, filename, compiler):
+    """
+    Return the compile result for `body`, loading it from the persistent store
+    or calling ``compiler(body, filename)`` and storing the result.
+    """
+    if not is_enabled():
+        return compiler(body, filename)
+    key = digest(body, filename)
+    result = load(key)
+    if result is None:
+        result = compiler(body, filename)
+        store(key, result)
+    return result
+
+
+def precompile_verbs() -> int:
+    """
+    Compile every verb in the database into the persistent store, so that
+    worker processes start with warm entries.
+
+    :return: the number of verbs that had to be compiled
+    """
+    if not is_enabled():
+        return 0
+    from .code import _compile_verb  # pylint: disable=import-outside-toplevel
+    from .models.verb import Verb  # pylint: disable=import-outside-toplevel
+
+    compiled = 0
+    seen = set()
+    for body, filename in Verb.objects.filter(code__isnull=False).values_list("code", "filename").iterator():
+        # Verb.__call__ passes ``filename`` only when the verb has one; match
+        # r_exec's default so the warm-up and runtime produce the same key.
+        filename = filename if filename is not None else "<string>"
+        key = digest(body, filename)
+        if key in seen:
+            continue
+        seen.add(key)
+        if load(key) is not None:
+            continue
+        try:
+            result = _compile_verb(body, filename)
+        except (SyntaxError, ValueError) as e:
+            # The verb fails the same way when it is called; don't let one
+            # broken verb abort the warm-up.
+            log.warning("Could not precompile verb in %s: %s", filename, e)
+            continue
+        store(key, result)
+        compiled += 1
+    return compiled
@@ -3,6 +3,8 @@
 Development support resources for MOO programs
 """
 
+import ast
+import contextlib
 import contextvars
 import functools
 import logging
@@ -10,16 +12,21 @@ import time
 import warnings
 from typing import Any
 from collections import namedtuple
-from types import ModuleType
+from types import MappingProxyType, ModuleType
 
 from django.conf import settings
+from django.core.signals import setting_changed
 from django.db.models import Model
 from django.db.models.manager import BaseManager
 from django.db.models.query import QuerySet
+from django.dispatch import receiver
 
 from RestrictedPython import compile_restricted, compile_restricted_function
 from RestrictedPython.Guards import guarded_iter_unpack_sequence, guarded_unpack_sequence, safe_builtins
-from RestrictedPython.transformer import INSPECT_ATTRIBUTES
+from RestrictedPython.transformer import INSPECT_ATTRIBUTES, RestrictingNodeTransformer, copy_locations
+
+from . import acl_cache, bytecode_cache
+from .outbox import Outbox
 
 # Read-only QuerySet/Manager methods that verb code may legitimately call.
 # Everything else — including all mutation methods, async variants (adelete,
@@ -111,6 +118,23 @@ SANDBOX_EXEMPT_METHODS: dict[str, frozenset] = {
 # "acl" is checked with "grant" permission, before the per-kind read sets.
 SANDBOX_SPECIAL_ATTRIBUTES = frozenset({"acl"})
 
+# Outcomes of the attribute-read guard that depend only on the type of the
+# object and the attribute name, so they can be decided once per process and
+# looked up on every access. _GUARD_FULL marks the cases whose decision
+# depends on the instance or the caller (modules, QuerySets and Managers,
+# non-sandbox models); those run the complete guard every time.
+_GUARD_ALLOW = 0
+_GUARD_DENY = 1
+_GUARD_READ = 2
+_GUARD_GRANT = 3
+_GUARD_ALIAS = 4
+_GUARD_VERB_NAME = 5
+_GUARD_FULL = 6
+
+# Upper bound on each per-process guard table. Verb code can define its own
+# classes, so the set of types seen is not bounded by the models alone.
+_GUARD_TABLE_SIZE = 4096
+
 
 def derive_sandbox_field_names(model) -> frozenset:
     """
@@ -145,8 +169,8 @@ def _sandbox_registry():
     """
     Memoized sandbox model registry. Models are imported lazily here —
     moo/core/models/acl.py imports this module at import time, so code.py can
-    never import models at module scope. get_restricted_environment() runs
-    once per task; this makes the imports and set construction once-per-process.
+    never import models at module scope. This makes the imports and set
+    construction once-per-process, like the rest of _environment_template().
     """
     from types import SimpleNamespace  # pylint: disable=import-outside-toplevel
 
@@ -192,20 +216,115 @@ log = logging.getLogger(__name__)
 
 TaskTime = namedtuple("TaskTime", ["elapsed", "time_limit", "remaining"])
 
+# time.monotonic() deadline for code running outside a Celery worker, where
+# nothing kills the thread once task_time_limit has passed. None means the
+# worker enforces the limit itself. Set by enforce_time_limit().
+_deadline = contextvars.ContextVar("moo_deadline", default=None)
+
+
+@contextlib.contextmanager
+def enforce_time_limit(seconds):
+    """
+    Make verbs run in this block raise :class:`~.exceptions.TimeLimitError`
+    once `seconds` have passed. The check is cooperative: it runs at every
+    verb call and loop iteration, which is where runaway verbs spend their time.
+    """
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def check_deadline():
+    """
+    Raise :class:`~.exceptions.TimeLimitError` if the enforced time limit has passed.
+    """
+    deadline = _deadline.get()
+    if deadline is not None and time.monotonic() > deadline:
+        from .exceptions import TimeLimitError  # pylint: disable=import-outside-toplevel
+
+        raise TimeLimitError("Verb exceeded the task time limit.")
+
+
+# time.monotonic() deadline after which verbs are stopped outright rather than
+# asked to stop, for code run where no worker can kill the thread. Set by
+# hard_time_limit().
+_kill_deadline = contextvars.ContextVar("moo_kill_deadline", default=None)
+
+
+@contextlib.contextmanager
+def hard_time_limit(seconds):
+    """
+    Kill the verbs run in this block once `seconds` have passed, as the Celery
+    hard time limit kills a worker's task.
+
+    :func:`check_killed` runs as every verb function, loop iteration and
+    ``except`` block begins (see :class:`VerbTransformer`). After the deadline
+    it raises :class:`~.exceptions.TaskKilled`, which ``except Exception``
+    does not catch and which a bare ``except:`` raises again as it begins, so
+    it unwinds every verb frame. Code blocked outside a verb, such as a slow
+    query, is stopped when it returns to the verb.
+    """
+    token = _kill_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _kill_deadline.reset(token)
+
+
+def check_killed():
+    """
+    Raise :class:`~.exceptions.TaskKilled` if the hard time limit has passed.
+    """
+    deadline = _kill_deadline.get()
+    if deadline is not None and time.monotonic() > deadline:
+        from .exceptions import TaskKilled  # pylint: disable=import-outside-toplevel
+
+        raise TaskKilled("Verb exceeded the task time limit and was killed.")
+
+
+class VerbTransformer(RestrictingNodeTransformer):
+    """
+    RestrictedPython's transform, plus a ``_check_killed_()`` call at the top of
+    every function, ``while`` body and ``except`` block, so that
+    :func:`hard_time_limit` can stop a verb wherever it is spinning. ``for``
+    loops and comprehensions are checked by ``_getiter_`` instead, outside any
+    ``try`` in the loop body.
+    """
+
+    @staticmethod
+    def _check_killed_first(node):
+        body = node.body
+        # Keep a docstring where Python looks for it.
+        start = 1 if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) else 0
+        check = ast.Expr(value=ast.Call(func=ast.Name("_check_killed_", ast.Load()), args=[], keywords=[]))
+        copy_locations(check, body[min(start, len(body) - 1)])
+        body.insert(start, check)
+        return node
+
+    def visit_FunctionDef(self, node):
+        return self._check_killed_first(super().visit_FunctionDef(node))
+
+    def visit_While(self, node):
+        return self._check_killed_first(super().visit_While(node))
+
+    def visit_ExceptHandler(self, node):
+        return self._check_killed_first(super().visit_ExceptHandler(node))
+
 
 def interpret(source, name, *args, runtype="exec", **kwargs):
     from . import context
 
-    globals = get_default_globals()  # pylint: disable=redefined-builtin
-    globals.update(get_restricted_environment(name, context.writer))
+    # The restricted environment already carries every default global.
+    globals = get_restricted_environment(name, context.writer)  # pylint: disable=redefined-builtin
     if runtype == "exec":
         return r_exec(source, {}, globals, *args, **kwargs)
     else:
         return r_eval(source, {}, globals, *args, **kwargs)
 
 
-@functools.lru_cache(maxsize=512)
-def _cached_compile(body, filename):
+def _compile_verb(body, filename):
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", category=SyntaxWarning)
         return compile_restricted_function(
@@ -213,9 +332,17 @@ def _cached_compile(body, filename):
             body=body,
             name="verb",
             filename=filename,
+            policy=VerbTransformer,
         )
 
 
+@functools.lru_cache(maxsize=512)
+def _cached_compile(body, filename):
+    # Backed by the persistent store, so an LRU miss in a fresh or long-running
+    # process need not re-run the RestrictedPython transform.
+    return bytecode_cache.get_or_compile(body, filename, _compile_verb)
+
+
 def compile_verb_code(body, filename):
     """
     Take a given piece of verb code and wrap it in a function.
@@ -271,9 +398,58 @@ def get_default_globals():
     return {"__name__": "__main__", "__package__": None, "__doc__": None}
 
 
-def get_restricted_environment(name, writer):
+class _PrintCollector:
     """
-    Construct an environment dictionary.
+    The sandbox ``print()`` target for one verb call.
+
+    Stdlib-compatible defaults: ``print("x")`` ends with ``\\n``,
+    ``print("x", end="")`` does not.  The shell writer is a println —
+    one call per writer entry, with its own trailing ``\\n`` added —
+    so we buffer until a print's ``end`` carries us across a newline,
+    then emit one writer call with the trailing ``\\n`` stripped
+    (writer adds it back).  Embedded newlines in args are preserved
+    verbatim so multi-line text reaches the writer as one call.
+    """
+
+    __slots__ = ("_buffer", "_render", "_writer")
+
+    def __init__(self, writer, render):
+        self._buffer = ""
+        self._writer = writer
+        self._render = render
+
+    def __call__(self, _):
+        # RestrictedPython transforms ``print(x)`` into
+        # ``_print_(_print)._call_print(x)``.  Return the same collector
+        # instance every time so its buffer persists across calls and
+        # ``print(..., end="")`` can coalesce fragments into one writer
+        # call.  The argument (the current collector) is intentionally
+        # ignored — we already own it.
+        return self
+
+    def _call_print(self, *args, sep=" ", end="\n"):
+        self._buffer += sep.join(self._render(a) for a in args) + end
+        if self._buffer.endswith("\n"):
+            self._writer(self._buffer[:-1])
+            self._buffer = ""
+
+    def _flush(self):
+        if self._buffer:
+            self._writer(self._buffer)
+            self._buffer = ""
+
+
+@functools.lru_cache(maxsize=None)
+def _environment_template():
+    """
+    Build the call-invariant part of the sandbox environment once per process.
+
+    None of the guards depend on the verb being run: they read the caller,
+    settings and the tick counter when they are called, not when they are
+    created. Only the writer, the verb name and the print collector differ
+    between calls; get_restricted_environment() overlays those on a copy.
+    ``ALLOWED_BUILTINS`` is read here, so the template is rebuilt when that
+    setting changes (see _reset_environment_template()).
     """
     reg = _sandbox_registry()
     AccessibleMixin = reg.AccessibleMixin
@@ -294,7 +470,20 @@ def get_restricted_environment(name, writer):
         except TypeError:
             return False
 
+    # type(result) -> whether guard_result() has to inspect it at all.
+    result_needs_guard = {}
+
     def guard_result(result):
+        tp = type(result)
+        needs_guard = result_needs_guard.get(tp)
+        if needs_guard is None:
+            needs_guard = issubclass(tp, (QuerySet, BaseManager)) or (
+                issubclass(tp, Model) and not is_sandbox_model_class(tp)
+            )
+            if len(result_needs_guard) < _GUARD_TABLE_SIZE:
+                result_needs_guard[tp] = needs_guard
+        if not needs_guard:
+            return result
         if isinstance(result, (QuerySet, BaseManager)):
             model = getattr(result, "model", None)
             if model is not None and not is_sandbox_model_class(model) and not caller_is_wizard():
@@ -320,6 +509,66 @@ def get_restricted_environment(name, writer):
         elif isinstance(obj, VerbName):
             obj.verb.can_caller("read", obj.verb)
 
+    def classify_attribute(tp, attr_name):
+        # The type-level equivalent of validate_attribute_request() followed
+        # by guard_read_attribute(); anything that needs the instance is
+        # left to the full guard.
+        if attr_name.startswith("_") or attr_name in INSPECT_ATTRIBUTES:
+            return _GUARD_DENY
+        if attr_name in ("format", "format_map"):
+            if issubclass(tp, str):
+                return _GUARD_DENY
+            if issubclass(tp, type):
+                return _GUARD_FULL
+        if issubclass(tp, (ModuleType, QuerySet, BaseManager)):
+            return _GUARD_FULL
+        if issubclass(tp, Model) and not is_sandbox_model_class(tp):
+            return _GUARD_FULL
+        if attr_name == "acl" and issubclass(tp, AccessibleMixin):
+            return _GUARD_GRANT
+        if issubclass(tp, Object) and attr_name in object_read_attributes:
+            return _GUARD_READ
+        if issubclass(tp, Verb) and attr_name in verb_read_attributes:
+            return _GUARD_READ
+        if issubclass(tp, Property) and attr_name in property_read_attributes:
+            return _GUARD_READ
+        if issubclass(tp, Alias):
+            return _GUARD_ALIAS
+        if issubclass(tp, VerbName):
+            return _GUARD_VERB_NAME
+        return _GUARD_ALLOW
+
+    # (type(obj), attr_name) -> one of the _GUARD_* actions.
+    guard_actions = {}
+    caller_var = _CONTEXT_VARS["caller"]
+
+    def guard_action(obj, attr_name):
+        # Exactly str: a subclass could override __eq__/__hash__ and match an
+        # action classified for a different name.
+        if type(attr_name) is not str:  # pylint: disable=unidiomatic-typecheck
+            return _GUARD_FULL
+        key = (type(obj), attr_name)
+        action = guard_actions.get(key)
+        if action is None:
+            action = classify_attribute(*key)
+            if len(guard_actions) < _GUARD_TABLE_SIZE:
+                guard_actions[key] = action
+        return action
+
+    def check_read(caller, subject):
+        # A passed check is remembered for the session; an owner change on
+        # this instance changes the key, and ACL or Player changes clear the
+        # set (see acl_cache.session_reads()).
+        reads = acl_cache.session_reads()
+        caller_pk = getattr(caller, "pk", None)
+        if reads is None or caller_pk is None or subject.pk is None:
+            subject.can_caller("read", subject)
+            return
+        key = (caller_pk, subject.kind, subject.pk, subject.owner_id)
+        if key not in reads:
+            subject.can_caller("read", subject)
+            reads.add(key)
+
     def _render_print_arg(value):
         # Third-party models can't override __str__ for redaction the way
         # Object/Verb/Property do, so restricted instances render as a
@@ -334,28 +583,6 @@ def get_restricted_environment(name, writer):
             return "<%s (restricted)>" % type(value).__name__
         return str(value)
 
-    class _print_:
-        # Stdlib-compatible defaults: ``print("x")`` ends with ``\n``,
-        # ``print("x", end="")`` does not.  The shell writer is a println —
-        # one call per writer entry, with its own trailing ``\n`` added —
-        # so we buffer until a print's ``end`` carries us across a newline,
-        # then emit one writer call with the trailing ``\n`` stripped
-        # (writer adds it back).  Embedded newlines in args are preserved
-        # verbatim so multi-line text reaches the writer as one call.
-        def __init__(self):
-            self._buffer = ""
-
-        def _call_print(self, *args, sep=" ", end="\n"):
-            self._buffer += sep.join(_render_print_arg(a) for a in args) + end
-            if self._buffer.endswith("\n"):
-                writer(self._buffer[:-1])
-                self._buffer = ""
-
-        def _flush(self):
-            if self._buffer:
-                writer(self._buffer)
-                self._buffer = ""
-
     class _write_:
         def __init__(self, obj):
             object.__setattr__(self, "obj", obj)
@@ -406,7 +633,7 @@ def get_restricted_environment(name, writer):
             if attr_name not in _QUERYSET_ALLOWED:
                 raise AttributeError(attr_name)
 
-    def get_protected_attribute(obj, name, g=getattr):
+    def checked_attribute(obj, name, g):
         validate_attribute_request(obj, name)
         if isinstance(obj, ModuleType):
             module_name = getattr(obj, "__name__", "")
@@ -421,6 +648,26 @@ def get_restricted_environment(name, writer):
         guard_read_attribute(obj, name)
         return guard_result(g(obj, name))
 
+    def get_protected_attribute(obj, name, g=getattr):
+        action = guard_action(obj, name)
+        if action == _GUARD_ALLOW:
+            return guard_result(g(obj, name))
+        if action == _GUARD_FULL:
+            return checked_attribute(obj, name, g)
+        if action == _GUARD_DENY:
+            raise AttributeError(name)
+        caller = caller_var.get()
+        if caller is not None:
+            if action == _GUARD_READ:
+                check_read(caller, obj)
+            elif action == _GUARD_GRANT:
+                obj.can_caller("grant", obj)
+            elif action == _GUARD_ALIAS:
+                check_read(caller, obj.object)
+            else:
+                check_read(caller, obj.verb)
+        return guard_result(g(obj, name))
+
     def set_protected_attribute(obj, name, value, s=setattr):
         if name.startswith("_"):
             raise AttributeError(name)
@@ -447,6 +694,8 @@ def get_restricted_environment(name, writer):
         # counter[0], keeping per-item overhead to an int increment + compare.
         budget = getattr(settings, "MOO_TICK_BUDGET", 0)
         counter = _CONTEXT_VARS["tick_counter"].get() if budget else None
+        deadline = _deadline.get()
+        kill_deadline = _kill_deadline.get()
 
         def _guarded_items():
             for item in obj:
@@ -456,6 +705,12 @@ def get_restricted_environment(name, writer):
                         from .exceptions import TickLimitError  # pylint: disable=import-outside-toplevel
 
                         raise TickLimitError(f"Verb exceeded the tick budget ({budget} loop iterations).")
+                if deadline is not None or kill_deadline is not None:
+                    now = time.monotonic()
+                    if kill_deadline is not None and now > kill_deadline:
+                        check_killed()
+                    if deadline is not None and now > deadline:
+                        check_deadline()
                 yield guard_result(item)
 
         return _guarded_items()
@@ -466,19 +721,9 @@ def get_restricted_environment(name, writer):
         raise NotImplementedError("In-place modification with %s not supported." % operator)
 
     def safe_getattr(obj, name, *args):
-        validate_attribute_request(obj, name)
-        if isinstance(obj, ModuleType):
-            module_name = getattr(obj, "__name__", "")
-            if name in settings.BLOCKED_IMPORTS.get(module_name, set()):
-                raise AttributeError(name)
-            result = getattr(obj, name, *args) if args else getattr(obj, name)
-            if isinstance(result, ModuleType):
-                result_name = getattr(result, "__name__", "")
-                if result_name not in settings.ALLOWED_MODULES and result_name not in settings.WIZARD_ALLOWED_MODULES:
-                    raise AttributeError(name)
-            return guard_result(result)
-        guard_read_attribute(obj, name)
-        return guard_result(getattr(obj, name, *args) if args else getattr(obj, name))
+        if args:
+            return get_protected_attribute(obj, name, lambda o, n: getattr(o, n, *args))
+        return get_protected_attribute(obj, name)
 
     def safe_hasattr(obj, name):
         try:
@@ -495,32 +740,45 @@ def get_restricted_environment(name, writer):
     restricted_builtins["getattr"] = safe_getattr
     restricted_builtins["hasattr"] = safe_hasattr
 
-    _print_collector = _print_()
     env = dict(
         _apply_=lambda f, *a, **kw: f(*a, **kw),
-        # RestrictedPython transforms ``print(x)`` into
-        # ``_print_(_print)._call_print(x)``.  Return the same collector
-        # instance every time so its buffer persists across calls and
-        # ``print(..., end="")`` can coalesce fragments into one writer
-        # call.  The ``x`` arg (the current collector) is intentionally
-        # ignored — we already own it.
-        _print_=lambda x: _print_collector,
-        _print=_print_collector,
         _write_=_write_,
         _getattr_=get_protected_attribute,
         _getitem_=guarded_getitem,
         _getiter_=guarded_iter,
+        _check_killed_=check_killed,
         _inplacevar_=inplace_var_modification,
         _unpack_sequence_=guarded_unpack_sequence,
         _iter_unpack_sequence_=guarded_iter_unpack_sequence,
         __import__=restricted_import,
         __builtins__=restricted_builtins,
-        __name__=name,
         __package__=None,
         __doc__=None,
-        verb_name=name,
     )
+    return MappingProxyType(env), _render_print_arg
+
+
+@receiver(setting_changed)
+def _reset_environment_template(setting, **kwargs):  # pylint: disable=unused-argument
+    if setting == "ALLOWED_BUILTINS":
+        _environment_template.cache_clear()
 
+
+def get_restricted_environment(name, writer):
+    """
+    Construct an environment dictionary.
+
+    The result is a fresh dict, so verb globals never leak between calls,
+    but everything except the writer, the verb name and the print collector
+    is shared with every other call in the process.
+    """
+    template, render = _environment_template()
+    collector = _PrintCollector(writer, render)
+    env = dict(template)
+    env["_print_"] = collector
+    env["_print"] = collector
+    env["__name__"] = name
+    env["verb_name"] = name
     return env
 
 
@@ -559,6 +817,9 @@ _CONTEXT_VARS: dict[str, contextvars.ContextVar] = {
     # hot path mutates ``counter[0]`` in place rather than doing a contextvar
     # set per iteration. Fresh per session, reset on __exit__.
     "tick_counter": contextvars.ContextVar("tick_counter", default=None),
+    # Set to an Outbox by sessions opened with coalesce_output=True; player
+    # output is buffered there and published on commit (see moo.core.outbox).
+    "outbox": contextvars.ContextVar("outbox", default=None),
 }
 
 
@@ -660,6 +921,7 @@ class ContextManager:
         connection: Any = None,
         track_events: bool = False,
         site: Any = None,
+        coalesce_output: bool = False,
     ) -> None:
         self._tokens: dict = {}
         self._initial_values: dict = {
@@ -682,6 +944,7 @@ class ContextManager:
             "published_events": [] if track_events else None,
             "site": site,
             "tick_counter": [0],
+            "outbox": Outbox() if coalesce_output else None,
         }
 
     def set_parser(self, parser):
@@ -694,6 +957,9 @@ class ContextManager:
         return self
 
     def __exit__(self, cls, value, traceback):
+        outbox = self._initial_values["outbox"]
+        if outbox is not None:
+            outbox.close()
         for name, token in self._tokens.items():
             if token:
                 # reset() restores to whatever the var held before __enter__'s set() call,
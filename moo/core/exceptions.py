@@ -140,6 +140,28 @@ class TickLimitError(UserError):
     """
 
 
+class TimeLimitError(UserError):
+    """
+    Raised when a verb runs past the task time limit where nothing else
+    enforces it, i.e. when commands run in the SSH server process instead of a
+    Celery worker (``MOO_LOCAL_COMMANDS``).  The deadline is checked at verb
+    calls and loop iterations, and ``parse_command`` rolls the command's
+    transaction back, as the Celery hard kill would.
+    """
+
+
+class TaskKilled(BaseException):
+    """
+    Raised in a command running in the SSH server process once it is past
+    the task time limit, standing in for the Celery hard kill.
+
+    It derives from ``BaseException`` so that ``except Exception`` in a verb
+    does not stop it, and it is raised again as any ``except`` block in a verb
+    begins, so a bare ``except:`` cannot hold it either. See
+    :func:`moo.core.code.hard_time_limit`.
+    """
+
+
 class NoSuchPrepositionError(UserError):
     """
     Raised by parser methods like :meth:`Parser.get_pobj_str` when the
@@ -68,6 +68,7 @@ class Command(BaseCommand):
 
         from moo.core.code import ContextManager
         from moo.core.managers import get_default_site
+        from moo.core.bytecode_cache import precompile_verbs
         from moo.core.utils import flush_attribute_caches
 
         if hostname:
@@ -101,9 +102,13 @@ class Command(BaseCommand):
                 bootstrap_path = self._find_bootstrap_path(bootstrap)
                 load_python(bootstrap_path)
 
-        # Evict the cross-process verb/property lookup caches once the bootstrap
-        # transaction has committed, so long-running shell/celery processes pick
-        # up relocated or newly-inherited verbs without a restart.
-        flushed = flush_attribute_caches()
-        if flushed:
-            log.info("Flushed %d cached attribute lookups.", flushed)
+        # Invalidate the cross-process verb/property lookup caches once the
+        # bootstrap transaction has committed, so long-running shell/celery
+        # processes pick up relocated or newly-inherited verbs without a restart.
+        flush_attribute_caches()
+
+        # Warm the persistent compiled-verb store so workers start without
+        # re-running the RestrictedPython transform for every verb.
+        compiled = precompile_verbs()
+        if compiled:
+            log.info("Precompiled %d verbs.", compiled)
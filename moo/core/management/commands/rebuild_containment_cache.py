@@ -0,0 +1,45 @@
+"""
+Management command to rebuild the ContainmentCache table from scratch.
+
+Use this after bulk ``location`` changes made with ``QuerySet.update()`` or raw
+SQL, which bypass the maintenance in ``Object.save()``.
+"""
+
+from django.core.management.base import BaseCommand
+
+from moo.core.models.object import ContainmentCache, Object
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ContainmentCache table from scratch using the current Object.location data."
+
+    def handle(self, *args, **options):
+        self.stdout.write("Clearing existing ContainmentCache rows...")
+        deleted, _ = ContainmentCache.objects.all().delete()
+        self.stdout.write(f"  Deleted {deleted} rows.")
+
+        # No CTE is involved, so one pass over global_objects covers every site.
+        location_map = dict(Object.global_objects.filter(location__isnull=False).values_list("id", "location_id"))
+        self.stdout.write(f"Rebuilding cache for {len(location_map)} located objects")
+
+        rows = []
+        for pk in location_map:
+            seen = set()
+            container_pk = location_map.get(pk)
+            depth = 1
+            while container_pk is not None and container_pk not in seen:
+                seen.add(container_pk)
+                rows.append(ContainmentCache(content_id=pk, container_id=container_pk, depth=depth))
+                container_pk = location_map.get(container_pk)
+                depth += 1
+            if len(rows) >= 500:
+                ContainmentCache.objects.bulk_create(rows, ignore_conflicts=True)
+                rows = []
+
+        if rows:
+            ContainmentCache.objects.bulk_create(rows, ignore_conflicts=True)
+
+        total = ContainmentCache.objects.count()
+        self.stdout.write(
+            self.style.SUCCESS(f"Done. Processed {len(location_map)} objects, created {total} ContainmentCache rows.")
+        )
@@ -0,0 +1,85 @@
+# Generated manually for containment closure denormalization
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_containment_cache(apps, schema_editor):
+    """
+    Populate ContainmentCache from existing Object.location data.
+    For each object, walk up the location chain recording every container with
+    its depth (1 = direct location).
+    """
+    Object = apps.get_model("core", "Object")
+    ContainmentCache = apps.get_model("core", "ContainmentCache")
+
+    location_map = dict(Object.objects.filter(location__isnull=False).values_list("id", "location_id"))
+
+    rows = []
+    for obj_pk in location_map:
+        seen = set()
+        container_pk = location_map.get(obj_pk)
+        depth = 1
+        # Guard against pre-existing loops, which the old CTE check never let through.
+        while container_pk is not None and container_pk not in seen:
+            seen.add(container_pk)
+            rows.append(ContainmentCache(content_id=obj_pk, container_id=container_pk, depth=depth))
+            container_pk = location_map.get(container_pk)
+            depth += 1
+
+        if len(rows) >= 500:
+            ContainmentCache.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+
+    if rows:
+        ContainmentCache.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0038_player_unique_identity_per_site"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContainmentCache",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("depth", models.IntegerField()),
+                (
+                    "container",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="containment_contents",
+                        to="core.object",
+                    ),
+                ),
+                (
+                    "content",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="containment_cache",
+                        to="core.object",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("container", "content")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="containmentcache",
+            index=models.Index(
+                fields=["container", "depth"],
+                name="cc_container_depth_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="containmentcache",
+            index=models.Index(
+                fields=["content"],
+                name="containmentcache_content_idx",
+            ),
+        ),
+        migrations.RunPython(populate_containment_cache, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,133 @@
+# Generated manually for implicit default ACLs
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+import moo.core.acl_cache
+import moo.core.utils
+
+KINDS = {"object": "Object", "verb": "Verb", "property": "Property"}
+
+
+def _default_grants(Permission, kind):
+    """
+    Map each default ``(group, permission name)`` to a permission id, or return
+    None on a database that has not been bootstrapped yet.
+    """
+    grants = moo.core.utils.default_permission_grants(kind)
+    ids = dict(Permission.objects.filter(name__in={p for _, p in grants}).values_list("name", "id"))
+    if len(ids) != len({p for _, p in grants}):
+        return None
+    return [(group, ids[permission]) for group, permission in grants]
+
+
+def strip_default_rows(apps, schema_editor):
+    """
+    Mark every entity that carries the full default policy as implicit and delete
+    its three default rows. Entities missing any default row keep their rows and
+    stay explicit, so their effective permissions are unchanged.
+
+    The historical models bypass the ``Access`` signals and queryset, so the
+    compiled ACLs are flushed once at the end.
+    """
+    if not getattr(settings, "MOO_IMPLICIT_DEFAULT_ACLS", True):
+        return
+    Access = apps.get_model("core", "Access")
+    Permission = apps.get_model("core", "Permission")
+    for kind, model_name in KINDS.items():
+        grants = _default_grants(Permission, kind)
+        if grants is None:
+            break
+        Model = apps.get_model("core", model_name)
+        default_rows = [
+            Access.objects.filter(
+                **{kind: OuterRef("pk")},
+                rule="allow",
+                type="group",
+                group=group,
+                permission_id=permission_id,
+                weight=0,
+            )
+            for group, permission_id in grants
+        ]
+        Model.objects.filter(*[Exists(rows) for rows in default_rows]).update(_implicit_acl=True)
+        for group, permission_id in grants:
+            Access.objects.filter(
+                **{f"{kind}___implicit_acl": True},
+                rule="allow",
+                type="group",
+                group=group,
+                permission_id=permission_id,
+                weight=0,
+            ).delete()
+    moo.core.acl_cache.flush()
+
+
+def restore_default_rows(apps, schema_editor):
+    """
+    Materialize the default rows again for every implicit entity.
+    """
+    Access = apps.get_model("core", "Access")
+    Permission = apps.get_model("core", "Permission")
+    for kind, model_name in KINDS.items():
+        grants = _default_grants(Permission, kind)
+        if grants is None:
+            break
+        Model = apps.get_model("core", model_name)
+        pks = list(Model.objects.filter(_implicit_acl=True).values_list("pk", flat=True))
+        rows = []
+        for pk in pks:
+            for group, permission_id in grants:
+                rows.append(
+                    Access(**{f"{kind}_id": pk}, rule="allow", type="group", group=group, permission_id=permission_id)
+                )
+            if len(rows) >= 500:
+                Access.objects.bulk_create(rows, ignore_conflicts=True)
+                rows = []
+        if rows:
+            Access.objects.bulk_create(rows, ignore_conflicts=True)
+        Model.objects.filter(pk__in=pks).update(_implicit_acl=False)
+    moo.core.acl_cache.flush()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0039_containment_cache"),
+    ]
+
+    operations = [
+        # Existing rows start explicit; strip_default_rows decides which can go
+        # implicit. The callable default only applies to rows created afterwards.
+        migrations.AddField(
+            model_name="object",
+            name="_implicit_acl",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="verb",
+            name="_implicit_acl",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="property",
+            name="_implicit_acl",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(strip_default_rows, restore_default_rows),
+        migrations.AlterField(
+            model_name="object",
+            name="_implicit_acl",
+            field=models.BooleanField(default=moo.core.utils.implicit_default_acls),
+        ),
+        migrations.AlterField(
+            model_name="verb",
+            name="_implicit_acl",
+            field=models.BooleanField(default=moo.core.utils.implicit_default_acls),
+        ),
+        migrations.AlterField(
+            model_name="property",
+            name="_implicit_acl",
+            field=models.BooleanField(default=moo.core.utils.implicit_default_acls),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:57
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0040_implicit_default_acls"),
+        ("sites", "0002_alter_domain_unique"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="alias",
+            index=models.Index(django.db.models.functions.text.Lower("alias"), name="alias_lower_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="object",
+            index=models.Index(django.db.models.functions.text.Lower("name"), name="object_name_lower_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="verbname",
+            index=models.Index(django.db.models.functions.text.Lower("name"), name="verbname_name_lower_idx"),
+        ),
+    ]
@@ -7,8 +7,10 @@ import logging
 from typing import Any
 
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
-from .. import code
+from .. import acl_cache, code
 
 _PERM_ID_CACHE_KEY = "__permission_id_cache__"
 
@@ -102,6 +104,41 @@ class AppendOnlyQuerySet(models.QuerySet):
 AppendOnlyManager = models.Manager.from_queryset(AppendOnlyQuerySet)
 
 
+class AccessQuerySet(models.QuerySet):
+    """
+    QuerySet whose bulk writes keep compiled ACLs current.
+
+    bulk_create()/bulk_update() and update() skip the post_save signal that
+    :func:`access_changed` relies on, so they drop the compiled ACLs
+    themselves: those of the written rows' subjects, or all of them (see
+    :func:`moo.core.acl_cache.flush`) when rows may have moved between
+    subjects. QuerySet.delete() sends post_delete and needs nothing extra.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        acl_cache.invalidate_rows(created)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        updated = super().bulk_update(objs, fields, *args, **kwargs)
+        if {"object", "verb", "property"}.intersection(f.removesuffix("_id") for f in fields):
+            acl_cache.flush()
+        else:
+            acl_cache.invalidate_rows(objs)
+        return updated
+
+    def update(self, **kwargs):
+        updated = super().update(**kwargs)
+        if updated:
+            acl_cache.flush()
+        return updated
+
+
+AccessManager = models.Manager.from_queryset(AccessQuerySet)
+
+
 class AccessibleMixin:
     """
     The base class for all Objects, Verbs, and Properties.
@@ -167,12 +204,6 @@ class AccessibleMixin:
             accessor=None if isinstance(accessor, str) else accessor,
             group=accessor if isinstance(accessor, str) else None,
         )
-        # Evict any cached True results for this subject — a new deny rule may flip them.
-        cache = code.ContextManager.get_perm_cache()
-        if cache is not None:
-            evict = [k for k in cache if k[0] == "perm" and k[3] == self.kind and k[4] == self.pk]
-            for k in evict:
-                del cache[k]
 
 
 class Permission(models.Model):
@@ -202,6 +233,8 @@ class Access(models.Model):
     group = models.CharField(max_length=8, null=True, choices=[(x, x) for x in ("everyone", "owners", "wizards")])
     weight = models.IntegerField(default=0)
 
+    objects = AccessManager()
+
     def actor(self):
         return self.accessor if self.type == "accessor" else self.group
 
@@ -256,3 +289,17 @@ class Access(models.Model):
             entity=self.entity(),
             weight=self.weight,
         )
+
+
+@receiver(post_save, sender=Access)
+@receiver(post_delete, sender=Access)
+def access_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the compiled ACL of the subject whose rules changed. Connected as a
+    signal rather than in save()/delete() so cascades and QuerySet.delete()
+    are covered too.
+    """
+    for kind in ("object", "verb", "property"):
+        pk = getattr(instance, f"{kind}_id")
+        if pk is not None:
+            acl_cache.invalidate(kind, pk)
@@ -6,8 +6,11 @@ Authentication support.
 from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
 from django.db import models
 from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 
+from .. import acl_cache, attribute_cache, code, presence
 from .acl import WizardGuardedManager, require_wizard
 
 
@@ -111,6 +114,13 @@ class Player(models.Model):
         who = self.user.username if self.user else (self.avatar.name if self.avatar else "anonymous")
         return f"Player#{self.pk} ({who})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so player_changed() can reroute the avatar it is leaving.
+        instance._original_avatar_id = instance.__dict__.get("avatar_id")  # pylint: disable=protected-access
+        return instance
+
     def save(self, *args, **kwargs):
         require_wizard("write", self)
         super().save(*args, **kwargs)
@@ -120,6 +130,41 @@ class Player(models.Model):
         return super().delete(*args, **kwargs)
 
 
+def connected_avatars(avatar_pks) -> set:
+    """
+    Return the avatars among `avatar_pks` that have a live session.
+
+    Connection state is the site's presence registry (see
+    :mod:`moo.core.presence`), which is read in a single call that only
+    touches the given avatars' sessions.
+
+    :param avatar_pks: an iterable of avatar pks
+    :return: the avatar pks with at least one connected session
+    """
+    return presence.connected(avatar_pks)
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def player_changed(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Forget the session's memoized wizard bits (see :meth:`.Object.is_wizard`)
+    and the read checks that may have relied on them when a Player changes,
+    so a grant or revocation in the middle of a task is seen by the next
+    check. The previous avatar is not known here, so every entry is dropped.
+
+    The session routes cached for the avatar it is bound to, and the one it
+    was loaded with, are invalidated (see :func:`moo.core._session_routes`).
+    """
+    for avatar_id in {instance.avatar_id, getattr(instance, "_original_avatar_id", None)} - {None}:
+        attribute_cache.invalidate(avatar_id)
+    perm_cache = code.ContextManager.get_perm_cache()
+    if perm_cache:
+        for key in [k for k in perm_cache if isinstance(k, tuple) and k[0] == "wizard"]:
+            del perm_cache[key]
+        acl_cache.forget_session_reads()
+
+
 class UniversalWizard(models.Model):
     """A user marked for cross-universe wizard rights.
 
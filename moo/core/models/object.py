@@ -4,11 +4,14 @@ The primary Object class
 """
 
 import logging
+import threading
+import time
 
 from django.contrib.sites.models import Site
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.db.models import IntegerField, Value
 from django.db.models.expressions import F
+from django.db.models.functions import Lower
 from django.db.models.query import Q, QuerySet
 from django.db.models.signals import m2m_changed
 from django.dispatch import receiver
@@ -17,12 +20,12 @@ from django.core.cache import cache
 from django_cte import CTE, with_cte
 
 from moo import bootstrap
-from .. import exceptions, invoke, utils
+from .. import acl_cache, attribute_cache, exceptions, invoke, utils
 from ..managers import SiteManager, get_default_site
 from ..exceptions import NoSuchVerbError, NoSuchPropertyError
 from ..code import ContextManager
-from .acl import Access, AccessibleMixin, Permission, _get_permission_id
-from .auth import Player
+from .acl import AccessibleMixin, Permission, _get_permission_id
+from .auth import Player, connected_avatars
 from .property import Property
 from .verb import Verb, PrepositionName, PrepositionSpecifier, VerbName
 
@@ -42,6 +45,50 @@ _CACHE_VERB_MISSING = "__moo:verb:missing__"
 # Sentinel returned by cache.get() when a key is absent (never stored in the cache).
 _CACHE_MISS = object()
 
+# Bumped by every write that can change what a command's noun phrases resolve
+# to: moving, renaming, creating or deleting an object, or changing an alias.
+# A parse.CommandScope built before the bump is rebuilt rather than reused.
+# The process-local counter answers the checks made within one command; the
+# copy in the cache backend also sees writes made by other processes, and is
+# checked before a scope is carried over to the next command fragment.
+_scope_generation = 0
+_scope_generation_lock = threading.Lock()
+SCOPE_GENERATION_KEY = "moo:scope:generation"
+
+
+def scope_generation() -> int:
+    """
+    Return the current containment generation for this process.
+    """
+    return _scope_generation
+
+
+def shared_scope_generation():
+    """
+    Return the containment generation shared by every process, or ``None`` if
+    nothing has bumped it since the cache backend was last cleared.
+    """
+    return cache.get(SCOPE_GENERATION_KEY)
+
+
+def _incr_shared_scope_generation():
+    try:
+        cache.incr(SCOPE_GENERATION_KEY)
+    except ValueError:
+        # Seeded from the clock so an evicted counter never counts back up
+        # to a value a live scope recorded.
+        cache.add(SCOPE_GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def _bump_scope_generation():
+    global _scope_generation  # pylint: disable=global-statement
+    with _scope_generation_lock:
+        _scope_generation += 1
+    # Again on commit, so a scope another process built from pre-commit rows
+    # is not reused either.
+    _incr_shared_scope_generation()
+    transaction.on_commit(_incr_shared_scope_generation)
+
 
 def _make_ancestors_cte(self_pk, name="ancestors"):
     """
@@ -221,6 +268,11 @@ class Object(models.Model, AccessibleMixin):
     #: subsequent parent changes.
     _initialized = models.BooleanField(default=False)
 
+    #: Set when the entity was created without materialized default ``Access``
+    #: rows; ``is_allowed()`` then applies the default policy implicitly. See
+    #: ``MOO_IMPLICIT_DEFAULT_ACLS``.
+    _implicit_acl = models.BooleanField(default=utils.implicit_default_acls)
+
     #: Soft-delete flag. A recycled object keeps its id and
     #: all inbound references but is hidden from the site-scoped default manager
     #: (so it vanishes from rooms, lookups, and the parser) until it is restored
@@ -237,6 +289,7 @@ class Object(models.Model, AccessibleMixin):
                 name="unique_name_per_site",
             )
         ]
+        indexes = [models.Index(Lower("name"), name="object_name_lower_idx")]
 
     _original_owner = None
     _original_location = None
@@ -278,8 +331,18 @@ class Object(models.Model, AccessibleMixin):
     def is_wizard(self) -> bool:
         """
         Check if this object is a wizard player avatar.
+
+        The answer is remembered for the rest of the session, since the
+        sandbox guards and permission checks ask it on every access.
         """
-        return Player.objects.filter(avatar=self, wizard=True).exists()
+        perm_cache = ContextManager.get_perm_cache()
+        wizard_key = ("wizard", self.pk)
+        if perm_cache is not None and wizard_key in perm_cache:
+            return perm_cache[wizard_key]
+        is_wizard = Player.objects.filter(avatar=self, wizard=True).exists()
+        if perm_cache is not None:
+            perm_cache[wizard_key] = is_wizard
+        return is_wizard
 
     def is_connected(self) -> bool:
         """
@@ -288,14 +351,15 @@ class Object(models.Model, AccessibleMixin):
         Non-player objects always return ``True`` so that custom ``tell`` verbs
         on room fixtures and other objects continue to receive messages normally.
 
-        For player avatars, connection state is tracked via a Redis cache key
-        (``moo:connected:{user_pk}``) that is set by the SSH shell at login and
-        deleted at logout.  This is cross-process and has no timing window.
+        For player avatars, connection state is the site's presence registry
+        (see :mod:`moo.core.presence`), which the SSH shell joins at login and
+        leaves at logout. A connected avatar is answered from it alone; the
+        Player table is only consulted to tell a disconnected player from a
+        non-player.
         """
-        players = Player.objects.filter(avatar=self)
-        if not players.exists():
+        if connected_avatars([self.pk]):
             return True
-        return any(bool(cache.get(f"moo:connected:{p.user.pk}")) for p in players if p.user is not None)
+        return not Player.objects.filter(avatar=self).exists()
 
     def is_named(self, name: str) -> bool:
         """
@@ -305,7 +369,7 @@ class Object(models.Model, AccessibleMixin):
             return True
         if "aliases" in getattr(self, "_prefetched_objects_cache", {}):
             return any(a.alias.lower() == name.lower() for a in self.aliases.all())
-        return self.aliases.filter(alias__iexact=name).exists()
+        return self.aliases.filter(alias__lower=name.lower()).exists()
 
     def find(self, name: str, exclude_hidden_placement: bool = False) -> 'QuerySet["Object"]':
         """
@@ -317,11 +381,7 @@ class Object(models.Model, AccessibleMixin):
             Used by the parser to make hidden objects unfindable by name.
         """
         self.can_caller("read", self)
-        qs = (
-            Object.objects.filter(location=self)
-            .filter(Q(name__iexact=name) | Q(aliases__alias__iexact=name))
-            .distinct()
-        )
+        qs = Object.objects.filter(location=self).filter(Q(name__lower=name.lower()) | Q(pk__in=_alias_owners(name)))
         if exclude_hidden_placement:
             qs = qs.exclude(placement_prep__in=settings.HIDDEN_PLACEMENT_PREPS)
         return qs
@@ -360,7 +420,8 @@ class Object(models.Model, AccessibleMixin):
         :param obj: the object to search for
         :return: True if `obj` is found in the content tree of this object
         """
-        return self.get_contents().filter(pk=obj.pk).exists()
+        self.can_caller("read", self)
+        return ContainmentCache.objects.filter(container=self, content=obj).exists()
 
     def is_a(self, obj: "Object") -> bool:
         """
@@ -429,28 +490,10 @@ class Object(models.Model, AccessibleMixin):
         Each Object is annotated with a ``depth`` attribute (1 = direct content).
         """
         self.can_caller("read", self)
-        self_pk = self.pk
-
-        def make_cte(cte):
-            return (
-                Object.objects.filter(pk=self_pk)
-                .values(object_id=F("id"), depth=Value(0, output_field=IntegerField()))
-                .union(
-                    cte.join(Object, location_id=cte.col.object_id).values(
-                        object_id=F("id"),
-                        depth=cte.col.depth + Value(1, output_field=IntegerField()),
-                    ),
-                    all=True,
-                )
-            )
-
-        cte = CTE.recursive(make_cte)
-        return with_cte(
-            cte,
-            select=cte.join(Object, id=cte.col.object_id)
-            .annotate(depth=cte.col.depth)
-            .filter(depth__gt=0)
-            .order_by("depth"),
+        return (
+            Object.objects.filter(containment_cache__container=self)
+            .annotate(depth=F("containment_cache__depth"))
+            .order_by("depth")
         )
 
     def add_verb(
@@ -537,13 +580,10 @@ class Object(models.Model, AccessibleMixin):
                     for recurse_flag in (True, False):
                         for return_first_flag in (True, False):
                             vcache.pop((self.pk, item, recurse_flag, return_first_flag), None)
-        # Evict cross-session Redis verb cache entries for this object.
-        if getattr(settings, "MOO_ATTRIB_CACHE_TTL", 120) > 0:
-            for name in names:
-                for item in utils.expand_wildcard(name):
-                    for recurse_flag in (True, False):
-                        for return_first_flag in (True, False):
-                            cache.delete(f"moo:verb:{self.pk}:{item}:{int(recurse_flag)}:{int(return_first_flag)}")
+        # Advance the attribute generation so cross-session entries for this
+        # object and everything that inherits from it are orphaned. Replaced names were removed with a queryset
+        # delete, which bypasses VerbName.delete(), so this is not redundant.
+        attribute_cache.invalidate(self.pk)
         return verb
 
     def add_alias(self, alias: str) -> bool:
@@ -644,17 +684,40 @@ class Object(models.Model, AccessibleMixin):
                 raise NoSuchVerbError(name)
             return cached
 
+        # Both cross-session tiers key on the object's attribute generation, so
+        # a write to this object or to any ancestor orphans the entries at once.
+        _cache_ttl = getattr(settings, "MOO_ATTRIB_CACHE_TTL", 120)
+        generation = None
+        if _cache_ttl > 0 or attribute_cache.is_enabled():
+            generation = attribute_cache.generation(self.pk)
+
+        # Process-local LRU — holds materialized Verb instances, so a hit skips
+        # both the Redis round-trip and the re-fetch a Redis hit still needs.
+        local_key = None
+        if attribute_cache.is_enabled():
+            local_key = ("verb", *cache_key)
+            cached = attribute_cache.local_cache.get(local_key, generation)
+            if cached is not attribute_cache.MISSING:
+                result = attribute_cache.clone(cached)
+                if vcache is not None:
+                    vcache[cache_key] = result
+                if result is None:
+                    raise NoSuchVerbError(name)
+                return result
+
         # Cross-session Redis cache — stores comma-separated verb PKs to avoid the
         # expensive AncestorCache JOIN on repeated lookups across requests.
-        # Bypassed when MOO_ATTRIB_CACHE_TTL=0 (e.g. tests).
-        _cache_ttl = getattr(settings, "MOO_ATTRIB_CACHE_TTL", 120)
-        redis_key = None if _cache_ttl == 0 else f"moo:verb:{self.pk}:{name}:{int(recurse)}:{int(return_first)}"
+        # Bypassed when MOO_ATTRIB_CACHE_TTL=0.
+        redis_key = (
+            None if _cache_ttl == 0 else f"moo:verb:{generation}:{self.pk}:{name}:{int(recurse)}:{int(return_first)}"
+        )
         if redis_key is not None:
             raw = cache.get(redis_key, _CACHE_MISS)
             if raw is not _CACHE_MISS:
                 if raw == _CACHE_VERB_MISSING:
                     if vcache is not None:
                         vcache[cache_key] = None
+                    attribute_cache.remember(local_key, generation, None)
                     raise NoSuchVerbError(name)
                 pks = [int(p) for p in raw.split(",")]
                 result = list(
@@ -665,6 +728,7 @@ class Object(models.Model, AccessibleMixin):
                 if result:
                     if vcache is not None:
                         vcache[cache_key] = result
+                    attribute_cache.remember(local_key, generation, result)
                     return result
                 # Stale cache entry — PKs no longer exist (e.g. after moo_reset).
                 # Evict and fall through to the DB query below.
@@ -680,6 +744,7 @@ class Object(models.Model, AccessibleMixin):
         if result:
             if vcache is not None:
                 vcache[cache_key] = result
+            attribute_cache.remember(local_key, generation, result)
             if redis_key is not None:
                 cache.set(redis_key, ",".join(str(v.pk) for v in result), timeout=_cache_ttl)
             return result
@@ -687,6 +752,7 @@ class Object(models.Model, AccessibleMixin):
         if not recurse:
             if vcache is not None:
                 vcache[cache_key] = None
+            attribute_cache.remember(local_key, generation, None)
             if redis_key is not None:
                 cache.set(redis_key, _CACHE_VERB_MISSING, timeout=_cache_ttl)
             raise NoSuchVerbError(name)
@@ -707,6 +773,7 @@ class Object(models.Model, AccessibleMixin):
         if not result:
             if vcache is not None:
                 vcache[cache_key] = None
+            attribute_cache.remember(local_key, generation, None)
             if redis_key is not None:
                 cache.set(redis_key, _CACHE_VERB_MISSING, timeout=_cache_ttl)
             raise NoSuchVerbError(name)
@@ -717,6 +784,7 @@ class Object(models.Model, AccessibleMixin):
             ]
         if vcache is not None:
             vcache[cache_key] = result
+        attribute_cache.remember(local_key, generation, result)
         if redis_key is not None:
             cache.set(redis_key, ",".join(str(v.pk) for v in result), timeout=_cache_ttl)
         return result
@@ -753,12 +821,8 @@ class Object(models.Model, AccessibleMixin):
         if pcache is not None:
             for recurse_flag in (True, False):
                 pcache.pop((self.pk, name, recurse_flag), None)
-        # Evict the cross-session cache for this object's property.
-        # Descendant caches are intentionally not invalidated here — they will
-        # expire naturally within MOO_ATTRIB_CACHE_TTL, which is acceptable for gameplay.
-        if getattr(settings, "MOO_ATTRIB_CACHE_TTL", 120) > 0:
-            for recurse_flag in (True, False):
-                cache.delete(f"moo:prop:{self.pk}:{name}:{int(recurse_flag)}")
+        # Cross-session entries for this object and its descendants are
+        # invalidated by the attribute generation bump in Property.save().
 
     def get_property(self, name, recurse=True, original=False):
         """
@@ -782,23 +846,48 @@ class Object(models.Model, AccessibleMixin):
                 raise NoSuchPropertyError(name)
             return cached
 
+        # Both cross-session tiers key on the object's attribute generation, so
+        # a write to this object or to any ancestor orphans the entries at once.
+        # Neither applies to original=True (returns a Property ORM object, not cacheable).
+        _cache_ttl = getattr(settings, "MOO_ATTRIB_CACHE_TTL", 120)
+        generation = None
+        if not original and (_cache_ttl > 0 or attribute_cache.is_enabled()):
+            generation = attribute_cache.generation(self.pk)
+
+        # Process-local LRU of decoded values. Keyed by site as well, since
+        # moojson.loads() resolves cross-site Object references to $nothing.
+        local_key = None
+        if not original and attribute_cache.is_enabled():
+            site = ContextManager.get_site()
+            local_key = ("prop", self.pk, name, recurse, site.pk if site is not None else None)
+            cached = attribute_cache.local_cache.get(local_key, generation)
+            if cached is not attribute_cache.MISSING:
+                if cached is _PROP_MISSING:
+                    if session_key is not None:
+                        pcache[session_key] = _PROP_MISSING
+                    raise NoSuchPropertyError(name)
+                value = attribute_cache.clone(cached)
+                if session_key is not None:
+                    pcache[session_key] = value
+                return value
+
         # Cross-session cache — stores raw moojson text to avoid serialization
         # issues with Object references.  _CACHE_PROP_MISSING marks confirmed misses.
         # Bypassed for original=True (returns a Property ORM object, not cacheable).
-        # Bypassed when MOO_ATTRIB_CACHE_TTL=0 (e.g. tests, where the in-process cache
-        # does not reset between test cases and would poison subsequent tests).
-        _cache_ttl = getattr(settings, "MOO_ATTRIB_CACHE_TTL", 120)
-        cache_key = None if (original or _cache_ttl == 0) else f"moo:prop:{self.pk}:{name}:{int(recurse)}"
+        # Bypassed when MOO_ATTRIB_CACHE_TTL=0.
+        cache_key = None if (original or _cache_ttl == 0) else f"moo:prop:{generation}:{self.pk}:{name}:{int(recurse)}"
         if cache_key is not None:
             raw = cache.get(cache_key, _CACHE_MISS)
             if raw is not _CACHE_MISS:
                 if raw == _CACHE_PROP_MISSING:
                     if session_key is not None:
                         pcache[session_key] = _PROP_MISSING
+                    attribute_cache.remember(local_key, generation, _PROP_MISSING)
                     raise NoSuchPropertyError(name)
                 value = moojson.filter_nothing(moojson.loads(raw))
                 if session_key is not None:
                     pcache[session_key] = value
+                attribute_cache.remember(local_key, generation, value)
                 return value
 
         # Self always takes priority
@@ -807,6 +896,7 @@ class Object(models.Model, AccessibleMixin):
             value = prop if original else moojson.filter_nothing(moojson.loads(prop.value))
             if session_key is not None:
                 pcache[session_key] = value
+            attribute_cache.remember(local_key, generation, value)
             if cache_key is not None:
                 cache.set(cache_key, prop.value if prop.value is not None else "null", timeout=_cache_ttl)
             return value
@@ -814,6 +904,7 @@ class Object(models.Model, AccessibleMixin):
         if not recurse:
             if session_key is not None:
                 pcache[session_key] = _PROP_MISSING
+            attribute_cache.remember(local_key, generation, _PROP_MISSING)
             if cache_key is not None:
                 cache.set(cache_key, _CACHE_PROP_MISSING, timeout=_cache_ttl)
             raise NoSuchPropertyError(name)
@@ -833,12 +924,14 @@ class Object(models.Model, AccessibleMixin):
         if prop is None:
             if session_key is not None:
                 pcache[session_key] = _PROP_MISSING
+            attribute_cache.remember(local_key, generation, _PROP_MISSING)
             if cache_key is not None:
                 cache.set(cache_key, _CACHE_PROP_MISSING, timeout=_cache_ttl)
             raise NoSuchPropertyError(name)
         value = prop if original else moojson.filter_nothing(moojson.loads(prop.value))
         if session_key is not None:
             pcache[session_key] = value
+        attribute_cache.remember(local_key, generation, value)
         if cache_key is not None:
             cache.set(cache_key, prop.value if prop.value is not None else "null", timeout=_cache_ttl)
         return value
@@ -846,8 +939,9 @@ class Object(models.Model, AccessibleMixin):
     def get_property_objects(self, name, prefetch_related=None, select_related=None):
         """
         Like :meth:`get_property`, but when the stored value is a list of Objects,
-        returns them via a single bulk ``IN`` query with optional prefetches instead
-        of the N individual ``get()`` calls that :func:`moojson.loads` would issue.
+        returns them as a QuerySet with optional prefetches. :func:`moojson.loads`
+        already resolves a list with one ``IN`` query, so this is only needed when
+        the related rows should be joined or prefetched as well.
 
         Falls back to :meth:`get_property` for non-list or non-Object values.
 
@@ -954,6 +1048,11 @@ class Object(models.Model, AccessibleMixin):
         from ...sdk.audit import record_action  # pylint: disable=import-outside-toplevel
 
         record_action("destroy", target=self)
+        attribute_cache.invalidate(self.pk)
+        _bump_scope_generation()
+        # Contents fall out to nowhere (location SET_NULL), so their rows for
+        # this object's containers must go; rows naming this object cascade.
+        _detach_contents_of(self)
         super().delete(*args, **kwargs)
 
     def save(self, *args, **kwargs):
@@ -993,13 +1092,9 @@ class Object(models.Model, AccessibleMixin):
             # ACL Check: to change owner, caller must be allowed to `entrust` on this object
             original_owner_id = self._original_owner
             if original_owner_id != self.owner_id and self.owner_id:
-                # Ownership affects the "owners" group match in is_allowed(), so evict any
-                # cached permission results for this object before checking entrust.
-                perm_cache = ContextManager.get_perm_cache()
-                if perm_cache is not None:
-                    evict = [k for k in perm_cache if k[0] == "perm" and k[3] == self.kind and k[4] == self.pk]
-                    for k in evict:
-                        del perm_cache[k]
+                # Ownership affects the "owners" group match in is_allowed(), so drop the
+                # compiled ACL for this object before checking entrust.
+                acl_cache.invalidate(self.kind, self.pk)
                 self.can_caller("entrust", self)
             # ACL Check: `write` is only required when a non-ACL field changed. Owner/location
             # have their own granular checks (entrust/move) above and below; for those fields
@@ -1056,6 +1151,10 @@ class Object(models.Model, AccessibleMixin):
                             _thing, verb=_verb, _caller=_c, _player=_p
                         )
                     )
+            if original_location_id != self.location_id:
+                _rebuild_containment_cache_for(self)
+            if non_acl_field_changed or original_location_id != self.location_id:
+                _bump_scope_generation()
             # Re-baseline change-tracking so subsequent saves on the same Python
             # instance compare against the just-persisted state. Without this, a
             # freshly created object (which never passes through from_db) keeps
@@ -1101,66 +1200,19 @@ class Object(models.Model, AccessibleMixin):
         :param fatal: if True, raise a :class:`.PermissionError` instead of returning False
         :raises PermissionError: if permission is denied and `fatal` is set to True
         """
-        # Per-session cache: only True results are cached so that exact error messages
-        # (denied vs. no rules) are preserved on the uncached False path.
-        perm_cache = ContextManager.get_perm_cache()
-        cache_key = ("perm", self.pk, permission, subject.kind, subject.pk)
-        if perm_cache is not None and cache_key in perm_cache:
-            return True
-
         # Resolve permission ids from the process-level cache (Permission table is static).
-        perm_id = _get_permission_id(permission)
+        mask = 1 << _get_permission_id(permission)
         try:
-            anything_id = _get_permission_id("anything")
-            perms = [perm_id, anything_id]
+            mask |= 1 << _get_permission_id("anything")
         except Permission.DoesNotExist:
-            perms = [perm_id]
-
-        # Build subject filter once
-        subject_filter = Q()
-        if subject.kind == "object":
-            subject_filter = Q(object=subject)
-        elif subject.kind == "verb":
-            subject_filter = Q(verb=subject)
-        elif subject.kind == "property":
-            subject_filter = Q(property=subject)
-
-        # Cache wizard status to avoid a repeated Player query on every is_allowed() call.
-        wizard_key = ("wizard", self.pk)
-        if perm_cache is not None and wizard_key in perm_cache:
-            is_wizard = perm_cache[wizard_key]
-        else:
-            is_wizard = Player.objects.filter(avatar=self, wizard=True).exists()
-            if perm_cache is not None:
-                perm_cache[wizard_key] = is_wizard
-
-        # Build OR conditions for all matching rules
-        query = (
-            subject_filter
-            & Q(permission_id__in=perms)
-            & (
-                Q(type="accessor", accessor=self)
-                | Q(type="group", group="everyone")
-                | (Q(type="group", group="owners") if self.owns(subject) else Q())
-                | (Q(type="group", group="wizards") if is_wizard else Q())
-            )
-        )
-
-        rules = Access.objects.filter(query).order_by("-rule", "type")
+            pass
 
-        if rules:
-            for rule in rules:
-                if rule.rule == "deny":
-                    if fatal:
-                        raise exceptions.AccessError(self, permission, subject)
-                    return False
-            if perm_cache is not None:
-                perm_cache[cache_key] = True
+        compiled = acl_cache.get_acl(subject)
+        if compiled.decide(mask, self.pk, owner=self.owns(subject), wizard=self.is_wizard()):
             return True
-        elif fatal:
+        if fatal:
             raise exceptions.AccessError(self, permission, subject)
-        else:
-            return False
+        return False
 
 
 # these are the name that django relies on __getattr__ for, there may be others
@@ -1188,6 +1240,7 @@ class Relationship(models.Model):
 class Alias(models.Model):
     class Meta:
         verbose_name_plural = "aliases"
+        indexes = [models.Index(Lower("alias"), name="alias_lower_idx")]
 
     object = models.ForeignKey(Object, related_name="aliases", on_delete=models.CASCADE)
     alias = models.CharField(max_length=255)
@@ -1195,10 +1248,26 @@ class Alias(models.Model):
     def save(self, *args, **kwargs):
         self.object.can_caller("write", self.object)
         super().save(*args, **kwargs)
+        _bump_scope_generation()
 
     def delete(self, *args, **kwargs):
         self.object.can_caller("write", self.object)
         super().delete(*args, **kwargs)
+        _bump_scope_generation()
+
+
+# ``name__lower=`` / ``alias__lower=`` compare against the LOWER() functional
+# indexes declared above; ``__iexact`` compiles to UPPER() or LIKE and cannot
+# use them. Callers pass the value already lowercased.
+Object._meta.get_field("name").register_lookup(Lower)
+Alias._meta.get_field("alias").register_lookup(Lower)
+
+
+def _alias_owners(name):
+    """
+    Subquery of the ids of objects with an alias matching `name`, case-insensitively.
+    """
+    return Alias.objects.filter(alias__lower=name.lower()).values("object_id")
 
 
 class AncestorCache(models.Model):
@@ -1232,54 +1301,139 @@ class AncestorCache(models.Model):
     path_weight = models.IntegerField()
 
 
-def _collect_descendants_pks(root_pk):
+class ContainmentCache(models.Model):
     """
-    Returns the set of all descendant PKs for the given root_pk using direct
-    Relationship queries — no permission checks, safe to call from signal handlers.
+    Denormalized closure of the ``location`` tree for fast indexed probes.
+    Replaces the recursive CTE in contains(), get_contents() and the loop
+    check in Object.save(). Maintained by Object.save() and Object.delete().
     """
-    result = set()
-    queue = list(Relationship.objects.filter(parent_id=root_pk).values_list("child_id", flat=True))
-    while queue:
-        pk = queue.pop()
-        if pk not in result:
-            result.add(pk)
-            queue.extend(Relationship.objects.filter(parent_id=pk).values_list("child_id", flat=True))
-    return result
+
+    class Meta:
+        unique_together = [["container", "content"]]
+        indexes = [
+            models.Index(fields=["container", "depth"], name="cc_container_depth_idx"),
+            models.Index(fields=["content"], name="containmentcache_content_idx"),
+        ]
+
+    #: The containing Object — the row says "``content`` is inside this
+    #: object, ``depth`` levels down".
+    container = models.ForeignKey(Object, related_name="containment_contents", on_delete=models.CASCADE)
+    #: The Object nested somewhere inside ``container``.
+    content = models.ForeignKey(Object, related_name="containment_cache", on_delete=models.CASCADE)
+    #: Number of ``location`` hops from ``content`` up to ``container``.
+    #: ``depth=1`` means ``content.location == container``.
+    depth = models.IntegerField()
+
+
+# Recomputes the AncestorCache rows of a subtree (the re-parented object and
+# its descendants) from rows that the re-parenting cannot have changed.
+#
+# A path from a subtree member D to an ancestor A outside the subtree leaves
+# it exactly once: D reaches some member Y inside the subtree (unchanged rows,
+# or Y = D), takes one Relationship edge Y -> Z out of it, then follows Z's own
+# rows, which are unchanged because Z is not a descendant of the re-parented
+# object. Composing those three pieces and keeping the shortest path (highest
+# first-hop weight among ties) yields exactly what the recursive CTE produced.
+_SUBTREE_ANCESTORS_SQL = """
+INSERT INTO {ac} (descendant_id, ancestor_id, depth, path_weight)
+WITH subtree (id) AS (
+    SELECT %s UNION SELECT descendant_id FROM {ac} WHERE ancestor_id = %s
+),
+inner_paths (descendant_id, via_id, depth, path_weight) AS (
+    SELECT descendant_id, ancestor_id, depth, path_weight FROM {ac}
+    WHERE ancestor_id IN (SELECT id FROM subtree)
+    UNION ALL
+    SELECT id, id, 0, 0 FROM subtree
+),
+exits (via_id, exit_id, weight) AS (
+    SELECT child_id, parent_id, weight FROM {rel}
+    WHERE child_id IN (SELECT id FROM subtree) AND parent_id NOT IN (SELECT id FROM subtree)
+),
+outer_paths (exit_id, ancestor_id, depth) AS (
+    SELECT descendant_id, ancestor_id, depth FROM {ac}
+    WHERE descendant_id IN (SELECT exit_id FROM exits)
+    UNION ALL
+    SELECT DISTINCT exit_id, exit_id, 0 FROM exits
+),
+candidates (descendant_id, ancestor_id, depth, path_weight) AS (
+    SELECT i.descendant_id, o.ancestor_id, i.depth + 1 + o.depth,
+           CASE WHEN i.depth = 0 THEN e.weight ELSE i.path_weight END
+    FROM inner_paths i
+    JOIN exits e ON e.via_id = i.via_id
+    JOIN outer_paths o ON o.exit_id = e.exit_id
+),
+shortest (descendant_id, ancestor_id, depth) AS (
+    SELECT descendant_id, ancestor_id, MIN(depth) FROM candidates GROUP BY descendant_id, ancestor_id
+)
+SELECT c.descendant_id, c.ancestor_id, c.depth, MAX(c.path_weight)
+FROM candidates c
+JOIN shortest s ON s.descendant_id = c.descendant_id AND s.ancestor_id = c.ancestor_id AND s.depth = c.depth
+GROUP BY c.descendant_id, c.ancestor_id, c.depth
+"""
+
+_SUBTREE_DELETE_SQL = """
+DELETE FROM {ac}
+WHERE descendant_id IN (SELECT %s UNION SELECT descendant_id FROM {ac} WHERE ancestor_id = %s)
+AND ancestor_id NOT IN (SELECT %s UNION SELECT descendant_id FROM {ac} WHERE ancestor_id = %s)
+"""
 
 
 def _rebuild_ancestor_cache_for(obj):
     """
     Rebuild the AncestorCache rows for `obj` and all its descendants.
     Called after any parents.add() or parents.remove() signal.
+
+    Rows between members of the subtree rooted at `obj` cannot change when
+    `obj`'s parents do, so only rows pointing out of the subtree are replaced —
+    one set-based DELETE and one INSERT ... SELECT, regardless of subtree size.
     """
-    affected_pks = _collect_descendants_pks(obj.pk)
-    affected_pks.add(obj.pk)
-
-    AncestorCache.objects.filter(descendant_id__in=affected_pks).delete()
-
-    rows = []
-    for pk in affected_pks:
-        ancestors_cte = _make_ancestors_cte(pk)
-        # Deduplicate: for each ancestor keep only the shallowest path
-        # (min depth, and max path_weight among those at min depth).
-        seen = {}
-        for row in with_cte(
-            ancestors_cte,
-            select=ancestors_cte.join(Object, id=ancestors_cte.col.object_id)
-            .annotate(depth=ancestors_cte.col.depth, path_weight=ancestors_cte.col.path_weight)
-            .order_by("depth", "-path_weight"),
-        ).values("id", "depth", "path_weight"):
-            if row["id"] not in seen:
-                seen[row["id"]] = row
-        for row in seen.values():
-            rows.append(
-                AncestorCache(
-                    descendant_id=pk,
-                    ancestor_id=row["id"],
-                    depth=row["depth"],
-                    path_weight=row["path_weight"],
-                )
-            )
+    tables = {"ac": AncestorCache._meta.db_table, "rel": Relationship._meta.db_table}
+    with connection.cursor() as cursor:
+        cursor.execute(_SUBTREE_DELETE_SQL.format(**tables), [obj.pk] * 4)
+        cursor.execute(_SUBTREE_ANCESTORS_SQL.format(**tables), [obj.pk] * 2)
+    attribute_cache.invalidate_subtree(obj.pk)
+
+
+# Containment is a tree (one location per object), so unlike the ancestor
+# closure there is exactly one path between any two objects: the rows of the
+# moved subtree are its in-subtree rows composed with the new location's own
+# rows, plus the new location itself.
+_CONTAINMENT_INSERT_SQL = """
+INSERT INTO {cc} (content_id, container_id, depth)
+WITH subtree (id, depth) AS (
+    SELECT %s, 0 UNION ALL SELECT content_id, depth FROM {cc} WHERE container_id = %s
+),
+containers (id, depth) AS (
+    SELECT %s, 0 UNION ALL SELECT container_id, depth FROM {cc} WHERE content_id = %s
+)
+SELECT s.id, c.id, s.depth + 1 + c.depth FROM subtree s CROSS JOIN containers c
+"""
+
+_CONTAINMENT_DELETE_SQL = """
+DELETE FROM {cc}
+WHERE content_id IN (SELECT %s UNION SELECT content_id FROM {cc} WHERE container_id = %s)
+AND container_id NOT IN (SELECT %s UNION SELECT content_id FROM {cc} WHERE container_id = %s)
+"""
+
 
-    if rows:
-        AncestorCache.objects.bulk_create(rows, ignore_conflicts=True)
+def _rebuild_containment_cache_for(obj):
+    """
+    Re-point the ContainmentCache rows of `obj` and everything inside it at
+    `obj`'s current location. Called by Object.save() when the location changes.
+    """
+    table = ContainmentCache._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(_CONTAINMENT_DELETE_SQL.format(cc=table), [obj.pk] * 4)
+        if obj.location_id is not None:
+            cursor.execute(_CONTAINMENT_INSERT_SQL.format(cc=table), [obj.pk, obj.pk, obj.location_id, obj.location_id])
+
+
+def _detach_contents_of(obj):
+    """
+    Drop the rows linking everything inside `obj` to `obj`'s own containers,
+    ahead of a delete that leaves `obj`'s direct contents without a location.
+    """
+    ContainmentCache.objects.filter(
+        content__in=ContainmentCache.objects.filter(container=obj).values("content"),
+        container__in=ContainmentCache.objects.filter(content=obj).values("container"),
+    ).delete()
@@ -5,7 +5,7 @@ Property model
 
 from django.db import models
 
-from .. import utils
+from .. import attribute_cache, utils
 from .acl import AccessibleMixin
 
 
@@ -37,6 +37,10 @@ class Property(models.Model, AccessibleMixin):
     #: :doc:`/reference/properties` for the LambdaMOO ``c``-bit equivalent
     #: and when to use it.
     inherit_owner = models.BooleanField(default=False)
+    #: Set when the entity was created without materialized default ``Access``
+    #: rows; ``is_allowed()`` then applies the default policy implicitly. See
+    #: ``MOO_IMPLICIT_DEFAULT_ACLS``.
+    _implicit_acl = models.BooleanField(default=utils.implicit_default_acls)
 
     __original_inherit_owner = None
     _original_owner_id = None
@@ -90,6 +94,7 @@ class Property(models.Model, AccessibleMixin):
             if self._original_owner_id != self.owner_id:
                 self.origin.can_caller("entrust", self)  # pylint: disable=no-member
         super().save(*args, **kwargs)
+        attribute_cache.invalidate(self.origin_id)
         if self.inherit_owner and not self.__original_inherit_owner:
             for child in self.origin.get_descendents():  # pylint: disable=no-member
                 Property.objects.update_or_create(
@@ -119,3 +124,4 @@ class Property(models.Model, AccessibleMixin):
     def delete(self, *args, **kwargs):
         self.origin.can_caller("write", self)  # pylint: disable=no-member
         super().delete(*args, **kwargs)
+        attribute_cache.invalidate(self.origin_id)
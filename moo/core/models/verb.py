@@ -9,10 +9,11 @@ import warnings
 from django.conf import settings
 from django.core import validators
 from django.db import models
+from django.db.models.functions import Lower
 
 from moo import bootstrap
-from .. import utils, lookup
-from ..code import interpret, ContextManager
+from .. import attribute_cache, system_object, utils, lookup
+from ..code import check_deadline, interpret, ContextManager
 from .acl import AccessibleMixin, WizardGuardedManager, require_wizard
 
 log = logging.getLogger(__name__)
@@ -96,6 +97,10 @@ class Verb(models.Model, AccessibleMixin):
     #: Indirect object specifiers — one entry per accepted preposition,
     #: each with its own ``this``/``any``/``none`` rule.
     indirect_objects = models.ManyToManyField(PrepositionSpecifier, related_name="+", blank=True)
+    #: Set when the entity was created without materialized default ``Access``
+    #: rows; ``is_allowed()`` then applies the default policy implicitly. See
+    #: ``MOO_IMPLICIT_DEFAULT_ACLS``.
+    _implicit_acl = models.BooleanField(default=utils.implicit_default_acls)
 
     do_not_call_in_templates = True
     _invoked_object = None
@@ -138,6 +143,7 @@ class Verb(models.Model, AccessibleMixin):
         else:
             self.origin.can_caller("write", self)  # pylint: disable=no-member
         super().save(*args, **kwargs)
+        attribute_cache.invalidate(self.origin_id)
         if not needs_default_permissions:
             return
         utils.apply_default_permissions(self)
@@ -145,6 +151,7 @@ class Verb(models.Model, AccessibleMixin):
     def delete(self, *args, **kwargs):
         self.origin.can_caller("write", self)  # pylint: disable=no-member
         super().delete(*args, **kwargs)
+        attribute_cache.invalidate(self.origin_id)
 
     def reload(self):
         self.origin.can_caller("write", self)  # pylint: disable=no-member
@@ -205,6 +212,7 @@ class Verb(models.Model, AccessibleMixin):
     def __call__(self, *args, _bypass_execute_check=False, **kwargs):
         if ContextManager.is_active() and not _bypass_execute_check:
             self.origin.can_caller("execute", self)  # pylint: disable=no-member
+        check_deadline()
         this = None
         name = "__main__"
         if self.is_bound():
@@ -217,14 +225,7 @@ class Verb(models.Model, AccessibleMixin):
             kwargs["filename"] = self.filename
         if this is None:
             raise RuntimeError(f"Cannot call {self} without a non-null 'this' context.")
-        _system_key = "__system_object__"
-        _cache = ContextManager.get_perm_cache()
-        if _cache is not None and _system_key in _cache:
-            system = _cache[_system_key]
-        else:
-            system = lookup("System Object")
-            if _cache is not None:
-                _cache[_system_key] = system
+        system = system_object.get_system()
         active = ContextManager.is_active()
         if active:
             ContextManager.override_caller(
@@ -272,6 +273,7 @@ class VerbName(models.Model):
 
     class Meta:
         constraints = [models.UniqueConstraint("verb", "name", name="unique_verb_name")]
+        indexes = [models.Index(Lower("name"), name="verbname_name_lower_idx")]
 
     def __str__(self):
         return "%s {#%s on %s}" % (self.name, self.verb.id, self.verb.origin)
@@ -279,10 +281,16 @@ class VerbName(models.Model):
     def save(self, *args, **kwargs):
         self.verb.can_caller("write", self.verb)
         super().save(*args, **kwargs)
+        attribute_cache.invalidate(self.verb.origin_id)
 
     def delete(self, *args, **kwargs):
         self.verb.can_caller("write", self.verb)
         super().delete(*args, **kwargs)
+        attribute_cache.invalidate(self.verb.origin_id)
+
+
+# ``names__name__lower=`` uses the functional index above; see Object.name.
+VerbName._meta.get_field("name").register_lookup(Lower)
 
 
 # TODO: add support for additional URL types and connection details
@@ -47,12 +47,29 @@ def clear_nothing_cache() -> None:
     _nothing_cache.clear()
 
 
+class _Ref:
+    """
+    Placeholder for an entity reference, left in the decoded value by the
+    first pass of :func:`loads` and replaced by the entity in the second.
+    """
+
+    __slots__ = ("kind", "pk")
+
+    def __init__(self, kind, pk):
+        self.kind = kind
+        self.pk = pk
+
+
 def loads(j):
-    from .models.object import Object
-    from .models.property import Property
-    from .models.verb import Verb
+    """
+    Decode MOO JSON.
 
-    from .code import ContextManager
+    Entity references are resolved in two phases: parsing collects the
+    referenced primary keys, then each model is fetched with a single
+    ``IN`` query and the references are substituted. A value holding a list
+    of 200 exits therefore costs one query instead of 200.
+    """
+    refs = {"o": set(), "v": set(), "p": set()}
 
     def to_entity(d):
         if len(d) != 1:
@@ -66,34 +83,62 @@ def loads(j):
             return time.fromisoformat(d[key])
         if key == "b#":
             return base64.b64decode(d[key])
-        if len(key) >= 2 and key[1] == "#":
-            if key[0] == "o":
-                try:
-                    obj = Object.global_objects.get(pk=int(key[2:]))
-                    # Cross-universe filtering only applies when a site context
-                    # is active. Outside one — e.g. while Celery deserializes
-                    # task args before invoke_verb's ContextManager is entered
-                    # — pass the object through unchanged; the task body will
-                    # establish its own site.
-                    site = ContextManager.get_site()
-                    if site is not None and obj.site_id != site.pk:
-                        return _get_nothing()
-                    return obj
-                except Object.DoesNotExist:
-                    return _get_nothing()
-            elif key[0] == "v":
-                try:
-                    return Verb.objects.get(pk=int(key[2:]))
-                except Verb.DoesNotExist:
-                    return _get_nothing()
-            elif key[0] == "p":
-                try:
-                    return Property.objects.get(pk=int(key[2:]))
-                except Property.DoesNotExist:
-                    return _get_nothing()
+        if len(key) >= 2 and key[1] == "#" and key[0] in refs:
+            ref = _Ref(key[0], int(key[2:]))
+            refs[ref.kind].add(ref.pk)
+            return ref
         return d
 
-    return json.loads(j, object_hook=to_entity)
+    value = json.loads(j, object_hook=to_entity)
+    if not any(refs.values()):
+        return value
+    return _substitute(value, _resolve_refs(refs))
+
+
+def _resolve_refs(refs):
+    """
+    Fetch every referenced entity with one query per model, and return a
+    mapping of ``(kind, pk)`` to the entity or ``$nothing``.
+    """
+    from .code import ContextManager
+    from .models.object import Object
+    from .models.property import Property
+    from .models.verb import Verb
+
+    resolved = {}
+    if refs["o"]:
+        objects = Object.global_objects.in_bulk(refs["o"])
+        # Cross-universe filtering only applies when a site context is
+        # active. Outside one — e.g. while Celery deserializes task args
+        # before invoke_verb's ContextManager is entered — pass the objects
+        # through unchanged; the task body will establish its own site.
+        site = ContextManager.get_site()
+        for pk in refs["o"]:
+            obj = objects.get(pk)
+            if obj is None or (site is not None and obj.site_id != site.pk):
+                obj = _get_nothing()
+            resolved["o", pk] = obj
+    for kind, model in (("v", Verb), ("p", Property)):
+        if refs[kind]:
+            entities = model.objects.in_bulk(refs[kind])
+            for pk in refs[kind]:
+                entity = entities.get(pk)
+                resolved[kind, pk] = entity if entity is not None else _get_nothing()
+    return resolved
+
+
+def _substitute(value, resolved):
+    if isinstance(value, _Ref):
+        return resolved[value.kind, value.pk]
+    if isinstance(value, list):
+        for i, item in enumerate(value):
+            if isinstance(item, (_Ref, list, dict)):
+                value[i] = _substitute(item, resolved)
+    elif isinstance(value, dict):
+        for k, item in value.items():
+            if isinstance(item, (_Ref, list, dict)):
+                value[k] = _substitute(item, resolved)
+    return value
 
 
 def dumps(obj):
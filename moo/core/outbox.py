@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Per-task output buffering.
+
+Without it every ``write()`` and ``tell`` published its own Kombu envelope in
+the middle of the task, so a verb that wrote ten lines to five players sent
+fifty messages, and output from a transaction that was later rolled back had
+already reached the players.
+
+A :class:`~moo.core.code.ContextManager` opened with ``coalesce_output=True``
+(as the Celery tasks do) gets an :class:`Outbox`. While it is active,
+:func:`moo.core._publish_to_players` hands each line to the outbox with its
+envelope, ``kind`` and provenance already built. A line written inside a
+transaction is kept once it commits and dropped if it, or the savepoint it was
+written in, rolls back. Kept lines are published when the ContextManager
+exits, or when the transaction it exits in commits. The flush sends one
+envelope per recipient: a line on its own is sent as it always was, and
+several are wrapped as ``{"batch": [envelope, ...]}`` in the order they were
+written.
+"""
+
+from django.db import transaction
+
+
+class _Line:
+    """
+    One buffered envelope and the avatars it is addressed to.
+    """
+
+    __slots__ = ("objs", "envelope", "routes", "committed")
+
+    def __init__(self, objs, envelope, routes):
+        self.objs = objs
+        self.envelope = envelope
+        #: avatar pk -> user pks, where the writer already knew them
+        self.routes = routes
+        #: set when the line's transaction commits, or at once outside one
+        self.committed = False
+
+    def commit(self):
+        self.committed = True
+
+
+class Outbox:
+    """
+    The output a task has written to players but not yet published.
+    """
+
+    def __init__(self):
+        self._lines: list[_Line] = []
+
+    def add(self, objs, envelope, routes=None):
+        """
+        Buffer `envelope` for every avatar in `objs`.
+
+        :param routes: ``{avatar pk: user pks}`` the writer already read
+        """
+        line = _Line(tuple(objs), envelope, routes)
+        self._lines.append(line)
+        if transaction.get_connection().in_atomic_block:
+            # Django discards the hook, and so the line, if the transaction or
+            # the savepoint it was registered in rolls back.
+            transaction.on_commit(line.commit)
+        else:
+            line.commit()
+
+    def close(self):
+        """
+        Publish the lines that were kept. Inside a transaction, wait for it to
+        commit first; if it rolls back nothing more is sent.
+        """
+        if transaction.get_connection().in_atomic_block:
+            # Registered after every line's hook, so it runs after them.
+            transaction.on_commit(self._flush)
+        else:
+            self._flush()
+
+    def _flush(self):
+        from . import _publish_envelopes  # pylint: disable=import-outside-toplevel
+
+        lines, self._lines = self._lines, []
+        recipients: dict = {}
+        routes: dict = {}
+        for line in lines:
+            if not line.committed:
+                continue
+            for obj in line.objs:
+                recipients.setdefault(obj.pk, (obj, []))[1].append(line.envelope)
+                if line.routes is not None and obj.pk in line.routes:
+                    routes[obj.pk] = line.routes[obj.pk]
+        if recipients:
+            _publish_envelopes(list(recipients.values()), routes=routes)
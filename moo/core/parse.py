@@ -15,10 +15,10 @@ import re
 from collections import defaultdict
 
 from django.conf import settings
-from django.db.models import F, Value
 from django.db.models.query import QuerySet
 import more_itertools
 
+from . import attribute_cache, system_object, verb_index
 from .exceptions import (
     AmbiguousObjectError,
     NoSuchObjectError,
@@ -27,6 +27,7 @@ from .exceptions import (
     UsageError,
 )
 from .models import Object, Verb
+from .models.object import scope_generation, shared_scope_generation
 
 log = logging.getLogger(__name__)
 
@@ -170,27 +171,31 @@ def interpret(ctx, line):
     canonical adventure-game behaviour where ``take sword. kill troll.``
     runs two turns.
     """
+    scope = None
     for fragment in split_command_fragments(line):
-        _interpret_one(ctx, fragment)
+        scope = _interpret_one(ctx, fragment, scope)
 
 
-def _interpret_one(ctx, line):
-    """Execute a single, already-split command fragment."""
-    from . import context, lookup
+def _interpret_one(ctx, line, scope=None):
+    """
+    Execute a single, already-split command fragment. Returns the
+    :class:`CommandScope` the next fragment may reuse.
+    """
+    from . import context
 
+    player = context.player
+    if scope is None or not scope.is_current(player, shared=True):
+        scope = CommandScope(player)
     lex = Lexer(line)
-    parser = Parser(lex, context.player)
+    parser = Parser(lex, player, scope=scope)
     ctx.set_parser(parser)
 
     # Give database code a chance to handle the command first (LambdaMOO $do_command).
     # If the system object defines a do_command verb and it returns a truthy value,
     # the command is considered fully handled and normal dispatch is skipped.
-    system = Object.objects.get(unique_name=True, name="System Object")
-    if system.has_verb("do_command"):
-        do_command = system.get_verb("do_command")
-        result = do_command(*parser.words)
-        if result:
-            return
+    do_command = scope.get_verb(scope.system, "do_command")
+    if do_command is not None and do_command(*parser.words):
+        return scope
 
     try:
         verb = parser.get_verb()
@@ -201,18 +206,23 @@ def _interpret_one(ctx, line):
         # the player verbatim (NoSuchObjectError: "There is no 'lunch'
         # here." for dead dobjs; NoSuchVerbError: "I don't know how to
         # do that." for unknown verbs).
-        if context.player.location and context.player.location.has_verb("huh"):
-            verb = context.player.location.get_verb("huh")
-        else:
+        huh = scope.get_verb(scope.location, "huh") if scope.location else None
+        if huh is None:
             raise
+        verb = huh
     verb()
 
     # After every parsed command, fire the player's current room's
     # ``turnfunc`` hook (LambdaMOO ``<thing>func`` convention) when the
     # room defines one.  Rooms without a turnfunc are unaffected.
-    location = context.player.location
-    if location and location.has_verb("turnfunc"):
-        location.invoke_verb("turnfunc")
+    if not scope.is_current(player):
+        scope = CommandScope(player)
+    # Like Object.invoke_verb(), the first of several matching turnfuncs runs.
+    turnfunc = scope.get_verb(scope.location, "turnfunc", first=True) if scope.location else None
+    if turnfunc is not None:
+        scope.location.can_caller("execute", turnfunc)
+        turnfunc()
+    return scope
 
 
 def unquote(s):
@@ -373,6 +383,129 @@ class Lexer:
             self.prepositions.setdefault(canonical, []).append([result["spec_str"], result["obj_str"], None])
 
 
+class CommandScope:
+    """
+    What a command can see and dispatch on: the caller, their location, the
+    caller's inventory and the room's contents with their aliases, and the
+    System Object.
+
+    Each part is loaded the first time something asks for it, then reused by
+    the :class:`Parser` (noun phrases and the verb search order), by the
+    ``do_command``, ``huh`` and ``turnfunc`` hooks in :func:`interpret`, and
+    by the later fragments of a ``take sword. kill troll.`` line. Every object
+    move, rename, creation or deletion and every alias change makes existing
+    scopes stale (:meth:`is_current` returns False), and the next command
+    builds a new one.
+
+    Noun-phrase matching follows :meth:`Object.find`: case-insensitive on the
+    name or any alias, and the container is read-checked before it is searched.
+    """
+
+    def __init__(self, caller):
+        self.caller = caller
+        self.location = caller.location
+        self._location_id = caller.location_id
+        self._generation = scope_generation()
+        self._shared_generation = shared_scope_generation()
+        self._containers = frozenset(filter(None, [caller.pk, self._location_id]))
+        self._contents = None
+        self._index = None
+        self._location_aliases = None
+        self._system = None
+        self._verbs = {}
+
+    def is_current(self, caller, shared=False) -> bool:
+        """
+        True if this scope still describes what `caller` can see.
+
+        :param shared: also account for writes made by other processes, at the
+            cost of a cache read; used before reusing a scope for a new fragment
+        """
+        return (
+            caller.pk == self.caller.pk
+            and caller.location_id == self._location_id
+            and self._generation == scope_generation()
+            and (not shared or self._shared_generation == shared_scope_generation())
+        )
+
+    def _load(self):
+        # Query 1 loads the inventory and the room's contents; query 2 is the
+        # aliases prefetch, which also serves Object.is_named() for the verb
+        # search order.
+        self._contents = list(Object.objects.filter(location_id__in=self._containers).prefetch_related("aliases"))
+        #: container pk -> lowercased name or alias -> matching contents
+        self._index = {pk: {} for pk in self._containers}
+        for obj in self._contents:
+            index = self._index[obj.location_id]
+            for key in {obj.name.lower(), *(a.alias.lower() for a in obj.aliases.all())}:
+                index.setdefault(key, []).append(obj)
+
+    @property
+    def inventory(self) -> list:
+        """
+        The caller's contents.
+        """
+        if self._contents is None:
+            self._load()
+        return [obj for obj in self._contents if obj.location_id == self.caller.pk]
+
+    @property
+    def location_aliases(self) -> frozenset:
+        """
+        The lowercased aliases of the caller's location.
+        """
+        if self._location_aliases is None:
+            aliases = self.location.aliases.values_list("alias", flat=True) if self.location else []
+            self._location_aliases = frozenset(alias.lower() for alias in aliases)
+        return self._location_aliases
+
+    @property
+    def system(self):
+        """
+        The System Object.
+        """
+        if self._system is None:
+            self._system = system_object.get_system()
+        return self._system
+
+    def get_verb(self, obj, name, first=False):
+        """
+        Return `obj`'s verb called `name`, or ``None`` if it has none. Each
+        lookup runs once per scope, and again once a write to `obj` or one of
+        its ancestors (say, an ``add_verb`` in an earlier fragment) changes
+        its attribute generation.
+
+        :param first: return the first of several matching verbs instead of
+            raising :class:`~.exceptions.AmbiguousVerbError`
+        """
+        key = (obj.pk, name, first)
+        generation = attribute_cache.generation(obj.pk) if attribute_cache.generations_enabled() else None
+        cached = self._verbs.get(key)
+        if cached is not None and generation is not None and cached[0] == generation:
+            return cached[1]
+        try:
+            verb = obj.get_verb(name, allow_ambiguous=first)[0] if first else obj.get_verb(name)
+        except NoSuchVerbError:
+            verb = None
+        self._verbs[key] = (generation, verb)
+        return verb
+
+    def covers(self, container) -> bool:
+        return container.pk in self._containers
+
+    def find(self, container, name, exclude_hidden_placement=False) -> list:
+        """
+        In-memory :meth:`Object.find` on a container this scope covers.
+        """
+        container.can_caller("read", container)
+        if self._index is None:
+            self._load()
+        matches = self._index[container.pk].get(name.lower(), [])
+        if exclude_hidden_placement:
+            return [obj for obj in matches if obj.placement_prep not in settings.HIDDEN_PLACEMENT_PREPS]
+        return list(matches)
+
+
 class Parser:  # pylint: disable=too-many-instance-attributes
     """
     The parser instance is created by the avatar. A new instance is created
@@ -402,11 +535,16 @@ class Parser:  # pylint: disable=too-many-instance-attributes
     #: The Object the verb was matched on (last-match-wins; see
     #: :doc:`/reference/parser`).
     this: object
+    #: The :class:`CommandScope` this command was resolved against.
+    scope: CommandScope
 
-    def __init__(self, lexer, caller):
+    _resolving = False
+
+    def __init__(self, lexer, caller, scope=None):
         """
         Create a new parser object for the given command, as issued by
-        the given caller, using the registry.
+        the given caller, using the registry. `scope` is reused if it is
+        still current for `caller`; otherwise a new one is built.
         """
         self.lexer = lexer
         self.caller = caller
@@ -419,6 +557,17 @@ class Parser:  # pylint: disable=too-many-instance-attributes
         self.dobj_str = lexer.dobj_str
         self.dobj_spec_str = lexer.dobj_spec_str
 
+        self.scope = scope if scope is not None and scope.is_current(caller) else CommandScope(caller)
+        # The scope's contents answer find_object() only while the noun
+        # phrases are resolved; verbs that call it later may have moved
+        # things since, in this process or another.
+        self._resolving = True
+        try:
+            self._resolve_objects()
+        finally:
+            self._resolving = False
+
+    def _resolve_objects(self):
         if self.lexer:
             for matches in self.prepositions.values():
                 for record in matches:
@@ -478,23 +627,23 @@ class Parser:  # pylint: disable=too-many-instance-attributes
             person = specifier[0 : specifier.index("'")]
             location = self.caller.location
             if location:
-                search = location.find(person)
+                search = self._find_in(location, person)
         else:
             search = self.caller
 
-        if isinstance(search, QuerySet):
+        if isinstance(search, (QuerySet, list)):
             if len(search) > 1:
                 raise AmbiguousObjectError(name, search)
             elif len(search) == 0:
                 raise NoSuchObjectError(person)
             search = search[0]
         if name and search:
-            result = search.find(name)
+            result = self._find_in(search, name)
             if not result and self.caller.location:
                 # Exclude objects with hidden placement (under/behind) from room lookups
                 # unless an explicit "from" context is present (e.g. "take key from rug").
                 exclude_hidden = "from" not in self.prepositions
-                result = self.caller.location.find(name, exclude_hidden_placement=exclude_hidden)
+                result = self._find_in(self.caller.location, name, exclude_hidden_placement=exclude_hidden)
 
         if len(result) == 1:
             return result[0]
@@ -504,6 +653,12 @@ class Parser:  # pylint: disable=too-many-instance-attributes
             return None
         raise AmbiguousObjectError(name, result)
 
+    def _find_in(self, container, name, exclude_hidden_placement=False):
+        scope = self.scope
+        if self._resolving and scope.covers(container):
+            return scope.find(container, name, exclude_hidden_placement=exclude_hidden_placement)
+        return container.find(name, exclude_hidden_placement=exclude_hidden_placement)
+
     def get_search_order(self):
         """
         Return the canonical list of objects to search for verbs, in priority order:
@@ -515,7 +670,7 @@ class Parser:  # pylint: disable=too-many-instance-attributes
                 more_itertools.collapse(
                     [
                         self.caller,
-                        list(self.caller.contents.prefetch_related("aliases")),
+                        self._get_inventory(),
                         self.caller.location,
                         self.dobj,
                         [[x[2] for x in prep] for prep in self.prepositions.values()],
@@ -524,6 +679,11 @@ class Parser:  # pylint: disable=too-many-instance-attributes
             )
         )
 
+    def _get_inventory(self):
+        if self.scope.is_current(self.caller):
+            return self.scope.inventory
+        return list(self.caller.contents.prefetch_related("aliases"))
+
     def get_verb(self):
         """
         For each of these items the parser will look for a verb using the
@@ -551,7 +711,7 @@ class Parser:  # pylint: disable=too-many-instance-attributes
         if not self.this:
             # Verb-name exists but dobj didn't resolve: report the dobj, not the verb.
             if self.dobj_str is not None and self.dobj is None:
-                if Verb.objects.filter(names__name__iexact=self.words[0]).exists():
+                if Verb.objects.filter(names__name__lower=self.words[0].lower()).exists():
                     raise NoSuchObjectError(self.dobj_str)
             raise NoSuchVerbError(self.words[0])
 
@@ -563,8 +723,11 @@ class Parser:  # pylint: disable=too-many-instance-attributes
         """
         Batch verb dispatch using the AncestorCache flat table.
 
-        Issues two VALUES queries (direct + inherited) then fetches full Verb objects
-        for the finalist set — typically 3 DB round-trips instead of 5-10.
+        With the process-local dispatch index enabled (``MOO_VERB_INDEX_SIZE``),
+        the candidates come from :mod:`moo.core.verb_index` and a warm dispatch
+        issues no queries. Otherwise it issues two VALUES queries (direct +
+        inherited) then fetches full Verb objects for the finalist set —
+        typically 3 DB round-trips instead of 5-10.
 
         Returns (this_object, verb) for the winning match, or (None, None) if not found.
         """
@@ -575,37 +738,11 @@ class Parser:  # pylint: disable=too-many-instance-attributes
         # able to type any case and have it match.
         verb_name = self.words[0]
 
-        # Query 1: verbs defined directly on search-order objects.
-        direct = list(
-            Verb.objects.filter(
-                origin_id__in=pk_to_rank,
-                names__name__iexact=verb_name,
-            )
-            .values("id", "direct_object")
-            .annotate(
-                viewing_pk=F("origin_id"),
-                depth=Value(0),
-                pw=Value(0),
-            )
-        )
-
-        # Query 2: verbs inherited via AncestorCache.
-        inherited = list(
-            Verb.objects.filter(
-                origin__ancestor_descendants__descendant_id__in=pk_to_rank,
-                names__name__iexact=verb_name,
-            )
-            .values("id", "direct_object")
-            .annotate(
-                viewing_pk=F("origin__ancestor_descendants__descendant_id"),
-                depth=F("origin__ancestor_descendants__depth"),
-                pw=F("origin__ancestor_descendants__path_weight"),
-            )
-        )
+        rows, verb_map = verb_index.candidates(pk_to_rank, verb_name)
 
         # Deduplicate: for each (verb_id, viewing_pk) keep shallowest match.
         best = {}
-        for row in direct + inherited:
+        for row in rows:
             vp = row["viewing_pk"]
             if vp not in pk_to_rank:
                 continue
@@ -617,14 +754,17 @@ class Parser:  # pylint: disable=too-many-instance-attributes
         if not best:
             return None, None
 
-        # Query 3: fetch full Verb objects for all candidates.
-        candidate_ids = list({row["id"] for row in best.values()})
-        verb_map = {
-            v.pk: v
-            for v in Verb.objects.filter(pk__in=candidate_ids)
-            .select_related("owner")
-            .prefetch_related("indirect_objects__preposition__names")
-        }
+        # Verbs from the index are shared with other tasks in this process.
+        shared = verb_map is not None
+        if verb_map is None:
+            # Query 3: fetch full Verb objects for all candidates.
+            candidate_ids = list({row["id"] for row in best.values()})
+            verb_map = {
+                v.pk: v
+                for v in Verb.objects.filter(pk__in=candidate_ids)
+                .select_related("owner")
+                .prefetch_related("indirect_objects__preposition__names")
+            }
 
         # Group by (search_rank, viewing_pk).
         rank_viewer_verbs = defaultdict(list)
@@ -655,6 +795,8 @@ class Parser:  # pylint: disable=too-many-instance-attributes
                 winner_this = viewed_by
                 winner_verb = best_verb
 
+        if shared and winner_verb is not None:
+            winner_verb = attribute_cache.clone(winner_verb)
         return winner_this, winner_verb
 
     def get_pronoun_object(self, pronoun):
@@ -683,7 +825,12 @@ class Parser:  # pylint: disable=too-many-instance-attributes
                 raise NoSuchObjectError(pronoun) from exc
         loc = self.caller.location
         if loc is not None:
-            if pronoun.lower() == loc.name.lower() or loc.aliases.filter(alias__iexact=pronoun).exists():
+            if pronoun.lower() == loc.name.lower():
+                return loc
+            if self._resolving:
+                if pronoun.lower() in self.scope.location_aliases:
+                    return loc
+            elif loc.aliases.filter(alias__lower=pronoun.lower()).exists():
                 return loc
         return None
 
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Who is connected, per site.
+
+``connected_players()`` used to decode the ``last_connected_time`` property of
+every player in the world to decide who was online, ``is_connected()`` read
+one cache key per Player row, and the SSH shell wrote that property through
+the ORM every fifteen seconds for each active player.
+
+The shell now registers each session here instead. Every site has two sorted
+sets in Redis:
+
+``moo:presence:{site_pk}``
+    One member per live session (``"{avatar_pk}:{token}"``), scored with the
+    time it was last heard from. Sessions are added at login and removed at
+    logout, and the SSH server re-scores all of its sessions every
+    ``MOO_PRESENCE_HEARTBEAT`` seconds, so a session whose server died
+    without logging it out drops out after ``MOO_PRESENCE_TTL`` seconds.
+
+``moo:presence:{site_pk}:avatar:{avatar_pk}``
+    The same sessions, one set per avatar, so whether a given avatar is
+    connected is a single ``ZCOUNT`` (:func:`connected`) rather than a scan
+    of the site. Expired sessions are pruned from it whenever it is read.
+
+``moo:presence:{site_pk}:active``
+    One member per avatar, scored with the time it last sent a command. An
+    avatar is removed when its last session leaves, or by
+    :func:`last_active` once its sessions have all expired.
+
+Reading who is online is a single round trip whatever the size of the world.
+The sets are kept through :mod:`moo.core.store`, which falls back to the
+Django cache when it is not Redis.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from . import store
+
+# token -> (site pk, avatar pk) for the sessions this process heartbeats.
+_local: dict = {}
+_lock = threading.Lock()
+
+
+def _ttl() -> int:
+    return getattr(settings, "MOO_PRESENCE_TTL", 90)
+
+
+def heartbeat_interval() -> int:
+    return getattr(settings, "MOO_PRESENCE_HEARTBEAT", 30)
+
+
+def _site_pk(site_pk=None):
+    if site_pk is not None:
+        return site_pk
+    from .code import ContextManager  # pylint: disable=import-outside-toplevel
+
+    site = ContextManager.get_site()
+    return site.pk if site is not None else getattr(settings, "SITE_ID", 1)
+
+
+def _key(site_pk) -> str:
+    return f"moo:presence:{site_pk}"
+
+
+def _active_key(site_pk) -> str:
+    return f"moo:presence:{site_pk}:active"
+
+
+def _avatar_key(site_pk, avatar_pk) -> str:
+    return f"moo:presence:{site_pk}:avatar:{avatar_pk}"
+
+
+def _avatar_pk(member) -> int:
+    return int(member.split(":", 1)[0])
+
+
+def join(avatar_pk, site_pk=None) -> str:
+    """
+    Register a new session for `avatar_pk` and return its token.
+
+    :param site_pk: the avatar's site; defaults to the active one
+    :return: the token to pass to :func:`touch` and :func:`leave`
+    """
+    site_pk = _site_pk(site_pk)
+    token = f"{avatar_pk}:{uuid.uuid4().hex}"
+    with _lock:
+        _local[token] = (site_pk, avatar_pk)
+    _add(site_pk, avatar_pk, token)
+    return token
+
+
+def touch(token):
+    """
+    Record that the session `token` just sent a command.
+    """
+    entry = _local.get(token)
+    if entry is None:
+        return
+    _add(*entry, token)
+
+
+def leave(token):
+    """
+    Remove the session `token`.
+    """
+    with _lock:
+        entry = _local.pop(token, None)
+    if entry is None:
+        return
+    site_pk, avatar_pk = entry
+    store.zrem({_key(site_pk): [token], _avatar_key(site_pk, avatar_pk): [token]})
+    expired = time.time() - _ttl()
+    if not store.zrange_since([(_avatar_key(site_pk, avatar_pk), expired, expired)])[0]:
+        # A session of the same avatar joining between the two round trips
+        # would lose its :active entry until its next command; the idle filter
+        # tolerates that, and the sessions themselves are unaffected.
+        store.zrem({_active_key(site_pk): [str(avatar_pk)]})
+
+
+def beat() -> int:
+    """
+    Re-score every session this process registered, in one round trip.
+
+    :return: the number of sessions refreshed
+    """
+    with _lock:
+        entries = list(_local.items())
+    if not entries:
+        return 0
+    now = time.time()
+    keyed: dict = {}
+    for token, (site_pk, avatar_pk) in entries:
+        keyed.setdefault(_key(site_pk), {})[token] = now
+        keyed.setdefault(_avatar_key(site_pk, avatar_pk), {})[token] = now
+    store.zadd(keyed)
+    return len(entries)
+
+
+def _add(site_pk, avatar_pk, token):
+    now = time.time()
+    store.zadd(
+        {
+            _key(site_pk): {token: now},
+            _avatar_key(site_pk, avatar_pk): {token: now},
+            _active_key(site_pk): {str(avatar_pk): now},
+        }
+    )
+
+
+def connected(avatar_pks, site_pk=None) -> set:
+    """
+    Return the avatars among `avatar_pks` that have a live session, with one
+    ``ZCOUNT`` per avatar in a single round trip. Unlike :func:`online`, this
+    never reads or prunes the rest of the site; the expired sessions of the
+    given avatars are pruned.
+
+    :param site_pk: defaults to the active site
+    :rtype: set[int]
+    """
+    avatar_pks = list(dict.fromkeys(avatar_pks))
+    if not avatar_pks:
+        return set()
+    site_pk = _site_pk(site_pk)
+    expired = time.time() - _ttl()
+    counts = store.zcount([(_avatar_key(site_pk, pk), expired, expired) for pk in avatar_pks])
+    return {pk for pk, count in zip(avatar_pks, counts) if count}
+
+
+def online(site_pk=None, within=None) -> set:
+    """
+    Return the pks of the avatars with a live session on the site, for
+    listings such as ``@who`` and MSSP. To check particular avatars, use
+    :func:`connected`.
+
+    :param site_pk: defaults to the active site
+    :param within: a ``timedelta``; if given, only avatars that sent a
+        command that recently are returned
+    :rtype: set[int]
+    """
+    site_pk = _site_pk(site_pk)
+    now = time.time()
+    expired = now - _ttl()
+    queries = [(_key(site_pk), expired, expired)]
+    if within is not None:
+        queries.append((_active_key(site_pk), now - within.total_seconds(), None))
+    results = store.zrange_since(queries)
+    live = {_avatar_pk(member) for member in results[0]}
+    if within is not None:
+        live &= {_avatar_pk(member) for member in results[1]}
+    return live
+
+
+def last_active(avatar_pk, site_pk=None):
+    """
+    Return when `avatar_pk` last sent a command, as a Unix timestamp, or
+    ``None`` if it has no live session.
+    """
+    site_pk = _site_pk(site_pk)
+    if not connected([avatar_pk], site_pk=site_pk):
+        # Sessions whose server died were never left, so their avatar's
+        # :active entry is only dropped here.
+        store.zrem({_active_key(site_pk): [str(avatar_pk)]})
+        return None
+    return store.zscore(_active_key(site_pk), str(avatar_pk))
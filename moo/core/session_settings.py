@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Cross-process storage for per-connection session settings.
+
+The SSH shell keeps each user's settings (``mode``, ``quiet_mode``, the
+``PREFIX``/``SUFFIX`` markers, terminal width, IAC capabilities...) in its
+in-process ``_session_settings`` registry, and mirrors them here so Celery
+workers can read them. They used to be mirrored one cache key per setting,
+``moo:session:{user_pk}:{key}``, which cost a cache round trip for every
+setting a task read.
+
+Every setting for a user now lives in one Redis hash, ``moo:session:{user_pk}``,
+so a task reads all of them with a single ``HGETALL``
+(:func:`snapshot`). :func:`moo.sdk.get_session_setting` takes that snapshot
+once per :class:`~moo.core.code.ContextManager` session and answers every
+later read from it. The hash expires a day after its last write, as the
+per-setting keys did. It is kept through :mod:`moo.core.store`, which falls
+back to the Django cache when it is not Redis.
+"""
+
+from . import store as _store
+
+#: Seconds a user's settings outlive their last write.
+TIMEOUT = 86400
+
+
+def _key(user_pk) -> str:
+    return f"moo:session:{user_pk}"
+
+
+def snapshot(user_pk) -> dict:
+    """
+    Return all of `user_pk`'s settings, read in one round trip.
+    """
+    return _store.hash_items(_key(user_pk))
+
+
+def get(user_pk, key, default=None):
+    """
+    Return one of `user_pk`'s settings, or `default` if it is not set.
+    """
+    return _store.hash_get(_key(user_pk), key, default)
+
+
+def store(user_pk, key, value):
+    """
+    Set one of `user_pk`'s settings and push back the hash's expiry.
+    """
+    _store.hash_set(_key(user_pk), key, value, TIMEOUT)
+
+
+def discard(user_pk, *keys):
+    """
+    Remove the given settings of `user_pk`.
+    """
+    _store.hash_discard(_key(user_pk), *keys)
+
+
+def clear(user_pk):
+    """
+    Remove every setting of `user_pk`.
+    """
+    _store.delete(_key(user_pk))
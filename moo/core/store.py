@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Redis data structures for the shell's shared state, with a cache fallback.
+
+Prompt history, session settings, presence and the broadcast limiter all used
+to go through the Django cache API, which only stores whole values: history
+read its 500-entry list and wrote it back on every command, and the limiter
+needed ``incr`` plus a fallback ``set`` to start each window. When the default
+cache is Redis, the helpers here talk to its client directly, so each
+operation is a single round trip:
+
+- lists: :func:`push`, :func:`push_many` (``LPUSH`` + ``LTRIM`` + ``EXPIRE``)
+  and :func:`items`
+- hashes: :func:`hash_items`, :func:`hash_get`, :func:`hash_set`,
+  :func:`hash_discard`
+- counters: :func:`incr` (``SET NX EX`` + ``INCR``)
+- sorted sets: :func:`zadd`, :func:`zrem`, :func:`zscore`, :func:`zcount`,
+  :func:`zrange_since`
+
+Keys are used as given, without the cache's ``KEY_PREFIX`` and version, and
+hash and list values are stored as JSON.
+
+Any other cache backend (the test settings use ``LocMemCache``) gets the same
+semantics from whole values kept under the same keys. The fallback is neither
+atomic nor shared between hosts, and is only meant for a single process.
+"""
+
+import json
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+
+# Push ARGV[1] onto the head of KEYS[1] unless it is already there, keep the
+# newest ARGV[2] entries and refresh the TTL (ARGV[3] seconds).
+_PUSH_DISTINCT = """
+if redis.call('LINDEX', KEYS[1], 0) == ARGV[1] then
+    return 0
+end
+redis.call('LPUSH', KEYS[1], ARGV[1])
+redis.call('LTRIM', KEYS[1], 0, tonumber(ARGV[2]) - 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+_push_distinct = None
+
+
+def redis():
+    """
+    Return a Redis client for the default cache, or ``None`` if the cache is
+    not Redis.
+    """
+    # ``cache`` is a proxy that forwards attribute access, so it is never an
+    # instance of the backend class itself.
+    backend = caches["default"]
+    if isinstance(backend, RedisCache):
+        return backend._cache.get_client(write=True)  # pylint: disable=protected-access
+    return None
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def delete(key):
+    client = redis()
+    if client is not None:
+        client.delete(key)
+        return
+    cache.delete(key)
+
+
+# Lists
+
+
+def push(key, value, maxlen: int, timeout: int, distinct: bool = False) -> bool:
+    """
+    Add `value` to the head of the list `key`, keep its newest `maxlen`
+    entries and expire it `timeout` seconds from now.
+
+    :param distinct: skip the push if `value` is already at the head
+    :return: ``False`` if the push was skipped
+    """
+    client = redis()
+    encoded = json.dumps(value)
+    if client is not None:
+        if distinct:
+            global _push_distinct  # pylint: disable=global-statement
+            if _push_distinct is None:
+                _push_distinct = client.register_script(_PUSH_DISTINCT)
+            return bool(_push_distinct(keys=[key], args=[encoded, maxlen, timeout], client=client))
+        pipe = client.pipeline(transaction=False)
+        pipe.lpush(key, encoded)
+        pipe.ltrim(key, 0, maxlen - 1)
+        pipe.expire(key, timeout)
+        pipe.execute()
+        return True
+    entries = cache.get(key) or []
+    if distinct and entries and entries[0] == value:
+        return False
+    cache.set(key, [value, *entries][:maxlen], timeout=timeout)
+    return True
+
+
+def push_many(key, values, maxlen: int, timeout: int):
+    """
+    Add `values` to the head of the list `key` in order, so the last of them
+    ends up first, keep the newest `maxlen` entries and expire the list
+    `timeout` seconds from now.
+    """
+    if not values:
+        return
+    client = redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        pipe.lpush(key, *(json.dumps(value) for value in values))
+        pipe.ltrim(key, 0, maxlen - 1)
+        pipe.expire(key, timeout)
+        pipe.execute()
+        return
+    entries = cache.get(key) or []
+    cache.set(key, [*reversed(values), *entries][:maxlen], timeout=timeout)
+
+
+def items(key) -> list:
+    """
+    Return the list `key`, newest first.
+    """
+    client = redis()
+    if client is not None:
+        return [json.loads(entry) for entry in client.lrange(key, 0, -1)]
+    return list(cache.get(key) or [])
+
+
+# Hashes
+
+
+def hash_items(key) -> dict:
+    """
+    Return every field of the hash `key`.
+    """
+    client = redis()
+    if client is not None:
+        return {_text(field): json.loads(value) for field, value in client.hgetall(key).items()}
+    return dict(cache.get(key) or {})
+
+
+def hash_get(key, field, default=None):
+    client = redis()
+    if client is not None:
+        value = client.hget(key, field)
+        return default if value is None else json.loads(value)
+    return (cache.get(key) or {}).get(field, default)
+
+
+def hash_set(key, field, value, timeout: int):
+    """
+    Set `field` of the hash `key` and expire the hash `timeout` seconds from now.
+    """
+    client = redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(key, field, json.dumps(value))
+        pipe.expire(key, timeout)
+        pipe.execute()
+        return
+    fields = cache.get(key) or {}
+    fields[field] = value
+    cache.set(key, fields, timeout=timeout)
+
+
+def hash_discard(key, *fields):
+    client = redis()
+    if client is not None:
+        client.hdel(key, *fields)
+        return
+    existing = cache.get(key)
+    if existing:
+        for field in fields:
+            existing.pop(field, None)
+        cache.set(key, existing, timeout=None)
+
+
+# Counters
+
+
+def incr(key, timeout: int) -> int:
+    """
+    Increment the counter `key` and return its new value. A counter that does
+    not exist starts at zero and expires `timeout` seconds after it was
+    created; later increments do not extend it.
+    """
+    client = redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        pipe.set(key, 0, ex=timeout, nx=True)
+        pipe.incr(key)
+        return pipe.execute()[1]
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between the add and the incr.
+        cache.set(key, 1, timeout=timeout)
+        return 1
+
+
+# Sorted sets
+
+
+def zadd(keyed: dict):
+    """
+    Set member scores in several sorted sets at once.
+
+    :param keyed: ``{key: {member: score}}``
+    """
+    client = redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        for key, mapping in keyed.items():
+            pipe.zadd(key, mapping)
+        pipe.execute()
+        return
+    for key, mapping in keyed.items():
+        scores = cache.get(key) or {}
+        scores.update(mapping)
+        cache.set(key, scores, timeout=None)
+
+
+def zrem(keyed: dict):
+    """
+    Remove members from several sorted sets at once.
+
+    :param keyed: ``{key: [member, ...]}``
+    """
+    client = redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        for key, members in keyed.items():
+            pipe.zrem(key, *members)
+        pipe.execute()
+        return
+    for key, members in keyed.items():
+        scores = cache.get(key) or {}
+        for member in members:
+            scores.pop(member, None)
+        cache.set(key, scores, timeout=None)
+
+
+def zscore(key, member):
+    client = redis()
+    if client is not None:
+        return client.zscore(key, member)
+    return (cache.get(key) or {}).get(member)
+
+
+def zcount(queries) -> list:
+    """
+    Count the members of several sorted sets scored at or above a minimum, in
+    one round trip.
+
+    :param queries: ``(key, min score, prune below)`` triples; if `prune
+        below` is not ``None``, members scored under it are deleted first
+    :return: one count per query
+    """
+    client = redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        for key, minimum, prune in queries:
+            if prune is not None:
+                pipe.zremrangebyscore(key, "-inf", f"({prune}")
+            pipe.zcount(key, minimum, "+inf")
+        results = iter(pipe.execute())
+        counts = []
+        for _, _, prune in queries:
+            if prune is not None:
+                next(results)
+            counts.append(next(results))
+        return counts
+    return [len(members) for members in zrange_since(queries)]
+
+
+def zrange_since(queries) -> list:
+    """
+    Return the members of several sorted sets scored at or above a minimum,
+    in one round trip.
+
+    :param queries: ``(key, min score, prune below)`` triples; if `prune
+        below` is not ``None``, members scored under it are deleted first
+    :return: one list of members (as ``str``) per query
+    """
+    client = redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=False)
+        for key, minimum, prune in queries:
+            if prune is not None:
+                pipe.zremrangebyscore(key, "-inf", f"({prune}")
+            pipe.zrangebyscore(key, minimum, "+inf")
+        results = iter(pipe.execute())
+        members = []
+        for _, _, prune in queries:
+            if prune is not None:
+                next(results)
+            members.append([_text(member) for member in next(results)])
+        return members
+    members = []
+    for key, minimum, prune in queries:
+        scores = cache.get(key) or {}
+        if prune is not None and any(score < prune for score in scores.values()):
+            scores = {member: score for member, score in scores.items() if score >= prune}
+            cache.set(key, scores, timeout=None)
+        members.append([member for member, score in scores.items() if score >= minimum])
+    return members
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Process-local cache of each site's System Object and its ``$`` names.
+
+Nearly every command reads the System Object: the parser's ``do_command``
+hook, every :class:`~moo.core.models.verb.Verb` call (it is passed to the verb
+as ``_``), ``lookup("$player_start")``, ``create()``'s default parent and the
+broadcast rate-limit knobs. Each of those used to fetch it with
+``Object.objects.get(unique_name=True, name="System Object")`` and then run a
+property query for the ``$`` name, although both change only when a wizard
+edits the System Object.
+
+Entries are tagged with the System Object's attribute generation (see
+:mod:`moo.core.attribute_cache`). Every ``Property``, ``Verb`` and parent
+write on the System Object bumps it, so an edit made in any process drops
+every process's entry on its next read.
+"""
+
+import threading
+
+from django.conf import settings
+
+from . import attribute_cache
+from .code import ContextManager
+from .exceptions import NoSuchPropertyError
+
+SYSTEM_OBJECT_NAME = "System Object"
+
+# perm_cache key holding the System Object for one ContextManager session.
+_SESSION_KEY = "__system_object__"
+
+# Stored in place of a property the System Object does not have.
+_MISSING = object()
+_UNSET = object()
+
+# Property values that are cached as they are; anything else (lists, dicts,
+# values holding Objects) is read from the property each time.
+_PLAIN_TYPES = (str, int, float, bool, type(None))
+
+_entries: dict = {}
+_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "MOO_SYSTEM_OBJECT_CACHE", True)
+
+
+class _Entry:
+    def __init__(self, system, generation):
+        self.system = system
+        self.generation = generation
+        #: ``$`` name -> _ObjectRef, plain value, or _MISSING
+        self.names: dict = {}
+
+
+class _ObjectRef:
+    __slots__ = ("pk",)
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+def _site_key():
+    site = ContextManager.get_site()
+    return site.pk if site is not None else None
+
+
+def _entry():
+    from .models import Object  # pylint: disable=import-outside-toplevel
+
+    key = _site_key()
+    entry = _entries.get(key)
+    if entry is not None and entry.generation == attribute_cache.generation(entry.system.pk):
+        return entry
+    # The owner is read by every permission check on it.
+    system = Object.objects.select_related("owner").get(unique_name=True, name=SYSTEM_OBJECT_NAME)
+    entry = _Entry(system, attribute_cache.generation(system.pk))
+    with _lock:
+        _entries[key] = entry
+    return entry
+
+
+def get_system():
+    """
+    Return the active site's System Object.
+
+    The same instance is returned for the rest of the ``ContextManager``
+    session, so the parser, verb calls and ``create()`` share one.
+
+    :raises Object.DoesNotExist: if the site has none
+    """
+    perm_cache = ContextManager.get_perm_cache()
+    if perm_cache is not None and _SESSION_KEY in perm_cache:
+        return perm_cache[_SESSION_KEY]
+    if is_enabled():
+        system = attribute_cache.clone(_entry().system)
+    else:
+        from .models import Object  # pylint: disable=import-outside-toplevel
+
+        system = Object.objects.get(unique_name=True, name=SYSTEM_OBJECT_NAME)
+    if perm_cache is not None:
+        perm_cache[_SESSION_KEY] = system
+    return system
+
+
+def resolve(name):
+    """
+    Return the value of the System Object's property `name`, which is what
+    ``lookup("$name")`` means.
+
+    Object values are remembered by pk and fetched fresh, so a moved or renamed
+    object is never returned stale. Values that contain Objects without being
+    one are not cached.
+
+    :raises NoSuchPropertyError: if the System Object has no such property
+    """
+    if not is_enabled():
+        return get_system().get_property(name)
+    from .models import Object  # pylint: disable=import-outside-toplevel
+
+    entry = _entry()
+    system = attribute_cache.clone(entry.system)
+    system.can_caller("read", system)
+    cached = entry.names.get(name, _UNSET)
+    if cached is _MISSING:
+        raise NoSuchPropertyError(name)
+    if isinstance(cached, _ObjectRef):
+        try:
+            return Object.objects.get(pk=cached.pk)
+        except Object.DoesNotExist:
+            # Recycled since, or out of this site's view; ask the property.
+            entry.names.pop(name, None)
+    elif cached is not _UNSET:
+        return cached
+    try:
+        value = system.get_property(name)
+    except NoSuchPropertyError:
+        entry.names[name] = _MISSING
+        raise
+    if isinstance(value, Object):
+        entry.names[name] = _ObjectRef(value.pk)
+    elif isinstance(value, _PLAIN_TYPES):
+        entry.names[name] = value
+    return value
+
+
+def clear():
+    """
+    Drop every cached entry in this process.
+    """
+    with _lock:
+        _entries.clear()
@@ -8,6 +8,7 @@ import warnings
 from typing import Any, Optional
 
 from celery import shared_task
+from celery.signals import task_postrun
 from celery.utils.log import get_task_logger
 from django.db import transaction
 
@@ -21,18 +22,17 @@ background_log = logging.getLogger(f"{__name__}.background")
 
 
 @shared_task(bind=True)
-def parse_command(self, caller_id: int, line: str) -> tuple[list[Any], int]:
+def parse_command(self, caller_id: int, line: str) -> tuple[list[Any], int, list[str]]:
     """
     Parse a command-line and invoke the requested verb.
 
     :param caller_id: the PK of the caller of this command
     :param line: the natural-language command to parse and execute
-    :return: ``(output, exit_status)`` — list of output lines and ``0`` on
-        success, ``1`` if any caught exception fired.
+    :return: ``(output, exit_status, events)`` — list of output lines, ``0``
+        on success or ``1`` if any caught exception fired, and the event types
+        (``"input_prompt"``, ``"editor"``, ...) the command published.
     :raises UserError: if a verb failure happens
     """
-    from django.core.cache import cache
-
     from moo.sdk import get_session_setting
 
     output: list[Any] = []
@@ -42,17 +42,24 @@ def parse_command(self, caller_id: int, line: str) -> tuple[list[Any], int]:
         caller = Object.global_objects.get(pk=caller_id)
     except Object.DoesNotExist:
         log.warning(f"Skipping command {line!r}: caller {caller_id} recycled or disconnected")
-        return [], 0
+        return [], 0, []
     site = caller.site if caller.site_id else None
     # Set player=caller so on_commit verbs route output to this player's queue.
     with code.ContextManager(
-        caller, output.append, task_id=task_id, track_events=True, site=site, player=caller
+        caller, output.append, task_id=task_id, track_events=True, site=site, player=caller, coalesce_output=True
     ) as ctx:
         prefix = "[ERROR] " if get_session_setting("prefixes_mode", False) else ""
         with transaction.atomic():
             try:
                 log.info(f"{caller}: {line}")
                 parse.interpret(ctx, line)
+            except exceptions.TimeLimitError as e:
+                # Outside a Celery worker nothing kills the task mid-transaction,
+                # so undo the command's writes the way that kill would.
+                log.error(f"{caller}: {e}")
+                transaction.set_rollback(True)
+                exit_status = 1
+                output.append(f"[bold red]{prefix}{e}[/bold red]")
             except exceptions.UserError as e:
                 log.error(f"{caller}: {e}")
                 exit_status = 1
@@ -70,9 +77,31 @@ def parse_command(self, caller_id: int, line: str) -> tuple[list[Any], int]:
 
                     output.append(f"[bold red]{prefix}{traceback.format_exc()}[/bold red]")
         events = code.ContextManager.get("published_events") or []
-    if task_id:
-        cache.set(f"moo:task_events:{task_id}", list(events), timeout=60)
-    return output, exit_status
+    return output, exit_status, list(events)
+
+
+@task_postrun.connect
+def announce_command_done(sender=None, task_id=None, args=None, kwargs=None, **_):
+    """
+    Tell the caller's sessions that a :func:`parse_command` task has finished.
+
+    ``task_postrun`` is sent after the result is stored, so a shell woken by
+    the notice reads a finished result (see :func:`moo.core._publish_task_done`).
+    Eager runs, including ``MOO_LOCAL_COMMANDS``, are skipped: their caller
+    holds the result directly, so the notice would be a wasted broker write.
+    """
+    if getattr(sender, "name", None) != parse_command.name:
+        return
+    if getattr(sender.request, "is_eager", False):
+        return
+    caller_id = args[0] if args else (kwargs or {}).get("caller_id")
+    try:
+        from moo.core import _publish_task_done
+
+        _publish_task_done(caller_id, task_id)
+    except Exception:  # pylint: disable=broad-exception-caught
+        # The shell falls back to reading the result backend on its own.
+        log.exception(f"Could not announce the end of task {task_id}")
 
 
 @shared_task(bind=True)
@@ -92,7 +121,7 @@ def parse_code(self, caller_id: int, source: str, runtype: str = "exec") -> tupl
         log.warning(f"Skipping code execution: caller {caller_id} recycled or disconnected")
         return [], None
     site = caller.site if caller.site_id else None
-    with code.ContextManager(caller, output.append, task_id=task_id, site=site):
+    with code.ContextManager(caller, output.append, task_id=task_id, site=site, coalesce_output=True):
         with transaction.atomic():
             result = code.interpret(source, "__main__", runtype=runtype)
     return output, result
@@ -149,7 +178,7 @@ def invoke_verb(
         from moo.sdk import get_session_setting
 
         site = caller.site if caller.site_id else None
-        with code.ContextManager(caller, writer, task_id=task_id, player=player, site=site):
+        with code.ContextManager(caller, writer, task_id=task_id, player=player, site=site, coalesce_output=True):
             prefix = "[ERROR] " if get_session_setting("prefixes_mode", False) else ""
             try:
                 result = verb_obj(*args, _bypass_execute_check=True, **kwargs)
@@ -0,0 +1,147 @@
+"""Tests for compiled per-subject ACL decisions (moo/core/acl_cache.py)."""
+
+import pytest
+from django.core.cache import cache
+
+from .. import acl_cache, code
+from ..acl_cache import CompiledACL
+from ..models import Access, Object, Permission
+from ...sdk import create
+
+READ, WRITE, ANYTHING = 1, 2, 3
+
+
+def test_compiled_deny_wins_over_allow():
+    compiled = CompiledACL.from_rules(
+        [
+            ("allow", READ, "group", None, "everyone"),
+            ("deny", READ, "accessor", 42, None),
+        ]
+    )
+    assert compiled.decide(1 << READ, 7, owner=False, wizard=False)
+    assert not compiled.decide(1 << READ, 42, owner=False, wizard=False)
+
+
+def test_compiled_groups_apply_only_when_matched():
+    compiled = CompiledACL.from_rules(
+        [
+            ("allow", ANYTHING, "group", None, "owners"),
+            ("allow", ANYTHING, "group", None, "wizards"),
+        ]
+    )
+    mask = 1 << WRITE | 1 << ANYTHING
+    assert not compiled.decide(mask, 7, owner=False, wizard=False)
+    assert compiled.decide(mask, 7, owner=True, wizard=False)
+    assert compiled.decide(mask, 7, owner=False, wizard=True)
+
+
+def test_compiled_no_rules_is_denial():
+    assert not CompiledACL.from_rules([]).decide(1 << READ, 7, owner=True, wizard=True)
+
+
+@pytest.fixture()
+def shared_acls(settings):
+    settings.MOO_ACL_CACHE_TTL = 60
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_denials_are_cached_for_the_session(t_init: Object, t_wizard: Object, django_assert_num_queries):
+    with code.ContextManager(t_wizard, lambda _: None):
+        player = create("player")
+        thing = create("thing")
+        thing.deny(player, "read")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert not player.is_allowed("read", thing)
+        with django_assert_num_queries(0):
+            assert not player.is_allowed("read", thing)
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_compiled_acl_shared_across_sessions(shared_acls, t_init: Object, t_wizard: Object, django_assert_num_queries):
+    with code.ContextManager(t_wizard, lambda _: None):
+        player = create("player")
+        thing = create("thing")
+        assert player.is_allowed("read", thing)
+    assert shared_acls.get(acl_cache.ACL_KEY.format(acl_cache.generation(), "object", thing.pk)) is not None
+    with code.ContextManager(t_wizard, lambda _: None):
+        # Warm the per-session permission id and wizard lookups first.
+        assert t_wizard.is_allowed("read", t_wizard)
+        with django_assert_num_queries(1):
+            # The wizard-bit lookup for a new caller is the only query.
+            assert player.is_allowed("read", thing)
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_access_changes_invalidate_shared_acl(shared_acls, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        player = create("player")
+        thing = create("thing")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert player.is_allowed("read", thing)
+    with code.ContextManager(t_wizard, lambda _: None):
+        thing.deny(player, "read")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert not player.is_allowed("read", thing)
+    # QuerySet.delete() bypasses Access.delete() but still sends post_delete.
+    Access.objects.filter(object=thing, rule="deny").delete()
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert player.is_allowed("read", thing)
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_owner_change_is_seen_by_next_check(shared_acls, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        player = create("player")
+        thing = create("thing")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert not player.is_allowed("write", thing)
+        thing.owner = player
+        thing.save()
+        assert player.is_allowed("write", thing)
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_sandbox_read_checks_are_forgotten_on_access_change(t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        player = create("player")
+        thing = create("thing")
+    with code.ContextManager(player, lambda _: None):
+        env = code.get_restricted_environment("test", lambda _: None)
+        assert env["_getattr_"](thing, "name") == "thing"
+        assert (player.pk, "object", thing.pk, thing.owner_id) in acl_cache.session_reads()
+        # A wizard-owned verb elsewhere in the same task revokes the grant.
+        code.ContextManager.override_caller(t_wizard)
+        try:
+            thing.deny(player, "read")
+        finally:
+            code.ContextManager.pop_caller()
+        with pytest.raises(PermissionError):
+            env["_getattr_"](thing, "name")
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_bulk_access_writes_drop_compiled_acls(shared_acls, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        player = create("player")
+        thing = create("thing")
+        assert player.is_allowed("read", thing)
+    read = Permission.objects.get(name="read")
+    with code.ContextManager(t_wizard, lambda _: None):
+        Access.objects.bulk_create(
+            [Access(object=thing, rule="deny", permission=read, type="accessor", accessor=player)]
+        )
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert not player.is_allowed("read", thing)
+    with code.ContextManager(t_wizard, lambda _: None):
+        Access.objects.filter(object=thing, accessor=player).update(rule="allow")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert player.is_allowed("read", thing)
@@ -0,0 +1,215 @@
+"""Tests for the process-local attribute cache (L1 in front of the Redis attribute cache)."""
+
+import pytest
+from django.core.cache import cache
+
+from .. import code
+from .. import attribute_cache
+from ..attribute_cache import MISSING, LocalAttributeCache, local_cache
+from ..models import Object, Property
+from ..utils import flush_attribute_caches
+from ...sdk import create
+
+
+@pytest.fixture()
+def l1(settings):
+    settings.MOO_ATTRIB_LOCAL_CACHE_SIZE = 64
+    settings.MOO_ATTRIB_ANCESTRY_CACHE_SIZE = 64
+    cache.clear()
+    local_cache.clear()
+    yield local_cache
+    local_cache.clear()
+    attribute_cache.ancestries.clear()
+
+
+def test_lru_evicts_least_recently_used(settings):
+    settings.MOO_ATTRIB_LOCAL_CACHE_SIZE = 2
+    lru = LocalAttributeCache()
+    lru.set("a", 1, "A")
+    lru.set("b", 1, "B")
+    assert lru.get("a", 1) == "A"  # "b" is now least recently used
+    lru.set("c", 1, "C")
+    assert lru.get("b", 1) is MISSING
+    assert lru.get("a", 1) == "A"
+    assert lru.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 1, "evictions": 1}
+
+
+def test_lru_generation_mismatch_is_a_miss(settings):
+    settings.MOO_ATTRIB_LOCAL_CACHE_SIZE = 8
+    lru = LocalAttributeCache()
+    lru.set("a", 1, "A")
+    assert lru.get("a", 2) is MISSING
+    # The stale entry is dropped, not resurrected by a later matching read.
+    assert lru.get("a", 1) is MISSING
+    assert lru.stats()["size"] == 0
+
+
+def test_lru_disabled_at_zero(settings):
+    settings.MOO_ATTRIB_LOCAL_CACHE_SIZE = 0
+    lru = LocalAttributeCache()
+    lru.set("a", 1, "A")
+    assert lru.get("a", 1) is MISSING
+    assert lru.stats()["misses"] == 0
+
+
+@pytest.fixture()
+def l2(settings):
+    """Enable the cross-session (Redis-style) tier, backed by LocMemCache."""
+    settings.MOO_ATTRIB_CACHE_TTL = 60
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_generation_is_memoized_per_session(l1, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        widget = create("widget")
+        generation = attribute_cache.generation(widget.pk)
+        cache.incr(attribute_cache.EPOCH_KEY)
+        assert attribute_cache.generation(widget.pk) == generation
+        attribute_cache.invalidate(widget.pk)
+        assert attribute_cache.generation(widget.pk) != generation
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_leaf_write_leaves_other_generations_alone(l1, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        parent = create("parent thing")
+        child = create("child thing", parents=[parent])
+        other = create("other thing")
+    before = {o.pk: attribute_cache.generation(o.pk) for o in (parent, child, other)}
+    attribute_cache.invalidate(child.pk)
+    after = {o.pk: attribute_cache.generation(o.pk) for o in (parent, child, other)}
+    assert after[child.pk] != before[child.pk]
+    assert after[parent.pk] == before[parent.pk]
+    assert after[other.pk] == before[other.pk]
+    # A write to an object with descendants moves theirs too, and no others.
+    attribute_cache.invalidate(parent.pk)
+    assert attribute_cache.generation(parent.pk) != after[parent.pk]
+    assert attribute_cache.generation(child.pk) != after[child.pk]
+    assert attribute_cache.generation(other.pk) == after[other.pk]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_reparenting_moves_the_subtree_generations(l1, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        old_parent = create("old parent")
+        new_parent = create("new parent")
+        child = create("child thing", parents=[old_parent])
+        grandchild = create("grandchild thing", parents=[child])
+    before = {o.pk: attribute_cache.generation(o.pk) for o in (child, grandchild, new_parent)}
+    with code.ContextManager(t_wizard, lambda _: None):
+        child.parents.remove(old_parent)
+        child.parents.add(new_parent)
+    assert attribute_cache.generation(child.pk) != before[child.pk]
+    assert attribute_cache.generation(grandchild.pk) != before[grandchild.pk]
+    assert attribute_cache.generation(new_parent.pk) == before[new_parent.pk]
+    # The grandchild now inherits from the new parent, so a write there reaches it.
+    moved = attribute_cache.generation(grandchild.pk)
+    attribute_cache.invalidate(new_parent.pk)
+    assert attribute_cache.generation(grandchild.pk) != moved
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_ancestor_write_reaches_descendant_cross_session_cache(l2, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        parent = create("parent thing")
+        parent.set_property("colour", "red")
+        child = create("child thing", parents=[parent])
+        child.properties.filter(name="colour").delete()
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert child.get_property("colour") == "red"
+        generation = attribute_cache.generation(child.pk)
+    assert cache.get(f"moo:prop:{generation}:{child.pk}:colour:1") == '"red"'
+    with code.ContextManager(t_wizard, lambda _: None):
+        parent.set_property("colour", "blue")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert child.get_property("colour") == "blue"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_flush_invalidates_out_of_band_writes(l1, l2, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        widget = create("widget")
+        widget.set_property("colour", "red")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert widget.get_property("colour") == "red"
+    # A queryset update bypasses Property.save() and its invalidation.
+    Property.objects.filter(origin=widget, name="colour").update(value='"green"')
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert widget.get_property("colour") == "red"
+    flush_attribute_caches()
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert widget.get_property("colour") == "green"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_property_served_from_local_cache_across_sessions(l1, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        widget = create("widget")
+        widget.set_property("tags", ["a", "b"])
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert widget.get_property("tags") == ["a", "b"]
+    hits = l1.stats()["hits"]
+    with code.ContextManager(t_wizard, lambda _: None):
+        tags = widget.get_property("tags")
+        assert tags == ["a", "b"]
+        tags.append("mutated")
+    assert l1.stats()["hits"] == hits + 1
+    # The caller's mutation must not leak into the cached value.
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert widget.get_property("tags") == ["a", "b"]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_write_to_ancestor_invalidates_descendant(l1, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        parent = create("parent thing")
+        parent.set_property("colour", "red")
+        child = create("child thing", parents=[parent])
+        # The child received a copy of the property at parents.add() time;
+        # drop it so the lookup genuinely inherits.
+        child.properties.filter(name="colour").delete()
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert child.get_property("colour") == "red"
+    with code.ContextManager(t_wizard, lambda _: None):
+        parent.set_property("colour", "blue")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert child.get_property("colour") == "blue"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_verb_hits_return_fresh_instances(l1, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        widget = create("widget")
+        widget.add_verb("poke", code="return 1")
+    with code.ContextManager(t_wizard, lambda _: None):
+        first = widget.get_verb("poke")
+    with code.ContextManager(t_wizard, lambda _: None):
+        hits = l1.stats()["hits"]
+        second = widget.get_verb("poke")
+        assert l1.stats()["hits"] == hits + 1
+    assert second.pk == first.pk
+    assert second is not first
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_verb_miss_invalidated_by_add_verb(l1, t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        widget = create("widget")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert not widget.has_verb("frobnicate")
+    with code.ContextManager(t_wizard, lambda _: None):
+        widget.add_verb("frobnicate", code="return 1")
+    with code.ContextManager(t_wizard, lambda _: None):
+        assert widget.has_verb("frobnicate")
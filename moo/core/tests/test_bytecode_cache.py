@@ -0,0 +1,100 @@
+"""Tests for the persistent compiled-verb store (moo/core/bytecode_cache.py)."""
+
+import pytest
+from django.core.cache import cache
+
+from .. import bytecode_cache, code
+from ..models import Object
+
+
+@pytest.fixture()
+def on_disk(settings, tmp_path):
+    settings.MOO_BYTECODE_CACHE_DIR = tmp_path
+    return tmp_path
+
+
+@pytest.fixture()
+def in_backend(settings):
+    settings.MOO_BYTECODE_CACHE_TTL = 60
+    cache.clear()
+    yield cache
+    cache.clear()
+
+
+def _counting_compiler():
+    calls = []
+
+    def compiler(body, filename):
+        calls.append((body, filename))
+        return code._compile_verb(body, filename)  # pylint: disable=protected-access
+
+    return compiler, calls
+
+
+def test_disabled_store_always_compiles(settings):
+    settings.MOO_BYTECODE_CACHE_DIR = None
+    settings.MOO_BYTECODE_CACHE_TTL = 0
+    compiler, calls = _counting_compiler()
+    bytecode_cache.get_or_compile("return 1", "<disabled>", compiler)
+    bytecode_cache.get_or_compile("return 1", "<disabled>", compiler)
+    assert len(calls) == 2
+
+
+def test_disk_round_trip_runs(on_disk):
+    compiler, calls = _counting_compiler()
+    bytecode_cache.get_or_compile("return this * 2", "<disk>", compiler)
+    result = bytecode_cache.get_or_compile("return this * 2", "<disk>", compiler)
+    assert len(calls) == 1
+    assert list(on_disk.rglob("*.marshal"))
+    g = code.get_default_globals()
+    g.update(code.get_restricted_environment("__main__", lambda s: None))
+    assert code.do_eval(result, {}, g, 21, runtype="exec") == 42
+
+
+def test_backend_hit_is_written_through_to_disk(in_backend, on_disk, settings):
+    compiler, calls = _counting_compiler()
+    settings.MOO_BYTECODE_CACHE_DIR = None
+    bytecode_cache.get_or_compile("return 1", "<shared>", compiler)
+    settings.MOO_BYTECODE_CACHE_DIR = on_disk
+    bytecode_cache.get_or_compile("return 1", "<shared>", compiler)
+    assert len(calls) == 1
+    assert list(on_disk.rglob("*.marshal"))
+
+
+def test_compile_errors_are_cached(on_disk):
+    compiler, calls = _counting_compiler()
+    first = bytecode_cache.get_or_compile("_private = 1", "<errors>", compiler)
+    second = bytecode_cache.get_or_compile("_private = 1", "<errors>", compiler)
+    assert len(calls) == 1
+    assert first.errors and second.errors == tuple(first.errors)
+    assert second.code is None
+
+
+def test_unreadable_entry_is_recompiled(on_disk):
+    compiler, calls = _counting_compiler()
+    bytecode_cache.get_or_compile("return 1", "<corrupt>", compiler)
+    for path in on_disk.rglob("*.marshal"):
+        path.write_bytes(b"\x00garbage")
+    bytecode_cache.get_or_compile("return 1", "<corrupt>", compiler)
+    assert len(calls) == 2
+
+
+def test_digest_depends_on_restricted_python_version(monkeypatch):
+    before = bytecode_cache.digest("return 1", "<v>")
+    monkeypatch.setattr(bytecode_cache, "RESTRICTED_PYTHON_VERSION", "0.0")
+    assert bytecode_cache.digest("return 1", "<v>") != before
+
+
+def test_digest_depends_on_transform_version(monkeypatch):
+    before = bytecode_cache.digest("return 1", "<v>")
+    monkeypatch.setattr(bytecode_cache, "TRANSFORM_VERSION", "0")
+    assert bytecode_cache.digest("return 1", "<v>") != before
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_precompile_verbs_warms_store(on_disk, t_init: Object, t_wizard: Object):
+    compiled = bytecode_cache.precompile_verbs()
+    assert compiled > 0
+    assert len(list(on_disk.rglob("*.marshal"))) == compiled
+    assert bytecode_cache.precompile_verbs() == 0
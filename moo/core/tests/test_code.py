@@ -21,7 +21,7 @@ import pytest
 
 from moo.core.models.object import Object
 
-from .. import code
+from .. import code, create
 from .utils import ctx as _ctx, make_restricted_globals as _make_globals, mock_caller as _mock
 
 # ---------------------------------------------------------------------------
@@ -82,7 +82,7 @@ def test_caller_stack(t_init: Object, t_wizard: Object):
         printed.append(msg)
 
     with code.ContextManager(t_wizard, _writer):
-        from moo.sdk import context, create
+        from moo.sdk import context
 
         player = create("Player")
 
@@ -375,6 +375,7 @@ def test_get_restricted_environment_exact_keys():
         "_getattr_",
         "_getitem_",
         "_getiter_",
+        "_check_killed_",
         "_inplacevar_",
         "_unpack_sequence_",
         "_iter_unpack_sequence_",
@@ -417,6 +418,46 @@ def test_print_and_print_factory_both_present():
     assert "routed" in collected
 
 
+def test_restricted_environment_shares_template_not_globals():
+    first = code.get_restricted_environment("first", lambda s: None)
+    second = code.get_restricted_environment("second", lambda s: None)
+    assert first["_getattr_"] is second["_getattr_"]
+    assert first["__builtins__"] is second["__builtins__"]
+    assert first["_print"] is not second["_print"]
+    first["leaked"] = True
+    assert "leaked" not in second
+    assert "leaked" not in code.get_restricted_environment("third", lambda s: None)
+
+
+def test_restricted_environment_follows_allowed_builtins(settings):
+    assert "sum" in code.get_restricted_environment("test", lambda s: None)["__builtins__"]
+    settings.ALLOWED_BUILTINS = tuple(n for n in settings.ALLOWED_BUILTINS if n != "sum")
+    assert "sum" not in code.get_restricted_environment("test", lambda s: None)["__builtins__"]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_attribute_guard_table_still_checks_each_instance(t_init: Object, t_wizard: Object):
+    with _ctx(t_wizard):
+        player = create("guard player")
+        readable = create("readable")
+        hidden = create("hidden")
+        hidden.deny(player, "read")
+    with _ctx(player):
+        env = code.get_restricted_environment("test", lambda s: None)
+        # The first access caches the (Object, "name") action; the read
+        # check it selects must still run against the second instance.
+        assert env["_getattr_"](readable, "name") == "readable"
+        with pytest.raises(PermissionError):
+            env["_getattr_"](hidden, "name")
+        with pytest.raises(AttributeError):
+            env["_getattr_"](readable, "_state")
+        with pytest.raises(AttributeError):
+            env["_getattr_"]("{}", "format")
+        with pytest.raises(AttributeError):
+            env["_getattr_"](str, "format")
+        assert env["__builtins__"]["getattr"](readable, "missing", 1) == 1
+
+
 def test_inplace_var_addition():
     env = code.get_restricted_environment("test", lambda s: None)
     assert env["_inplacevar_"]("+=", 2, 3) == 5
@@ -3,7 +3,10 @@
 Tests for moo/core/models/acl.py — Permission, Access, AccessibleMixin.
 """
 
+import importlib
+
 from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
 
 import pytest
 
@@ -441,3 +444,51 @@ def test_change_location_checks_recursion(t_init: Object, t_wizard: Object):
             box.location = envelope
             box.save()
         assert str(excinfo.value) == f"#{box.pk} (box) already contains #{envelope.pk} (envelope)"
+
+
+# ---------------------------------------------------------------------------
+# Implicit default ACLs
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_implicit_default_acl_can_be_overridden_by_deny(t_init, t_wizard):
+    player = Object.objects.create(name="player")
+    with _ctx(t_wizard):
+        obj = create("implicit obj")
+    assert not Access.objects.filter(object=obj).exists()
+    with _ctx(t_wizard):
+        assert player.is_allowed("read", obj)
+        obj.deny("everyone", "read")
+        assert not player.is_allowed("read", obj)
+    assert list(Access.objects.filter(object=obj).values_list("rule", "group")) == [("deny", "everyone")]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_strip_default_rows_migration(t_init, t_wizard, settings):
+    # Drive the RunPython step with the historical models, as migrate would.
+    migration = ("core", "0040_implicit_default_acls")
+    strip = importlib.import_module("moo.core.migrations.0040_implicit_default_acls").strip_default_rows
+    apps = MigrationExecutor(connection).loader.project_state(migration).apps
+    player = Object.objects.create(name="player")
+    settings.MOO_IMPLICIT_DEFAULT_ACLS = False
+    with _ctx(t_wizard):
+        plain = create("plain obj")
+        extra = create("extra obj")
+        extra.allow(player, "write")
+        private = create("private obj")
+    Access.objects.filter(object=private, group="everyone").delete()
+    settings.MOO_IMPLICIT_DEFAULT_ACLS = True
+    strip(apps, None)
+    plain.refresh_from_db()
+    extra.refresh_from_db()
+    private.refresh_from_db()
+    assert plain._implicit_acl and not Access.objects.filter(object=plain).exists()  # pylint: disable=protected-access
+    assert extra._implicit_acl and Access.objects.filter(object=extra).count() == 1  # pylint: disable=protected-access
+    # A deviation from the default keeps the entity explicit, rows and all.
+    assert not private._implicit_acl and Access.objects.filter(object=private).count() == 2  # pylint: disable=protected-access
+    with _ctx(t_wizard):
+        assert player.is_allowed("read", plain)
+        assert player.is_allowed("write", extra)
+        assert not player.is_allowed("read", private)
+        assert t_wizard.is_allowed("write", private)
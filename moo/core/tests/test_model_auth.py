@@ -72,6 +72,19 @@ def test_object_is_wizard_false(t_init, t_wizard):
     assert not obj.is_wizard()
 
 
+def test_object_is_wizard_is_remembered_for_the_session(t_init, t_wizard, django_assert_num_queries):
+    with _ctx(t_wizard):
+        obj = create("memo avatar")
+        player = Player.objects.create(avatar=obj, wizard=False)
+        assert not obj.is_wizard()
+        with django_assert_num_queries(0):
+            assert not obj.is_wizard()
+        # Saving the Player drops the memo, so a promotion is seen at once.
+        player.wizard = True
+        player.save()
+        assert obj.is_wizard()
+
+
 # ---------------------------------------------------------------------------
 # Object.is_connected() is always True
 # ---------------------------------------------------------------------------
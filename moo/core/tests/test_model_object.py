@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 """
-Tests for moo/core/models/object.py — Object, Relationship, Alias, AncestorCache.
+Tests for moo/core/models/object.py — Object, Relationship, Alias, AncestorCache, ContainmentCache.
 
 Only objects from bootstrap.initialize_dataset() are treated as pre-existing:
 System Object (pk=1), Wizard, Permissions, Prepositions.
@@ -10,7 +10,7 @@ All other objects, verbs, and properties are created within each test.
 import pytest
 
 from .. import code, create, exceptions, lookup
-from ..models import Alias, AncestorCache, Object, Player, Property, Verb
+from ..models import Alias, AncestorCache, ContainmentCache, Object, Player, Property, Verb
 from .utils import ctx as _ctx
 
 # ---------------------------------------------------------------------------
@@ -244,6 +244,71 @@ def test_object_get_contents_nested(t_init, t_wizard):
     assert depths[box.pk] < depths[gem.pk]
 
 
+def _expected_containment_rows(pks):
+    """Reference ContainmentCache rows for `pks`, walking ``location`` one hop at a time."""
+    rows = set()
+    for obj in Object.global_objects.filter(pk__in=pks):
+        depth, container = 1, obj.location
+        while container is not None:
+            rows.add((obj.pk, container.pk, depth))
+            depth, container = depth + 1, container.location
+    return rows
+
+
+def _cached_containment_rows(pks):
+    return set(ContainmentCache.objects.filter(content_id__in=pks).values_list("content_id", "container_id", "depth"))
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_containment_cache_follows_nested_moves(t_init, t_wizard):
+    with _ctx(t_wizard):
+        containers = create("container class")
+        containers.add_verb("accept", code="return True")
+        room = create("closure room", parents=[containers])
+        hall = create("closure hall", parents=[containers])
+        chest = create("closure chest", parents=[containers], location=room)
+        box = create("closure box", parents=[containers], location=chest)
+        gem = create("closure gem", location=box)
+    pks = [room.pk, hall.pk, chest.pk, box.pk, gem.pk]
+    assert _cached_containment_rows(pks) == _expected_containment_rows(pks)
+    with _ctx(t_wizard):
+        chest.location = hall
+        chest.save()
+    assert not room.contains(gem)
+    assert hall.contains(gem)
+    assert _cached_containment_rows(pks) == _expected_containment_rows(pks)
+    with _ctx(t_wizard):
+        box.location = None
+        box.save()
+    assert _cached_containment_rows(pks) == _expected_containment_rows(pks)
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_containment_cache_detaches_contents_of_deleted_object(t_init, t_wizard):
+    with _ctx(t_wizard):
+        containers = create("container class")
+        containers.add_verb("accept", code="return True")
+        room = create("doomed room", parents=[containers])
+        box = create("doomed box", parents=[containers], location=room)
+        gem = create("doomed gem", location=box)
+        box.delete()
+    assert not room.contains(gem)
+    assert not ContainmentCache.objects.filter(content=gem).exists()
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_object_contains_is_a_single_query(t_init, t_wizard, django_assert_num_queries):
+    with _ctx(t_wizard):
+        containers = create("container class")
+        containers.add_verb("accept", code="return True")
+        room = create("deep room", parents=[containers])
+        inner = room
+        for i in range(5):
+            inner = create(f"deep box {i}", parents=[containers], location=inner)
+        with django_assert_num_queries(1):
+            assert room.contains(inner)
+
+
 # ---------------------------------------------------------------------------
 # Verbs
 # ---------------------------------------------------------------------------
@@ -589,3 +654,68 @@ def test_ancestor_cache_rebuilt_on_parents_remove(t_init, t_wizard):
     with _ctx(t_wizard):
         child.parents.remove(parent)
     assert not AncestorCache.objects.filter(descendant=child, ancestor=parent).exists()
+
+
+def _cte_ancestor_rows(pks):
+    """Reference AncestorCache rows for `pks`, computed with the recursive CTE."""
+    from django_cte import with_cte
+
+    from ..models.object import _make_ancestors_cte
+
+    expected = set()
+    for pk in pks:
+        ancestors_cte = _make_ancestors_cte(pk)
+        seen = set()
+        for row in with_cte(
+            ancestors_cte,
+            select=ancestors_cte.join(Object, id=ancestors_cte.col.object_id)
+            .annotate(depth=ancestors_cte.col.depth, path_weight=ancestors_cte.col.path_weight)
+            .order_by("depth", "-path_weight"),
+        ).values("id", "depth", "path_weight"):
+            if row["id"] not in seen:
+                seen.add(row["id"])
+                expected.add((pk, row["id"], row["depth"], row["path_weight"]))
+    return expected
+
+
+def _cached_ancestor_rows(pks):
+    return set(
+        AncestorCache.objects.filter(descendant_id__in=pks).values_list(
+            "descendant_id", "ancestor_id", "depth", "path_weight"
+        )
+    )
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_ancestor_cache_incremental_matches_cte(t_init, t_wizard):
+    """Set-based maintenance agrees with a full CTE rebuild through diamonds and removals."""
+    with _ctx(t_wizard):
+        root = create("ac root")
+        left = create("ac left", parents=[root])
+        right = create("ac right", parents=[root])
+        middle = create("ac middle", parents=[left, right])
+        leaf = create("ac leaf", parents=[middle])
+        twig = create("ac twig", parents=[leaf, right])
+        graft = create("ac graft", parents=[create("ac stock")])
+        pks = [o.pk for o in (root, left, right, middle, leaf, twig, graft)]
+        assert _cached_ancestor_rows(pks) == _cte_ancestor_rows(pks)
+        middle.parents.add(graft)
+        assert _cached_ancestor_rows(pks) == _cte_ancestor_rows(pks)
+        middle.parents.remove(left)
+        assert _cached_ancestor_rows(pks) == _cte_ancestor_rows(pks)
+        leaf.parents.remove(middle)
+        assert _cached_ancestor_rows(pks) == _cte_ancestor_rows(pks)
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_ancestor_cache_rebuild_statement_count_is_constant(t_init, t_wizard, django_assert_num_queries):
+    from ..models.object import _rebuild_ancestor_cache_for
+
+    with _ctx(t_wizard):
+        root = create("ac wide root")
+        for i in range(20):
+            create(f"ac wide child {i}", parents=[root])
+    # One DELETE and one INSERT, plus the descendant read that bumps their
+    # attribute generations.
+    with django_assert_num_queries(3):
+        _rebuild_ancestor_cache_for(root)
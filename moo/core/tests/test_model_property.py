@@ -39,7 +39,8 @@ def test_property_kind(t_init, t_wizard):
 # ---------------------------------------------------------------------------
 
 
-def test_property_save_applies_default_permissions(t_init, t_wizard):
+def test_property_save_applies_default_permissions(t_init, t_wizard, settings):
+    settings.MOO_IMPLICIT_DEFAULT_ACLS = False
     with _ctx(t_wizard):
         obj = create("prop perm obj")
         obj.set_property("myprop", "value")
@@ -47,6 +48,19 @@ def test_property_save_applies_default_permissions(t_init, t_wizard):
     assert Access.objects.filter(property=prop).exists()
 
 
+def test_property_save_implicit_default_permissions(t_init, t_wizard):
+    with _ctx(t_wizard):
+        obj = create("prop perm obj")
+        obj.set_property("myprop", "value")
+    prop = obj.properties.get(name="myprop")
+    assert prop._implicit_acl  # pylint: disable=protected-access
+    assert not Access.objects.filter(property=prop).exists()
+    player = Object.objects.create(name="player")
+    assert player.is_allowed("read", prop)
+    assert not player.is_allowed("write", prop)
+    assert t_wizard.is_allowed("write", prop)
+
+
 # ---------------------------------------------------------------------------
 # inherit_owner propagation
 # ---------------------------------------------------------------------------
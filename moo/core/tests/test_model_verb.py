@@ -67,7 +67,8 @@ def test_verb_name_returns_first(t_init, t_wizard):
 
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
-def test_verb_save_applies_default_permissions(t_init, t_wizard):
+def test_verb_save_applies_default_permissions(t_init, t_wizard, settings):
+    settings.MOO_IMPLICIT_DEFAULT_ACLS = False
     from ..models import Access
 
     with _ctx(t_wizard):
@@ -77,6 +78,20 @@ def test_verb_save_applies_default_permissions(t_init, t_wizard):
     assert Access.objects.filter(verb=v).exists()
 
 
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_verb_save_implicit_default_permissions(t_init, t_wizard):
+    from ..models import Access
+
+    with _ctx(t_wizard):
+        obj = create("perm obj")
+        obj.add_verb("permverb", code="pass")
+    v = obj.verbs.get(names__name="permverb")
+    assert not Access.objects.filter(verb=v).exists()
+    player = Object.objects.create(name="player")
+    assert player.is_allowed("execute", v)
+    assert not player.is_allowed("write", v)
+
+
 # ---------------------------------------------------------------------------
 # Verb.is_bound()
 # ---------------------------------------------------------------------------
@@ -171,6 +171,40 @@ def test_property_roundtrip(t_init, t_wizard):
     assert result.pk == prop.pk
 
 
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_references_resolve_with_one_query_per_model(t_init, t_wizard, django_assert_num_queries):
+    from .. import code, create
+
+    with code.ContextManager(t_wizard, lambda m: None):
+        objs = [create("moojson bulk %d" % i) for i in range(20)]
+        objs[0].add_verb("bulk_verb", code="pass")
+        objs[0].set_property("bulk_prop", 1)
+    verb = objs[0].verbs.get(names__name="bulk_verb")
+    prop = objs[0].properties.get(name="bulk_prop")
+    payload = moojson.dumps({"exits": objs, "nested": [[objs[3]], {"v": verb, "p": prop}], "n": 1})
+    with django_assert_num_queries(3):
+        result = moojson.loads(payload)
+    assert [o.pk for o in result["exits"]] == [o.pk for o in objs]
+    assert result["nested"][0][0].pk == objs[3].pk
+    assert result["nested"][1]["v"].pk == verb.pk
+    assert result["nested"][1]["p"].pk == prop.pk
+    assert result["n"] == 1
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_missing_references_decode_as_nothing(t_init, t_wizard):
+    from .. import code, create, lookup
+
+    with code.ContextManager(t_wizard, lambda m: None):
+        obj = create("moojson doomed")
+        nothing = lookup("nothing")
+    payload = moojson.dumps([obj, obj])
+    obj.delete()
+    moojson.clear_nothing_cache()
+    assert [o.pk for o in moojson.loads(payload)] == [nothing.pk, nothing.pk]
+    assert moojson.loads('{"v#999999": "gone"}').pk == nothing.pk
+
+
 # ---------------------------------------------------------------------------
 # dumps raises TypeError for unserializable types
 # ---------------------------------------------------------------------------
@@ -0,0 +1,62 @@
+"""The hot name lookups must be answered by the LOWER() functional indexes."""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .. import code, parse
+from ..models import Object
+
+pytestmark = pytest.mark.skipif(connection.vendor != "sqlite", reason="reads SQLite's EXPLAIN QUERY PLAN output")
+
+
+def _plans(fn):
+    """
+    Run `fn` and return the query plan of every statement it ran that compares
+    a LOWER() expression.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        fn()
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries.captured_queries:
+            if "LOWER(" in query["sql"]:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plans.append(" ".join(row[-1] for row in cursor.fetchall()))
+    assert plans, "no case-insensitive lookup was run"
+    return plans
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_lookup_probes_the_name_and_alias_indexes(t_init: Object, t_wizard: Object):
+    from moo.sdk import lookup
+
+    with code.ContextManager(t_wizard, lambda _: None):
+        plans = _plans(lambda: lookup("WIZARD"))
+    assert len(plans) == 1
+    plan = plans[0]
+    assert "USING INDEX object_name_lower_idx" in plan
+    assert "USING INDEX alias_lower_idx" in plan
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_find_probes_the_alias_index(t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        room = t_wizard.location
+        plans = _plans(lambda: list(room.find("Wizard")))
+    assert len(plans) == 1
+    plan = plans[0]
+    assert "USING INDEX alias_lower_idx" in plan
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_verb_dispatch_probes_the_verb_name_index(t_init: Object, t_wizard: Object, settings):
+    # The verb dispatch index answers repeat lookups without a name query.
+    settings.MOO_VERB_INDEX_SIZE = 0
+    with code.ContextManager(t_wizard, lambda _: None):
+        parser = parse.Parser(parse.Lexer("LOOK"), t_wizard)
+        plans = _plans(parser.get_verb)
+    assert all("USING INDEX verbname_name_lower_idx" in plan for plan in plans)
@@ -0,0 +1,118 @@
+"""Tests for per-task output coalescing (moo/core/outbox.py)."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
+from django.db import transaction
+
+from moo.celery import app
+
+from .. import _publish_to_player, code
+from ..models import Object, Player
+
+
+@pytest.fixture()
+def producer():
+    fake = MagicMock()
+    producer_cm = MagicMock()
+    producer_cm.__enter__.return_value = fake
+    producer_cm.__exit__.return_value = False
+    original_broker = app.conf.broker_url
+    app.conf.broker_url = "redis://fake"  # bypass the memory:// short-circuit
+    try:
+        with patch.object(app, "producer_or_acquire", return_value=producer_cm):
+            yield fake
+    finally:
+        app.conf.broker_url = original_broker
+
+
+def _listener(t_wizard):
+    player = Object.objects.get(name="Player")
+    Player.objects.filter(avatar=player).update(user=User.objects.create(username="listener"))
+    return player
+
+
+def _published(fake_producer):
+    return {call.kwargs["routing_key"]: call.args[0] for call in fake_producer.publish.call_args_list}
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_output_is_sent_on_exit_as_one_envelope_per_recipient(producer, t_init: Object, t_wizard: Object):
+    listener = _listener(t_wizard)
+    with code.ContextManager(t_wizard, lambda _: None, coalesce_output=True):
+        with transaction.atomic():
+            _publish_to_player(listener, "one")
+            _publish_to_player(t_wizard, "mine")
+            _publish_to_player(listener, "two", kind="say")
+            _publish_to_player(listener, {"event": "input_prompt", "prompt": "?"})
+        producer.publish.assert_not_called()
+    published = _published(producer)
+    assert len(published) == 2
+    batch = published[f"user-{Player.objects.get(avatar=listener).user_id}"]["batch"]
+    assert [line["message"] for line in batch] == ["one", "two", {"event": "input_prompt", "prompt": "?"}]
+    assert [line["kind"] for line in batch] == ["text", "say", "text"]
+    assert all(line["caller_id"] == t_wizard.pk for line in batch)
+    # A recipient with a single line gets a plain envelope.
+    assert published[f"user-{Player.objects.get(avatar=t_wizard).user_id}"]["message"] == "mine"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_output_from_a_rolled_back_transaction_is_dropped(producer, t_init: Object, t_wizard: Object):
+    listener = _listener(t_wizard)
+    with code.ContextManager(t_wizard, lambda _: None, coalesce_output=True):
+        with transaction.atomic():
+            _publish_to_player(listener, "never sent")
+            transaction.set_rollback(True)
+        with transaction.atomic():
+            _publish_to_player(listener, "sent")
+    (body,) = _published(producer).values()
+    assert body["message"] == "sent"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_output_from_a_rolled_back_savepoint_is_dropped(producer, t_init: Object, t_wizard: Object):
+    listener = _listener(t_wizard)
+    with code.ContextManager(t_wizard, lambda _: None, coalesce_output=True):
+        with transaction.atomic():
+            _publish_to_player(listener, "before")
+            with transaction.atomic():
+                _publish_to_player(listener, "never sent")
+                transaction.set_rollback(True)
+            _publish_to_player(listener, "after")
+    (body,) = _published(producer).values()
+    assert [line["message"] for line in body["batch"]] == ["before", "after"]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_session_closed_inside_a_transaction_waits_for_its_commit(producer, t_init: Object, t_wizard: Object):
+    listener = _listener(t_wizard)
+    with transaction.atomic():
+        with code.ContextManager(t_wizard, lambda _: None, coalesce_output=True):
+            _publish_to_player(listener, "first")
+            _publish_to_player(listener, "second")
+        producer.publish.assert_not_called()
+    (body,) = _published(producer).values()
+    assert [line["message"] for line in body["batch"]] == ["first", "second"]
+    producer.publish.reset_mock()
+    with transaction.atomic():
+        with code.ContextManager(t_wizard, lambda _: None, coalesce_output=True):
+            _publish_to_player(listener, "never sent")
+        transaction.set_rollback(True)
+    producer.publish.assert_not_called()
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_output_outside_a_transaction_is_sent_when_the_session_ends(producer, t_init: Object, t_wizard: Object):
+    listener = _listener(t_wizard)
+    with code.ContextManager(t_wizard, lambda _: None, coalesce_output=True):
+        _publish_to_player(listener, "first")
+        _publish_to_player(listener, "second")
+        producer.publish.assert_not_called()
+    (body,) = _published(producer).values()
+    assert [line["message"] for line in body["batch"]] == ["first", "second"]
@@ -1,7 +1,8 @@
 import pytest
+from django.core.cache import cache
 
-from moo.core import code, exceptions, lookup, parse
-from moo.core.models.object import Object
+from moo.core import code, create, exceptions, lookup, parse
+from moo.core.models.object import SCOPE_GENERATION_KEY, Object, shared_scope_generation
 
 
 def test_lex_imperative_command():
@@ -569,6 +570,86 @@ def test_interpret_runs_each_fragment(t_init, t_wizard):
     assert "running" in printed
 
 
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_fragments_share_one_command_scope(t_init, t_wizard):
+    """Fragments run in the same place load the contents and System Object once."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    t_wizard.add_verb("walk", code="print('walking')")
+    t_wizard.add_verb("run", code="print('running')")
+    printed = []
+    with code.ContextManager(t_wizard, printed.append) as ctx:
+        with CaptureQueriesContext(connection) as queries:
+            parse.interpret(ctx, "walk. run. walk")
+    assert printed == ["walking", "running", "walking"]
+    sql = [q["sql"] for q in queries.captured_queries]
+    assert sum('"location_id" IN' in q for q in sql) == 1
+    assert sum(q.startswith('SELECT "core_object"') and "System Object" in q for q in sql) == 1
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_fragment_sees_objects_created_by_the_previous_one(t_init, t_wizard):
+    """Creating, moving or renaming anything makes the next fragment rebuild its scope."""
+    t_wizard.add_verb(
+        "conjure", code="from moo.sdk import context, create; create('widget', location=context.player.location)"
+    )
+    t_wizard.add_verb(
+        "poke", code="from moo.sdk import context; print(context.parser.get_dobj().name)", direct_object="any"
+    )
+    printed = []
+    with code.ContextManager(t_wizard, printed.append) as ctx:
+        scope = parse.CommandScope(t_wizard)
+        assert scope.is_current(t_wizard)
+        parse.interpret(ctx, "conjure. poke widget")
+        assert not scope.is_current(t_wizard)
+    assert printed == ["widget"]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_scope_is_not_carried_over_past_another_process_write(t_init, t_wizard):
+    """A move made by another worker between fragments is seen through the shared generation."""
+    with code.ContextManager(t_wizard, lambda _: None):
+        scope = parse.CommandScope(t_wizard)
+        # Another process's move bumps only the shared counter, not this one's.
+        cache.set(SCOPE_GENERATION_KEY, (shared_scope_generation() or 0) + 1, timeout=None)
+        assert scope.is_current(t_wizard)
+        assert not scope.is_current(t_wizard, shared=True)
+        assert parse.CommandScope(t_wizard).is_current(t_wizard, shared=True)
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_fragment_sees_verbs_added_by_the_previous_one(t_init, t_wizard):
+    """A verb added by one fragment is dispatched by the hooks of the next, though the scope is reused."""
+    t_wizard.add_verb("noop", code="pass")
+    t_wizard.add_verb("arm", code="this.location.add_verb('turnfunc', code='print(\"tick\")')")
+    printed = []
+    with code.ContextManager(t_wizard, printed.append) as ctx:
+        parse.interpret(ctx, "noop. arm. noop")
+    assert printed == ["tick", "tick"]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_turnfunc_runs_the_first_of_several_matches(t_init, t_wizard):
+    """Like Object.invoke_verb(), the turnfunc hook runs the first match instead of failing as ambiguous."""
+    t_wizard.add_verb("noop", code="pass")
+    with code.ContextManager(t_wizard, lambda _: None):
+        room = t_wizard.location
+        room.add_verb("turnfunc", code="print('first')")
+        room.add_verb("turnfunc", code="print('second')")
+        with pytest.raises(exceptions.AmbiguousVerbError):
+            room.get_verb("turnfunc")
+    printed = []
+    with code.ContextManager(t_wizard, printed.append) as ctx:
+        parse.interpret(ctx, "noop")
+    assert len(printed) == 1
+
+
 # ---------------------------------------------------------------------------
 # Item 5 — dead-object error classification
 # ---------------------------------------------------------------------------
@@ -671,3 +752,38 @@ def test_ispec_this_constraint_is_enforced(t_init, t_wizard):
     with code.ContextManager(t_wizard, [].append) as ctx:
         with pytest.raises(exceptions.NoSuchVerbError):
             parse.interpret(ctx, "zorch2 zstick to wizard")
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_noun_phrases_resolve_from_one_scope_snapshot(t_init, t_wizard):
+    """Every dobj/pobj is matched against one load of inventory, room contents and aliases."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with code.ContextManager(t_wizard, lambda _: None):
+        room = t_wizard.location
+        things = {}
+        for name in ("red key", "small box", "table"):
+            things[name] = create(name, location=room)
+            things[name].aliases.create(alias=name.split()[-1])
+        caller = Object.objects.get(pk=t_wizard.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            parser = parse.Parser(parse.Lexer("put the red key in the small box on the box"), caller)
+    assert parser.get_dobj() == things["red key"]
+    assert parser.get_pobj("in") == things["small box"]
+    assert parser.get_pobj("on") == things["small box"]
+    sql = [q["sql"] for q in ctx.captured_queries]
+    assert sum('"core_alias"' in q for q in sql) == 1
+    assert sum('"location_id" IN' in q for q in sql) == 1
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_scope_snapshot_is_not_reused_after_parsing(t_init, t_wizard):
+    """find_object() after construction sees objects that arrived since."""
+    with code.ContextManager(t_wizard, lambda _: None):
+        parser = parse.Parser(parse.Lexer("look at lantern"), t_wizard)
+        assert parser.get_pobj_str("at") == "lantern"
+        lantern = create("lantern", location=t_wizard.location)
+        assert parser.find_object(None, "lantern") == lantern
@@ -0,0 +1,105 @@
+"""Tests for the presence registry (moo/core/presence.py)."""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+
+from .. import presence
+
+
+@pytest.fixture(autouse=True)
+def _clear_presence():
+    yield
+    presence._local.clear()  # pylint: disable=protected-access
+    cache.clear()
+
+
+def test_avatar_stays_online_until_its_last_session_leaves():
+    first = presence.join(7, site_pk=1)
+    second = presence.join(7, site_pk=1)
+    presence.join(8, site_pk=2)
+    assert presence.online(site_pk=1) == {7}
+    presence.leave(first)
+    assert presence.online(site_pk=1) == {7}
+    presence.leave(second)
+    assert presence.online(site_pk=1) == set()
+    assert presence.online(site_pk=2) == {8}
+
+
+def test_beat_refreshes_every_local_session():
+    presence.join(7, site_pk=1)
+    presence.join(8, site_pk=2)
+    # As if this process had stopped heartbeating long ago.
+    cache.set("moo:presence:1", {key: 0 for key in cache.get("moo:presence:1")}, timeout=None)
+    assert presence.online(site_pk=1) == set()
+    assert presence.beat() == 2
+    assert presence.online(site_pk=1) == {7}
+    assert presence.online(site_pk=2) == {8}
+
+
+def test_sessions_of_a_dead_server_are_not_active():
+    presence.join(7, site_pk=1)
+    assert presence.last_active(7, site_pk=1) is not None
+    # As if the server had died without logging the session out.
+    cache.set("moo:presence:1:avatar:7", {key: 0 for key in cache.get("moo:presence:1:avatar:7")}, timeout=None)
+    assert presence.last_active(7, site_pk=1) is None
+    assert cache.get("moo:presence:1:avatar:7") == {}
+    assert cache.get("moo:presence:1:active") == {}
+
+
+def test_connected_prunes_expired_sessions():
+    live = presence.join(7, site_pk=1)
+    presence.join(7, site_pk=1)
+    cache.set("moo:presence:1:avatar:7", {key: 0 for key in cache.get("moo:presence:1:avatar:7")}, timeout=None)
+    presence.touch(live)
+    assert presence.connected([7], site_pk=1) == {7}
+    assert list(cache.get("moo:presence:1:avatar:7")) == [live]
+
+
+def test_touch_and_leave_ignore_unknown_tokens():
+    presence.touch("7:unknown")
+    presence.leave("7:unknown")
+    assert presence.online(site_pk=1) == set()
+
+
+def test_connected_checks_only_the_given_avatars():
+    presence.join(7, site_pk=1)
+    presence.join(8, site_pk=2)
+    assert presence.connected([7, 8, 9], site_pk=1) == {7}
+    assert presence.connected([], site_pk=1) == set()
+
+
+def test_leave_keeps_the_avatar_active_while_another_session_is_live():
+    first = presence.join(7, site_pk=1)
+    second = presence.join(7, site_pk=1)
+    presence.leave(first)
+    assert presence.last_active(7, site_pk=1) is not None
+    assert presence.online(site_pk=1, within=timedelta(minutes=5)) == {7}
+    presence.leave(second)
+    assert presence.last_active(7, site_pk=1) is None
+    assert presence.connected([7], site_pk=1) == set()
+
+
+def test_concurrent_writers_against_redis(redis_cache):
+    """Sessions registered at once from many threads are all kept."""
+    site_pk = uuid.uuid4().int % 10**9
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            tokens = list(pool.map(lambda pk: presence.join(pk, site_pk=site_pk), [*range(1, 41), 1]))
+        assert presence.online(site_pk=site_pk) == set(range(1, 41))
+        assert presence.connected([1, 40, 41], site_pk=site_pk) == {1, 40}
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(presence.leave, tokens[1:40]))
+        assert presence.online(site_pk=site_pk) == {1}
+        assert presence.last_active(1, site_pk=site_pk) is not None
+        presence.leave(tokens[0])
+        presence.leave(tokens[40])
+        assert presence.online(site_pk=site_pk) == set()
+        assert presence.last_active(1, site_pk=site_pk) is None
+    finally:
+        keys = list(redis_cache.scan_iter(f"moo:presence:{site_pk}*"))
+        if keys:
+            redis_cache.delete(*keys)
@@ -0,0 +1,97 @@
+"""Tests for the Redis storage helpers (moo/core/store.py)."""
+
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from .. import store
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_push_keeps_the_newest_entries_first():
+    for i in range(5):
+        store.push("list", f"cmd-{i}", maxlen=3, timeout=60)
+    assert store.items("list") == ["cmd-4", "cmd-3", "cmd-2"]
+
+
+def test_distinct_push_skips_a_repeated_head():
+    assert store.push("list", "look", maxlen=10, timeout=60, distinct=True) is True
+    assert store.push("list", "look", maxlen=10, timeout=60, distinct=True) is False
+    store.push("list", "north", maxlen=10, timeout=60, distinct=True)
+    store.push("list", "look", maxlen=10, timeout=60, distinct=True)
+    assert store.items("list") == ["look", "north", "look"]
+
+
+def test_hash_fields_are_set_read_and_discarded():
+    store.hash_set("hash", "mode", "raw", timeout=60)
+    store.hash_set("hash", "iac", {"gmcp": True}, timeout=60)
+    assert store.hash_items("hash") == {"mode": "raw", "iac": {"gmcp": True}}
+    store.hash_discard("hash", "iac")
+    assert store.hash_get("hash", "iac", "none") == "none"
+    store.delete("hash")
+    assert store.hash_items("hash") == {}
+
+
+def test_incr_counts_from_one():
+    assert [store.incr("counter", timeout=60) for _ in range(3)] == [1, 2, 3]
+
+
+def test_redis_operations_are_one_round_trip():
+    client = MagicMock()
+    pipe = client.pipeline.return_value
+    pipe.execute.return_value = [True, 4]
+    with patch.object(store, "redis", return_value=client):
+        assert store.incr("counter", timeout=60) == 4
+        store.push("list", "look", maxlen=500, timeout=60)
+        store.hash_set("hash", "mode", "raw", timeout=60)
+    assert pipe.execute.call_count == 3
+    pipe.set.assert_called_once_with("counter", 0, ex=60, nx=True)
+    pipe.lpush.assert_called_once_with("list", '"look"')
+    pipe.ltrim.assert_called_once_with("list", 0, 499)
+    pipe.hset.assert_called_once_with("hash", "mode", '"raw"')
+    client.get.assert_not_called()
+    client.set.assert_not_called()
+
+
+def test_zcount_prunes_members_below_the_cutoff():
+    store.zadd({"zset": {"old": 1, "new": 5}, "other": {"old": 1}})
+    assert store.zcount([("zset", 2, 2), ("other", 0, None)]) == [1, 1]
+    assert store.zrange_since([("zset", 0, None)]) == [["new"]]
+
+
+def test_redis_backend_is_detected():
+    """redis() sees through the ``cache`` proxy to the configured backend."""
+    assert store.redis() is None
+    redis_cache = {
+        "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost"}
+    }
+    with override_settings(CACHES=redis_cache):
+        assert store.redis() is not None
+
+
+def test_operations_against_redis(redis_cache):
+    key = f"moo:test:{uuid.uuid4()}"
+    try:
+        for i in range(4):
+            store.push(f"{key}:list", f"cmd-{i}", maxlen=3, timeout=60, distinct=True)
+        assert store.push(f"{key}:list", "cmd-3", maxlen=3, timeout=60, distinct=True) is False
+        assert store.items(f"{key}:list") == ["cmd-3", "cmd-2", "cmd-1"]
+        assert 0 < redis_cache.ttl(f"{key}:list") <= 60
+        store.hash_set(f"{key}:hash", "iac", {"gmcp": True}, timeout=60)
+        assert store.hash_items(f"{key}:hash") == {"iac": {"gmcp": True}}
+        assert [store.incr(f"{key}:counter", timeout=60) for _ in range(3)] == [1, 2, 3]
+        assert 0 < redis_cache.ttl(f"{key}:counter") <= 60
+        store.zadd({f"{key}:zset": {"old": 1, "new": 5}})
+        assert store.zcount([(f"{key}:zset", 2, 2)]) == [1]
+        assert store.zrange_since([(f"{key}:zset", 0, None)]) == [["new"]]
+    finally:
+        redis_cache.delete(f"{key}:list", f"{key}:hash", f"{key}:counter", f"{key}:zset")
@@ -0,0 +1,71 @@
+"""Tests for the per-site System Object cache (moo/core/system_object.py)."""
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .. import code, exceptions, system_object
+from ..models import Object
+
+
+@pytest.fixture()
+def enabled(settings):
+    settings.MOO_SYSTEM_OBJECT_CACHE = True
+    cache.clear()
+    system_object.clear()
+    yield
+    system_object.clear()
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_warm_reads_do_not_query_the_system_object(enabled, t_init: Object, t_wizard: Object):
+    from moo.sdk import lookup
+
+    with code.ContextManager(t_wizard, lambda _: None):
+        system_object.get_system().set_property("zz_knob", 5)
+        lookup("$zz_knob")
+        with CaptureQueriesContext(connection) as queries:
+            system = system_object.get_system()
+            value = lookup("$zz_knob")
+    assert system.name == "System Object"
+    assert value == 5
+    assert not [q for q in queries.captured_queries if '"core_object"' in q["sql"] or '"core_property"' in q["sql"]]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_property_write_is_seen_on_the_next_lookup(enabled, t_init: Object, t_wizard: Object):
+    from moo.sdk import lookup
+
+    with code.ContextManager(t_wizard, lambda _: None):
+        system = system_object.get_system()
+        system.set_property("zz_knob", 1)
+        assert lookup("$zz_knob") == 1
+        system.set_property("zz_knob", 2)
+        assert lookup("$zz_knob") == 2
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_object_names_are_fetched_fresh(enabled, t_init: Object, t_wizard: Object):
+    from moo.sdk import lookup
+
+    with code.ContextManager(t_wizard, lambda _: None):
+        start = lookup("$player_start")
+        Object.objects.filter(pk=start.pk).update(name="Renamed Start")
+        assert lookup("$player_start").name == "Renamed Start"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_missing_names_keep_raising(enabled, t_init: Object, t_wizard: Object):
+    from moo.sdk import lookup
+
+    with code.ContextManager(t_wizard, lambda _: None):
+        for _ in range(2):
+            with pytest.raises(exceptions.NoSuchPropertyError):
+                lookup("$zz_no_such_name")
+        system_object.get_system().set_property("zz_no_such_name", "now")
+        assert lookup("$zz_no_such_name") == "now"
@@ -197,8 +197,100 @@ def test_publish_to_player_uses_producer_pool_only(t_init: Object, t_wizard: Obj
 
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
-def test_parse_command_writes_events_to_cache(t_init: Object, t_wizard: Object):
-    """parse_command stashes published event types under ``moo:task_events:{task_id}`` in the cache."""
+def test_publish_to_player_warm_path_is_one_broker_write(settings, t_init: Object, t_wizard: Object):
+    """
+    Once an avatar's routes are cached and its queue declared on the producer's
+    connection, each further line is a bare publish: no query, no declaration.
+    Rebinding the Player drops the cached route.
+    """
+    from types import SimpleNamespace
+    from unittest.mock import MagicMock, patch
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from moo.celery import app  # pylint: disable=import-outside-toplevel
+    from moo.core import _publish_to_player, _routes  # pylint: disable=import-outside-toplevel
+    from moo.core.models.auth import Player  # pylint: disable=import-outside-toplevel
+
+    settings.MOO_SESSION_ROUTE_CACHE_SIZE = 64
+    settings.MOO_ATTRIB_ANCESTRY_CACHE_SIZE = 64
+    cache.clear()
+    _routes.clear()
+    fake_producer = MagicMock(connection=SimpleNamespace(declared_entities=set()))
+    producer_cm = MagicMock()
+    producer_cm.__enter__.return_value = fake_producer
+    producer_cm.__exit__.return_value = False
+
+    original_broker = app.conf.broker_url
+    app.conf.broker_url = "redis://fake"  # bypass the memory:// short-circuit
+    try:
+        with patch.object(app, "producer_or_acquire", return_value=producer_cm):
+            with code.ContextManager(t_wizard, lambda _: None):
+                _publish_to_player(t_wizard, "first")
+            with code.ContextManager(t_wizard, lambda _: None):
+                with CaptureQueriesContext(connection) as queries:
+                    _publish_to_player(t_wizard, "second")
+            player = Player.objects.get(avatar=t_wizard)
+            player.avatar = None
+            player.save()
+            first, second = fake_producer.publish.call_args_list
+            fake_producer.publish.reset_mock()
+            with code.ContextManager(t_wizard, lambda _: None):
+                _publish_to_player(t_wizard, "third")
+    finally:
+        app.conf.broker_url = original_broker
+        _routes.clear()
+
+    assert first.kwargs["declare"] and second.kwargs["declare"] == []
+    assert not queries.captured_queries
+    fake_producer.publish.assert_not_called()
+    assert len(fake_producer.connection.declared_entities) == 1
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_publish_to_player_reads_the_route_generation_once_per_task(settings, t_init: Object, t_wizard: Object):
+    """The cross-process check on a cached route costs one cache read per task, not one per line."""
+    from types import SimpleNamespace
+    from unittest.mock import MagicMock, patch
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from moo.celery import app  # pylint: disable=import-outside-toplevel
+    from moo.core import _publish_to_player, _routes, attribute_cache  # pylint: disable=import-outside-toplevel
+
+    settings.MOO_SESSION_ROUTE_CACHE_SIZE = 64
+    settings.MOO_ATTRIB_ANCESTRY_CACHE_SIZE = 64
+    cache.clear()
+    _routes.clear()
+    fake_producer = MagicMock(connection=SimpleNamespace(declared_entities=set()))
+    producer_cm = MagicMock()
+    producer_cm.__enter__.return_value = fake_producer
+    producer_cm.__exit__.return_value = False
+
+    original_broker = app.conf.broker_url
+    app.conf.broker_url = "redis://fake"  # bypass the memory:// short-circuit
+    try:
+        with patch.object(app, "producer_or_acquire", return_value=producer_cm):
+            with code.ContextManager(t_wizard, lambda _: None):
+                _publish_to_player(t_wizard, "warm")
+            with code.ContextManager(t_wizard, lambda _: None):
+                with patch.object(attribute_cache, "cache", wraps=attribute_cache.cache) as backend:
+                    with CaptureQueriesContext(connection) as queries:
+                        for i in range(5):
+                            _publish_to_player(t_wizard, f"line {i}")
+    finally:
+        app.conf.broker_url = original_broker
+        _routes.clear()
+    assert fake_producer.publish.call_count == 6
+    assert backend.get_many.call_count == 1
+    assert not queries.captured_queries
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_parse_command_returns_events_with_output(t_init: Object, t_wizard: Object):
+    """parse_command returns published event types in its result, not through the cache."""
     from moo.core.models import verb  # noqa: F401  pylint: disable=unused-import,import-outside-toplevel
 
     v = t_wizard.add_verb(
@@ -215,16 +307,14 @@ open_input(context.caller, "prompt: ", this_verb)
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", RuntimeWarning)
         result = tasks.parse_command.apply(args=[t_wizard.pk, "test-emits-input"])
-    try:
-        events = cache.get(f"moo:task_events:{result.id}")
-        assert events == ["input_prompt"]
-    finally:
-        cache.delete(f"moo:task_events:{result.id}")
+    _output, _exit_status, events = result.get()
+    assert events == ["input_prompt"]
+    assert cache.get(f"moo:task_events:{result.id}") is None
 
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
-def test_parse_command_no_events_leaves_cache_empty(t_init: Object, t_wizard: Object):
-    """parse_command writes an empty list when the verb publishes no events."""
+def test_parse_command_no_events_returns_empty_list(t_init: Object, t_wizard: Object):
+    """parse_command returns an empty event list when the verb publishes no events."""
     v = t_wizard.add_verb(
         "test-emits-nothing",
         code="""\
@@ -235,8 +325,75 @@ print("hello")
     v.save()
 
     result = tasks.parse_command.apply(args=[t_wizard.pk, "test-emits-nothing"])
+    output, exit_status, events = result.get()
+    assert output == ["hello"]
+    assert exit_status == 0
+    assert events == []
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_parse_command_rolls_back_on_time_limit(t_init: Object, t_wizard: Object):
+    """A command stopped by the enforced time limit leaves no writes behind."""
+    with code.ContextManager(t_wizard, lambda _: None):
+        t_wizard.set_property("test_marker", "before")
+    v = t_wizard.add_verb(
+        "test-slow-writer",
+        code="""\
+from moo.sdk import context
+context.caller.set_property("test_marker", "after")
+for i in range(10**9):
+    pass
+""",
+    )
+    v.owner = t_wizard
+    v.save()
+
+    with code.enforce_time_limit(0.05):
+        result = tasks.parse_command.apply(args=[t_wizard.pk, "test-slow-writer"])
+    output, exit_status, _events = result.get()
+    assert exit_status == 1
+    assert "time limit" in output[-1]
+    assert Object.objects.get(pk=t_wizard.pk).get_property("test_marker") == "before"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_parse_command_announces_completion_to_the_callers_queue(t_init: Object, t_wizard: Object):
+    """
+    Once parse_command's result is stored, the caller's session queue gets an
+    empty message whose header names the task, so the shell need not poll.
+    """
+    from unittest.mock import MagicMock, patch
+
+    from moo.celery import app  # pylint: disable=import-outside-toplevel
+    from moo.core import TASK_DONE_HEADER  # pylint: disable=import-outside-toplevel
+    from moo.core.models.auth import Player  # pylint: disable=import-outside-toplevel
+
+    fake_producer = MagicMock()
+    producer_cm = MagicMock()
+    producer_cm.__enter__.return_value = fake_producer
+    producer_cm.__exit__.return_value = False
+    original_broker = app.conf.broker_url
+    app.conf.broker_url = "redis://fake"  # bypass the memory:// short-circuit
     try:
-        events = cache.get(f"moo:task_events:{result.id}")
-        assert events == [] or events is None
+        with patch.object(app, "producer_or_acquire", return_value=producer_cm):
+            # Outside apply() the task has no eager request, as in a worker.
+            tasks.announce_command_done(sender=tasks.parse_command, task_id="task-1", args=[t_wizard.pk, "look"])
     finally:
-        cache.delete(f"moo:task_events:{result.id}")
+        app.conf.broker_url = original_broker
+    notices = [call for call in fake_producer.publish.call_args_list if call.kwargs.get("headers")]
+    assert len(notices) == 1
+    assert notices[0].kwargs["headers"] == {TASK_DONE_HEADER: "task-1"}
+    user_pk = Player.objects.get(avatar=t_wizard).user_id
+    assert notices[0].kwargs["routing_key"] == f"user-{user_pk}"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_parse_command_skips_the_completion_notice_when_eager(t_init: Object, t_wizard: Object):
+    """An eager run (local command mode) returns its result directly, so no notice is published."""
+    from unittest.mock import patch
+
+    with patch("moo.core._publish_task_done") as publish_done:
+        result = tasks.parse_command.apply(args=[t_wizard.pk, "look"])
+    assert result.get()[1] == 0
+    publish_done.assert_not_called()
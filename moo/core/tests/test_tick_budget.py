@@ -3,7 +3,7 @@
 import pytest
 
 from .. import code
-from ..exceptions import TickLimitError
+from ..exceptions import TaskKilled, TickLimitError, TimeLimitError
 from ..models import Object
 
 
@@ -46,3 +46,51 @@ def test_budget_resets_between_tasks(settings, t_init: Object, t_wizard: Object)
         assert t_wizard.half() == "a"
     with code.ContextManager(t_wizard, lambda _: None):
         assert t_wizard.half() == "a"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_enforced_time_limit_aborts_loop(settings, t_init: Object, t_wizard: Object):
+    settings.MOO_TICK_BUDGET = 0
+    with code.ContextManager(t_wizard, lambda _: None):
+        t_wizard.add_verb("crawl", code="for i in range(10**9):\n    pass\nreturn 'done'")
+        with code.enforce_time_limit(0.05):
+            with pytest.raises(TimeLimitError):
+                t_wizard.crawl()
+        # Outside the block the limit is the worker's business again.
+        with code.enforce_time_limit(0):
+            assert code.check_deadline() is None
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+@pytest.mark.parametrize(
+    "body",
+    [
+        "while True:\n    pass",
+        "while True:\n    try:\n        this.tick()\n    except Exception:\n        pass",
+        "while True:\n    try:\n        this.tick()\n    except:\n        pass",
+        "try:\n    while True:\n        pass\nexcept:\n    pass\nreturn 'survived'",
+        "for i in range(10**9):\n    try:\n        this.tick()\n    except:\n        pass",
+    ],
+)
+def test_hard_time_limit_kills_runaway_verbs(settings, t_init: Object, t_wizard: Object, body):
+    settings.MOO_TICK_BUDGET = 0
+    with code.ContextManager(t_wizard, lambda _: None):
+        t_wizard.add_verb("tick", code="return 1")
+        t_wizard.add_verb("runaway", code=body)
+        with pytest.raises(TaskKilled):
+            with code.hard_time_limit(0.05):
+                t_wizard.runaway()
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_hard_time_limit_ends_with_its_block(t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        t_wizard.add_verb("quick", code='"""Docstring stays first."""\nreturn "ok"')
+        with code.hard_time_limit(60):
+            assert t_wizard.quick() == "ok"
+        assert code._kill_deadline.get() is None  # pylint: disable=protected-access
+        assert t_wizard.quick() == "ok"
+        assert code.check_killed() is None
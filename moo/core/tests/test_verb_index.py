@@ -0,0 +1,79 @@
+"""Tests for the process-local verb dispatch index (moo/core/verb_index.py)."""
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .. import attribute_cache, code, exceptions, parse, verb_index
+from ..models import Object
+
+
+@pytest.fixture()
+def index(settings):
+    settings.MOO_VERB_INDEX_SIZE = 64
+    settings.MOO_ATTRIB_ANCESTRY_CACHE_SIZE = 64
+    cache.clear()
+    verb_index.index.clear()
+    yield verb_index.index
+    verb_index.index.clear()
+    attribute_cache.ancestries.clear()
+
+
+def _dispatch(caller, line):
+    with code.ContextManager(caller, lambda _: None):
+        parser = parse.Parser(parse.Lexer(line), caller)
+        with CaptureQueriesContext(connection) as queries:
+            verb = parser.get_verb()
+    return parser, verb, [q["sql"] for q in queries.captured_queries]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_warm_dispatch_does_not_query_verbs(index, t_init: Object, t_wizard: Object):
+    t_wizard.add_verb("zork", code="print('zork')")
+    _dispatch(t_wizard, "zork")
+    parser, verb, sql = _dispatch(t_wizard, "ZORK")
+    assert verb.name() == "zork"
+    assert parser.this == t_wizard
+    assert not [q for q in sql if '"core_verb' in q or '"core_ancestorcache"' in q]
+    assert index.stats()["hits"] > 0
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_index_matches_database_dispatch(index, settings, t_init: Object, t_wizard: Object):
+    _, indexed, _ = _dispatch(t_wizard, "look")
+    settings.MOO_VERB_INDEX_SIZE = 0
+    _, queried, _ = _dispatch(t_wizard, "look")
+    assert indexed.pk == queried.pk
+    assert indexed._invoked_object == queried._invoked_object  # pylint: disable=protected-access
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_new_verbs_are_seen_on_the_next_dispatch(index, t_init: Object, t_wizard: Object):
+    with pytest.raises(exceptions.NoSuchVerbError):
+        _dispatch(t_wizard, "zap")
+    with code.ContextManager(t_wizard, lambda _: None):
+        t_wizard.location.add_verb("zap", code="print('zap')")
+    _, verb, _ = _dispatch(t_wizard, "zap")
+    assert verb.origin == t_wizard.location
+    # An ancestor's new verb reaches every descendant through its generation.
+    parent = t_wizard.parents.first()
+    with code.ContextManager(t_wizard, lambda _: None):
+        parent.add_verb("zap2", code="print('zap2')")
+    parser, verb, _ = _dispatch(t_wizard, "zap2")
+    assert verb.origin == parent
+    assert parser.this == t_wizard
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_dispatched_verb_is_a_copy(index, t_init: Object, t_wizard: Object):
+    t_wizard.add_verb("zork", code="print('zork')")
+    _, first, _ = _dispatch(t_wizard, "zork")
+    _, second, _ = _dispatch(t_wizard, "zork")
+    assert first is not second
+    first._invoked_name = "changed"  # pylint: disable=protected-access
+    assert second._invoked_name == "zork"  # pylint: disable=protected-access
@@ -3,6 +3,8 @@
 Useful global utilities.
 """
 
+from django.conf import settings
+
 
 def _make_access(instance, rule, permission_id, group):
     from .models.acl import Access
@@ -18,6 +20,27 @@ def _make_access(instance, rule, permission_id, group):
     )
 
 
+def implicit_default_acls() -> bool:
+    """
+    Whether newly created entities get the default policy implicitly, rather
+    than as three materialized ``Access`` rows. Used as the field default of
+    ``_implicit_acl`` on Object, Verb and Property.
+    """
+    return getattr(settings, "MOO_IMPLICIT_DEFAULT_ACLS", True)
+
+
+def default_permission_grants(kind):
+    """
+    Return the ``(group, permission name)`` pairs of the default policy for an
+    entity of `kind` (``object``, ``verb`` or ``property``).
+    """
+    return (
+        ("wizards", "anything"),
+        ("owners", "anything"),
+        ("everyone", "execute" if kind == "verb" else "read"),
+    )
+
+
 def apply_default_permissions(instance):
     """
     Apply default permissions to a newly created Object, Verb, or Property.
@@ -26,18 +49,11 @@ def apply_default_permissions(instance):
     avoiding verb-lookup and execution overhead. The verb is considered stable
     for the lifetime of a running service; changes to it require a matching
     update here and a service restart.
-    """
-    from .models.acl import Access, _get_permission_id
 
-    anything_id = _get_permission_id("anything")
-    perm_for_everyone = _get_permission_id("execute" if instance.kind == "verb" else "read")
-    Access.objects.bulk_create(
-        [
-            _make_access(instance, "allow", anything_id, "wizards"),
-            _make_access(instance, "allow", anything_id, "owners"),
-            _make_access(instance, "allow", perm_for_everyone, "everyone"),
-        ]
-    )
+    Entities created with ``_implicit_acl`` set need no rows at all:
+    ``is_allowed()`` applies the same policy without them.
+    """
+    apply_default_permissions_bulk([instance])
 
 
 def apply_default_permissions_bulk(instances):
@@ -48,19 +64,15 @@ def apply_default_permissions_bulk(instances):
     """
     from .models.acl import Access, _get_permission_id
 
-    anything_id = _get_permission_id("anything")
-    read_id = _get_permission_id("read")
-    execute_id = _get_permission_id("execute")
+    permission_ids = {}
     records = []
     for instance in instances:
-        perm_for_everyone = execute_id if instance.kind == "verb" else read_id
-        records.extend(
-            [
-                _make_access(instance, "allow", anything_id, "wizards"),
-                _make_access(instance, "allow", anything_id, "owners"),
-                _make_access(instance, "allow", perm_for_everyone, "everyone"),
-            ]
-        )
+        if instance._implicit_acl:  # pylint: disable=protected-access
+            continue
+        for group, permission in default_permission_grants(instance.kind):
+            if permission not in permission_ids:
+                permission_ids[permission] = _get_permission_id(permission)
+            records.append(_make_access(instance, "allow", permission_ids[permission], group))
     if records:
         Access.objects.bulk_create(records)
 
@@ -77,39 +89,26 @@ def expand_wildcard(name):
 
 def flush_attribute_caches():
     """
-    Evict the cross-process verb- and property-lookup caches from Redis.
+    Invalidate the cross-process verb- and property-lookup caches.
 
-    The ``moo:verb:*`` and ``moo:prop:*`` keys cache inheritance-resolved
-    lookups (verb PK sets / property values) for ``MOO_ATTRIB_CACHE_TTL``
-    seconds. An object's own entries are evicted on write, but a descendant's
-    cached lookup is not — so after a bulk ``moo_init --sync`` that adds or
-    relocates verbs/properties on an ancestor, descendants can serve stale
-    lookups until the TTL expires. Flushing gives ``--sync`` an immediate
-    refresh across the long-running shell and celery processes without a
-    restart.
+    Lookups are cached per object under its attribute generation (see
+    :func:`moo.core.attribute_cache.generation`). A write bumps the counter of
+    the written object, which moves the generation of that object and of its
+    descendants, so ordinary edits never need a flush. This remains for bulk
+    changes made outside the ORM hooks, e.g. ``moo_init --sync``: it bumps the
+    global epoch, which orphans every cached lookup — in Redis and in every
+    process-local cache — with a single counter increment and no ``SCAN``.
+    Orphaned Redis entries expire within ``MOO_ATTRIB_CACHE_TTL``.
 
     The per-process ``_cached_compile`` lru_cache is deliberately left alone:
     it is keyed by verb source text, so changed source yields a new key and a
     fresh compile automatically.
 
-    No-op when the attribute cache is disabled (``MOO_ATTRIB_CACHE_TTL == 0``,
-    e.g. tests) or the active cache backend is not Redis.
-
-    :returns: the number of keys deleted.
+    No-op when nothing is keyed by attribute generations: the attribute
+    caches, the verb index, the System Object cache and the session route
+    cache are all disabled (see
+    :func:`moo.core.attribute_cache.generations_enabled`).
     """
-    from django.conf import settings
-    from django.core.cache import cache
-
-    if getattr(settings, "MOO_ATTRIB_CACHE_TTL", 120) == 0:
-        return 0
-    try:
-        client = cache._cache.get_client(None)  # pylint: disable=protected-access
-    except (AttributeError, NotImplementedError):
-        return 0
-    deleted = 0
-    for namespace in ("moo:verb:", "moo:prop:"):
-        pattern = cache.make_key(namespace) + "*"
-        for key in client.scan_iter(match=pattern):
-            client.delete(key)
-            deleted += 1
-    return deleted
+    from . import attribute_cache
+
+    attribute_cache.flush()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Process-local verb dispatch index.
+
+:meth:`Parser._batch_get_verb <moo.core.parse.Parser._batch_get_verb>` needs,
+for every object in the search order, each verb it can reach by the typed name
+through its ancestors. Answered from the database that is two ``VerbName``
+joins (direct and through ``AncestorCache``) and a prefetched ``Verb`` fetch,
+on every command, although the verbs reachable from ``$player`` or ``$room``
+almost never change.
+
+This index holds the two halves of that answer per object:
+
+* ``("ancestry", pk)`` — the object itself and its ``AncestorCache`` rows, as
+  ``(ancestor_pk, depth, path_weight)`` tuples;
+* ``("verbs", pk)`` — the verbs defined directly on the object, keyed by every
+  lowercased name, with their names, owner and ispecs prefetched.
+
+Entries are tagged with the object's attribute generation (see
+:func:`moo.core.attribute_cache.generations`), so the same writes that orphan
+cached verb lookups orphan them here, in every process. A warm dispatch costs
+one or two batched counter reads and no queries.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Value
+
+from . import attribute_cache
+from .attribute_cache import MISSING, LocalAttributeCache
+
+#: The index itself; its capacity is ``MOO_VERB_INDEX_SIZE`` entries.
+index = LocalAttributeCache(size_setting="MOO_VERB_INDEX_SIZE", default_size=2048)
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "MOO_VERB_INDEX_SIZE", 2048) > 0
+
+
+def _ancestry(pks, generations) -> dict:
+    found = {}
+    missing = []
+    for pk in pks:
+        entry = index.get(("ancestry", pk), generations[pk])
+        if entry is MISSING:
+            missing.append(pk)
+        else:
+            found[pk] = entry
+    if missing:
+        from .models.object import AncestorCache  # pylint: disable=import-outside-toplevel
+
+        loaded = {pk: [(pk, 0, 0)] for pk in missing}
+        rows = AncestorCache.objects.filter(descendant_id__in=missing).values_list(
+            "descendant_id", "ancestor_id", "depth", "path_weight"
+        )
+        for descendant_id, ancestor_id, depth, path_weight in rows:
+            loaded[descendant_id].append((ancestor_id, depth, path_weight))
+        for pk, entry in loaded.items():
+            entry = tuple(entry)
+            index.set(("ancestry", pk), generations[pk], entry)
+            found[pk] = entry
+    return found
+
+
+def _verb_tables(origins, generations) -> dict:
+    found = {}
+    missing = []
+    for pk in origins:
+        entry = index.get(("verbs", pk), generations[pk])
+        if entry is MISSING:
+            missing.append(pk)
+        else:
+            found[pk] = entry
+    if missing:
+        from .models.verb import Verb  # pylint: disable=import-outside-toplevel
+
+        loaded = {pk: defaultdict(list) for pk in missing}
+        verbs = (
+            Verb.objects.filter(origin_id__in=missing)
+            .select_related("owner")
+            .prefetch_related("names", "indirect_objects__preposition__names")
+        )
+        for verb in verbs:
+            for name in {n.name.lower() for n in verb.names.all()}:
+                loaded[verb.origin_id][name].append(verb)
+        for pk, table in loaded.items():
+            entry = {name: tuple(matches) for name, matches in table.items()}
+            index.set(("verbs", pk), generations[pk], entry)
+            found[pk] = entry
+    return found
+
+
+def find(pks, name) -> tuple[list, dict]:
+    """
+    Return every verb called `name` reachable from the objects `pks`.
+
+    The result has the shape of the rows ``_batch_get_verb`` used to read from
+    the database: a list of ``{"id", "origin_id", "viewing_pk", "depth", "pw"}`` dicts, one
+    per (verb, object that reaches it, ancestor path), and a dict mapping each
+    verb id to its ``Verb``. The ``Verb`` instances are shared with the index;
+    copy one before changing it.
+    """
+    name = name.lower()
+    pks = list(pks)
+    ancestry = _ancestry(pks, attribute_cache.generations(pks))
+    origins = {ancestor_pk for entry in ancestry.values() for ancestor_pk, _, _ in entry}
+    tables = _verb_tables(origins, attribute_cache.generations(origins))
+    rows = []
+    verbs = {}
+    for pk in pks:
+        for ancestor_pk, depth, path_weight in ancestry[pk]:
+            for verb in tables[ancestor_pk].get(name, ()):
+                rows.append(
+                    {"id": verb.pk, "origin_id": ancestor_pk, "viewing_pk": pk, "depth": depth, "pw": path_weight}
+                )
+                verbs[verb.pk] = verb
+    return rows, verbs
+
+
+def query(pks, name) -> list:
+    """
+    Return the rows :func:`find` would, read from the database instead: one
+    query for the verbs defined on `pks` and one for those they inherit through
+    ``AncestorCache``.
+    """
+    from .models.verb import Verb  # pylint: disable=import-outside-toplevel
+
+    name = name.lower()
+    direct = list(
+        Verb.objects.filter(origin_id__in=pks, names__name__lower=name)
+        .values("id", "origin_id", "direct_object")
+        .annotate(viewing_pk=F("origin_id"), depth=Value(0), pw=Value(0))
+    )
+    inherited = list(
+        Verb.objects.filter(origin__ancestor_descendants__descendant_id__in=pks, names__name__lower=name)
+        .values("id", "origin_id", "direct_object")
+        .annotate(
+            viewing_pk=F("origin__ancestor_descendants__descendant_id"),
+            depth=F("origin__ancestor_descendants__depth"),
+            pw=F("origin__ancestor_descendants__path_weight"),
+        )
+    )
+    return direct + inherited
+
+
+def candidates(pks, name) -> tuple[list, dict | None]:
+    """
+    Return ``(rows, verbs)`` for every verb called `name` reachable from `pks`,
+    from the index when it is enabled (see :func:`find`) and from the database
+    otherwise, in which case `verbs` is ``None``.
+    """
+    if is_enabled():
+        return find(pks, name)
+    return query(pks, name), None
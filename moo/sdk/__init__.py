@@ -11,6 +11,7 @@ from .objects import (
     create,
     players,
     connected_players,
+    idle_seconds,
     prefetch_property,
     owned_objects,
     owned_objects_by_pks,
@@ -66,6 +67,7 @@ from .provenance import (
     OUTPUT_KINDS,
 )
 from .ratelimit import broadcast_allowed, broadcast_limit, broadcast_window
+from .broadcast import broadcast
 from .audit import record_action, query_audit
 from .moderation import (
     suspend,
@@ -228,8 +230,10 @@ __all__ = [
     "create",
     "players",
     "connected_players",
+    "idle_seconds",
     "prefetch_property",
     "write",
+    "broadcast",
     "open_editor",
     "open_paginator",
     "open_input",
@@ -9,19 +9,25 @@ def server_info():
     Return a dict with server version and process statistics.
 
     Keys: ``version``, ``python``, ``pid``, ``memory_mb`` (may be ``None``
-    on platforms where ``resource`` is unavailable).
+    on platforms where ``resource`` is unavailable), ``attribute_cache``,
+    the hit/miss/eviction counters of this process's local attribute cache,
+    and ``verb_index``, the same counters for its verb dispatch index.
 
     :rtype: dict
     """
     import sys
     import os
     from django.conf import settings
+    from moo.core.attribute_cache import local_cache
+    from moo.core.verb_index import index as verb_index
 
     info = {
         "version": getattr(settings, "VERSION", "unknown"),
         "python": sys.version.split()[0],
         "pid": os.getpid(),
         "memory_mb": None,
+        "attribute_cache": local_cache.stats(),
+        "verb_index": verb_index.stats(),
     }
     try:
         import resource
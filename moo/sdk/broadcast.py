@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-recipient output for room announcements.
+
+``$room:announce`` and its siblings used to call ``obj.tell(...)`` on every
+occupant. Each of those calls is a full verb dispatch that ends in a
+``write()``, a Player query and a broker publish of its own, so one ``say`` in
+a crowded room cost dozens of verb calls. :func:`broadcast` produces the same
+output with a fixed number of queries, and only calls ``tell`` on the objects
+that have replaced it.
+"""
+
+from ..core.code import ContextManager as _ContextManager
+from ..core.exceptions import AccessError, NoSuchPropertyError
+from .context import context as _context
+
+
+def broadcast(recipients, message, exclude=None):
+    """
+    Tell `message` to every object in `recipients` except `exclude`.
+
+    The output is what calling ``obj.tell(message)`` on each of them would
+    produce, but ``tell`` is only called on objects that override it. The
+    others get what ``$root_class:tell`` does: connected players are written
+    to, and any other object is skipped. ``$player:tell`` only filters, so a
+    player who gags nobody, is not paranoid and has an empty ``responsible``
+    list (which ``tell`` would reset) is written to directly too.
+
+    Only verbs owned by wizards may send anything but text, as with
+    ``write()``; for anyone else `message` is sent as ``str(message)``, the
+    way ``$root_class:tell`` joins its arguments, so it can never be a
+    client event.
+
+    Every recipient's ``tell`` verb, Player rows and connection state are
+    read in one pass. The message is then published to all the direct
+    recipients through a single producer.
+
+    :param recipients: the Objects to tell, e.g. ``room.contents.all()``
+    :type recipients: Iterable[Object]
+    :param message: the line to send
+    :type message: str
+    :param exclude: an Object, or a collection of Objects, to leave out
+    """
+    from ..core import _publish_to_players
+    from ..core.models import auth
+
+    if exclude is None:
+        skip = set()
+    elif hasattr(exclude, "pk"):
+        skip = {exclude.pk}
+    else:
+        skip = {obj.pk for obj in exclude}
+    objs = [obj for obj in recipients if obj.pk not in skip]
+    if not objs:
+        return
+    if _context.caller and not _context.caller.is_wizard():
+        message = str(message)
+
+    origins = _tell_origins([obj.pk for obj in objs])
+    root_class = _class_pk("root_class")
+    player_class = _class_pk("player")
+    direct = []
+    filtered = []
+    dispatch = []
+    for obj in objs:
+        origin = origins.get(obj.pk)
+        if origin is not None and origin == root_class:
+            direct.append(obj)
+        elif origin is not None and origin == player_class:
+            filtered.append(obj)
+        else:
+            dispatch.append(obj)
+    if filtered:
+        from .objects import prefetch_property
+
+        prefetch_property(filtered, "gaglist")
+        prefetch_property(filtered, "paranoid")
+        prefetch_property(filtered, "responsible")
+        pcache = _ContextManager.get_prop_lookup_cache()
+        for obj in filtered:
+            (dispatch if _filters_tell(obj, pcache) else direct).append(obj)
+
+    if direct:
+        avatar_users = {}
+        for avatar_id, user_id in auth.Player.objects.filter(avatar_id__in=[obj.pk for obj in direct]).values_list(
+            "avatar_id", "user_id"
+        ):
+            users = avatar_users.setdefault(avatar_id, [])
+            if user_id is not None:
+                users.append(user_id)
+        connected = auth.connected_avatars(avatar_users)
+        routes = {pk: tuple(users) for pk, users in avatar_users.items()}
+        _publish_to_players([obj for obj in direct if obj.pk in connected], message, routes=routes)
+    for obj in dispatch:
+        obj.tell(message)
+
+
+def _tell_origins(pks) -> dict:
+    """
+    Return ``{pk: origin pk}`` of the ``tell`` verb each object in `pks`
+    would run, resolved the way :meth:`Object.get_verb` does: the shallowest
+    ancestor wins, then the heaviest path.
+    """
+    from ..core import verb_index
+
+    rows, _ = verb_index.candidates(pks, "tell")
+    best = {}
+    for row in rows:
+        rank = (row["depth"], -row["pw"])
+        current = best.get(row["viewing_pk"])
+        if current is None or rank < current[0]:
+            best[row["viewing_pk"]] = (rank, row["origin_id"])
+    return {pk: origin for pk, (_, origin) in best.items()}
+
+
+def _class_pk(name):
+    from ..core import system_object
+
+    try:
+        return system_object.resolve(name).pk
+    except (NoSuchPropertyError, AttributeError):
+        return None
+
+
+def _filters_tell(obj, pcache) -> bool:
+    """
+    Return ``True`` if ``$player:tell`` would do more for `obj` than pass the
+    message on: it gags someone, it is paranoid, or it has a ``responsible``
+    list to clear.
+
+    The values are read from the session cache :func:`prefetch_property`
+    filled rather than through ``get_property``, whose read check would cost a
+    query per recipient; they only choose the path, and are never returned.
+    """
+    from ..core.models.object import _PROP_MISSING  # noqa: PLC2701
+
+    for name in ("gaglist", "paranoid", "responsible"):
+        if pcache is not None and (obj.pk, name, True) in pcache:
+            value = pcache[(obj.pk, name, True)]
+        else:
+            try:
+                value = obj.get_property(name)
+            except (NoSuchPropertyError, AccessError):
+                return True
+        if value is _PROP_MISSING or value:
+            return True
+    return False
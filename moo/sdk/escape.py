@@ -41,8 +41,8 @@ def send_home(player):
     :param player: the player Object
     :return: the destination the player landed in
     """
+    from ..core import system_object
     from ..core.exceptions import NoSuchPropertyError
-    from ..core.models import Object
 
     home = None
     try:
@@ -50,8 +50,7 @@ def send_home(player):
     except NoSuchPropertyError:
         home = None
     if not home:
-        system = Object.objects.get(unique_name=True, name="System Object")
-        home = system.get_property("player_start")
+        home = system_object.resolve("player_start")
     guaranteed_moveto(player, home)
     return home
 
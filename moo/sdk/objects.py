@@ -7,7 +7,7 @@ from typing import Any, Union
 
 from django.db.models import F
 
-from ..core import moojson
+from ..core import moojson, system_object
 from ..core.code import ContextManager as _ContextManager
 from ..core.exceptions import (
     QuotaError,
@@ -33,8 +33,7 @@ def lookup(x: Union[int, str], return_first: bool = True):
     :rtype: Object | list[Object]
     :raises NoSuchObjectError: when a result cannot be found and return_first is True
     """
-    from django.db.models import Q
-    from ..core.models import Object
+    from ..core.models import Alias, Object
 
     if isinstance(x, int):
         try:
@@ -43,10 +42,18 @@ def lookup(x: Union[int, str], return_first: bool = True):
             raise NoSuchObjectError(x) from exc
     elif isinstance(x, str):
         if x.startswith("$"):
-            # Get this site's System Object, not always PK=1
-            system = Object.objects.get(unique_name=True, name="System Object")
-            return system.get_property(name=x[1:])
-        qs = Object.objects.filter(Q(name__iexact=x) | Q(aliases__alias__iexact=x)).distinct()
+            # This site's System Object, not always PK=1
+            return system_object.resolve(x[1:])
+        # Probe the LOWER() name and alias indexes separately and union the
+        # ids; OR-ing the two conditions lets the planner fall back to
+        # scanning the whole site instead.
+        name = x.lower()
+        matches = (
+            Object.global_objects.filter(name__lower=name)
+            .values("pk")
+            .union(Alias.objects.filter(alias__lower=name).values("object_id"))
+        )
+        qs = Object.objects.filter(pk__in=matches)
         if not return_first:
             return list(qs)
         if not qs:
@@ -62,44 +69,43 @@ def lookup(x: Union[int, str], return_first: bool = True):
 
 def connected_players(within=None):
     """
-    Return a list of player avatars whose ``last_connected_time`` property was
-    updated within the given *within* window (default: 5 minutes).
+    Return the player avatars with a live session on the active site.
 
-    The ``last_connected_time`` value is precached into the session-level
-    property cache on every returned Object so subsequent ``get_property``
-    calls incur no extra queries.
+    Presence is read from the site's registry (see :mod:`moo.core.presence`)
+    in one call, and the avatars are then fetched in one query.
 
-    :param within: recency window; defaults to ``timedelta(minutes=5)``
+    :param within: if given, only players who sent a command within this
+        window are returned
     :type within: timedelta
-    :return: Objects whose avatars have connected recently
+    :return: the connected avatars
     :rtype: list[Object]
     """
-    from datetime import datetime, timedelta, timezone
-    from ..core.models.property import Property
+    from ..core import presence
+    from ..core.models import Object
 
-    if within is None:
-        within = timedelta(minutes=5)
+    pks = presence.online(within=within)
+    if not pks:
+        return []
+    return list(Object.objects.filter(pk__in=pks, player__isnull=False).select_related("location").distinct())
 
-    threshold = datetime.now(timezone.utc) - within
 
-    # Single query: restrict to player avatars only and eagerly load the
-    # origin Object to avoid per-row SELECT on prop.origin access.
-    # `Player.avatar` is a ForeignKey, so the JOIN can produce duplicate
-    # rows when multiple Player records share an avatar — dedupe by origin_id.
-    props = Property.objects.filter(name="last_connected_time", origin__player__isnull=False).select_related("origin")
+def idle_seconds(obj):
+    """
+    Return how many seconds ago `obj` last sent a command.
 
-    pcache = _ContextManager.get_prop_lookup_cache()
-    seen: set[int] = set()
-    result = []
-    for prop in props:
-        value = moojson.loads(prop.value)
-        if pcache is not None:
-            pcache[(prop.origin_id, "last_connected_time", True)] = value
-        if value is not None and value >= threshold and prop.origin_id not in seen:
-            seen.add(prop.origin_id)
-            result.append(prop.origin)
+    :param obj: a player avatar
+    :type obj: Object
+    :return: the idle time, or ``None`` if `obj` is not connected
+    :rtype: float | None
+    """
+    import time
 
-    return result
+    from ..core import presence
+
+    last = presence.last_active(obj.pk, site_pk=obj.site_id)
+    if last is None:
+        return None
+    return max(0.0, time.time() - last)
 
 
 def prefetch_property(objects: list, name: str) -> None:
@@ -259,14 +265,7 @@ def create(name, *a, **kw):
     """
     from ..core.models.object import Object, Property  # noqa: F401
 
-    _SYSTEM_KEY = "__system_object__"
-    cache = _ContextManager.get_perm_cache()
-    if cache is not None and _SYSTEM_KEY in cache:
-        system = cache[_SYSTEM_KEY]
-    else:
-        system = Object.objects.get(unique_name=True, name="System Object")
-        if cache is not None:
-            cache[_SYSTEM_KEY] = system
+    system = system_object.get_system()
     default_parents = [system.root_class] if system.has_property("root_class") else []
     if context.caller:
         try:
@@ -36,6 +36,7 @@ def provision_guest(name, site=None, user=None):
     :param user: an optional Django User to tie the guest to (usually ``None``)
     :return: ``(account, avatar)``
     """
+    from ..core import system_object
     from ..core.code import ContextManager
     from ..core.models.auth import Player
     from ..core.models.object import Object
@@ -55,8 +56,7 @@ def provision_guest(name, site=None, user=None):
     # Own quota of 0 blocks creation (create() reads recurse=False).
     avatar.set_property("ownership_quota", 0)
     try:
-        system = Object.objects.get(unique_name=True, name="System Object")
-        start = system.get_property("player_start")
+        start = system_object.resolve("player_start")
         if start is not None:
             avatar.location = start
             avatar.save()
@@ -299,6 +299,29 @@ def _player_user_pk(obj):
     return player.user.pk
 
 
+def _session_snapshot(obj):
+    """
+    Return ``(user_pk, settings)`` for the player avatar `obj`.
+
+    `settings` is the user's whole session hash (see
+    :mod:`moo.core.session_settings`). The User lookup and the hash read
+    happen once per ``ContextManager`` session; later calls, and every
+    setting read from the result, are dictionary lookups.
+    """
+    from ..core import session_settings
+    from ..core.code import ContextManager
+
+    perm_cache = ContextManager.get_perm_cache()
+    cache_key = ("__session_settings__", obj.pk)
+    if perm_cache is not None and cache_key in perm_cache:
+        return perm_cache[cache_key]
+    user_pk = _player_user_pk(obj)
+    snapshot = (user_pk, session_settings.snapshot(user_pk) if user_pk is not None else {})
+    if perm_cache is not None:
+        perm_cache[cache_key] = snapshot
+    return snapshot
+
+
 def get_session_setting(key, default=None):
     """
     Get a session-specific output setting for the current player.
@@ -307,17 +330,19 @@ def get_session_setting(key, default=None):
     Used by PREFIX, SUFFIX, OUTPUTPREFIX/SUFFIX, and the ``a11y`` verb.
 
     Checks the in-process ``_session_settings`` dict first (authoritative in the
-    SSH server process and in tests), then falls back to the Django cache so
-    Celery workers — which run in a separate process — can also read the value.
+    SSH server process and in tests), then falls back to the shared session
+    hash so Celery workers — which run in a separate process — can also read
+    the value. The hash is read once per task and then answered from memory.
 
     :param key: setting name ('output_prefix', 'output_suffix', 'quiet_mode', 'color_system')
     :param default: value to return if setting is not found
     :return: setting value or default
     """
-    from django.core.cache import cache
     from ..shell import prompt as prompt_module
 
-    user_pk = _player_user_pk(context.player)
+    if context.player is None:
+        return default
+    user_pk, snapshot = _session_snapshot(context.player)
     if user_pk is None:
         return default
 
@@ -325,7 +350,7 @@ def get_session_setting(key, default=None):
     if key in settings:
         return settings[key]
 
-    value = cache.get(f"moo:session:{user_pk}:{key}")
+    value = snapshot.get(key)
     return value if value is not None else default
 
 
@@ -336,23 +361,24 @@ def set_session_setting(key, value):
     Session settings are stored per-user and cleared on disconnect.
     Used by PREFIX, SUFFIX, OUTPUTPREFIX/SUFFIX, and the ``a11y`` verb.
 
-    Writes to the Django cache (accessible cross-process from Celery workers)
-    and also publishes a ``session_setting`` event to the player's Kombu queue
-    so the SSH server's ``process_messages()`` loop can update its own registry.
+    Writes to the shared session hash (accessible cross-process from Celery
+    workers) and also publishes a ``session_setting`` event to the player's
+    Kombu queue so the SSH server's ``process_messages()`` loop can update its
+    own registry.
 
     :param key: setting name ('output_prefix', 'output_suffix', 'quiet_mode', 'color_system')
     :param value: setting value
     """
-    from django.core.cache import cache
-    from moo.core import _publish_to_player
+    from moo.core import _publish_to_player, session_settings
 
     player = context.player
     if not player:
         return
 
-    user_pk = _player_user_pk(player)
+    user_pk, snapshot = _session_snapshot(player)
     if user_pk is not None:
-        cache.set(f"moo:session:{user_pk}:{key}", value, timeout=86400)
+        session_settings.store(user_pk, key, value)
+        snapshot[key] = value
 
     _publish_to_player(player, {"event": "session_setting", "key": key, "value": value})
 
@@ -419,20 +445,20 @@ def _client_supports_gmcp_package(obj, package: str) -> bool:
     """
     True when the player avatar ``obj``'s SSH session has advertised
     support for the named GMCP package via ``Core.Supports.Set`` /
-    ``Core.Supports.Add``. Reads the same in-process / Django-cache
+    ``Core.Supports.Add``. Reads the same in-process / session-hash
     fallback chain as :func:`_client_supports`.
     """
-    from django.core.cache import cache  # pylint: disable=import-outside-toplevel
-
     from ..shell import prompt as prompt_module  # pylint: disable=import-outside-toplevel
 
-    user_pk = _player_user_pk(obj)
+    if obj is None:
+        return False
+    user_pk, snapshot = _session_snapshot(obj)
     if user_pk is None:
         return False
     settings = prompt_module._session_settings.get(user_pk, {})  # pylint: disable=protected-access
     iac = settings.get("iac")
     if not iac:
-        iac = cache.get(f"moo:session:{user_pk}:iac") or {}
+        iac = snapshot.get("iac") or {}
     pkgs = iac.get("gmcp_packages") or {}
     return package in pkgs
 
@@ -567,20 +593,20 @@ def _client_supports(obj, capability: str) -> bool:
 
     Returns ``False`` for non-player objects and for players not currently
     connected. Reads from the in-process session-settings dict first, then
-    falls back to the Django cache so Celery workers can make the same
+    falls back to the shared session hash so Celery workers can make the same
     determination.
     """
-    from django.core.cache import cache  # pylint: disable=import-outside-toplevel
-
     from ..shell import prompt as prompt_module  # pylint: disable=import-outside-toplevel
 
-    user_pk = _player_user_pk(obj)
+    if obj is None:
+        return False
+    user_pk, snapshot = _session_snapshot(obj)
     if user_pk is None:
         return False
     settings = prompt_module._session_settings.get(user_pk, {})  # pylint: disable=protected-access
     iac = settings.get("iac")
     if not iac:
-        iac = cache.get(f"moo:session:{user_pk}:iac") or {}
+        iac = snapshot.get("iac") or {}
     return bool(iac.get(capability, False))
 
 
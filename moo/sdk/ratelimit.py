@@ -17,7 +17,8 @@ Object properties ``broadcast_rate_limit`` / ``broadcast_rate_window`` (the
 """
 
 from django.conf import settings as _settings
-from django.core.cache import cache
+
+from ..core import store
 
 
 def _knob(name, default):
@@ -27,13 +28,11 @@ def _knob(name, default):
     System Object, no property, no context) falls back silently.
     """
     try:
-        from ..core.models import Object  # pylint: disable=import-outside-toplevel
+        from ..core import system_object  # pylint: disable=import-outside-toplevel
 
-        sys_obj = Object.global_objects.filter(pk=1).first()
-        if sys_obj is not None:
-            value = sys_obj.get_property(name, recurse=False)
-            if value is not None:
-                return value
+        value = system_object.resolve(name)
+        if value is not None:
+            return value
     except Exception:  # pylint: disable=broad-except
         pass
     return default
@@ -62,12 +61,6 @@ def broadcast_allowed(account_id) -> bool:
     limit = broadcast_limit()
     if limit <= 0 or account_id is None:
         return True
-    window = broadcast_window()
-    key = f"moo:ratelimit:broadcast:{account_id}"
-    try:
-        count = cache.incr(key)
-    except ValueError:
-        # Key absent/expired: start a fresh window.
-        cache.set(key, 1, timeout=window)
-        count = 1
+    # One round trip: the counter is created with the window as its expiry.
+    count = store.incr(f"moo:ratelimit:broadcast:{account_id}", timeout=broadcast_window())
     return count <= limit
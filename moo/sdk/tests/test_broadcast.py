@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for moo.sdk.broadcast.
+"""
+
+import warnings
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.contrib.auth.models import User  # pylint: disable=imported-auth-user
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from moo.core import code
+from moo.core.models import Object, Player
+from moo.sdk import broadcast, create, lookup
+
+
+def _room_with_players(t_wizard, count):
+    room = create("Crowded Room", parents=[lookup("Generic Room")])
+    avatars = []
+    for i in range(count):
+        avatar = create(f"Listener {i}", parents=[lookup("Generic Player")], location=room)
+        Player.objects.create(avatar=avatar)
+        avatars.append(avatar)
+    return room, avatars
+
+
+def _heard(fn):
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", RuntimeWarning)
+        fn()
+    return [str(w.message) for w in caught if issubclass(w.category, RuntimeWarning)]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_broadcast_writes_to_players_and_skips_plain_objects(t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        room, (alice, bob) = _room_with_players(t_wizard, 2)
+        create("plain rock", parents=[lookup("$root_class")], location=room)
+        heard = _heard(lambda: broadcast(room.contents.all(), "hello", exclude=bob))
+    assert heard == [f"ConnectionError({alice}): hello"]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_broadcast_calls_tell_overrides(t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        room, _ = _room_with_players(t_wizard, 1)
+        parrot = create("parrot", parents=[lookup("$root_class")], location=room)
+        parrot.add_verb("tell", code="this.set_property('last_heard', args[0])")
+        _heard(lambda: broadcast(room.contents.all(), "polly"))
+        parrot.refresh_from_db()
+        assert parrot.get_property("last_heard") == "polly"
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_broadcast_honours_player_gag_lists(t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        room, (alice, bob) = _room_with_players(t_wizard, 2)
+        alice.set_property("gaglist", [t_wizard])
+        heard = _heard(lambda: broadcast(room.contents.all(), "psst"))
+    assert heard == [f"ConnectionError({bob}): psst"]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_broadcast_queries_do_not_grow_with_the_room(t_init: Object, t_wizard: Object):
+    from moo.celery import app  # pylint: disable=import-outside-toplevel
+
+    producer = MagicMock()
+    producer_cm = MagicMock()
+    producer_cm.__enter__.return_value = producer
+    producer_cm.__exit__.return_value = False
+    counts = []
+    original_broker = app.conf.broker_url
+    app.conf.broker_url = "redis://fake"  # bypass the memory:// short-circuit
+    try:
+        with patch.object(app, "producer_or_acquire", return_value=producer_cm):
+            with code.ContextManager(t_wizard, lambda _: None):
+                # The first broadcast also warms the session's one-off lookups.
+                for size in (1, 2, 8):
+                    room, avatars = _room_with_players(t_wizard, size)
+                    for avatar in avatars:
+                        user = User.objects.create(username=f"listener{avatar.pk}")
+                        Player.objects.filter(avatar=avatar).update(user=user)
+                    contents = list(room.contents.all())
+                    producer.publish.reset_mock()
+                    with CaptureQueriesContext(connection) as queries:
+                        broadcast(contents, "hi")
+                    assert producer.publish.call_count == size
+                    counts.append(len(queries.captured_queries))
+    finally:
+        app.conf.broker_url = original_broker
+    assert counts[1] == counts[2]
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_broadcast_sends_only_text_for_non_wizards(t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        room, (alice,) = _room_with_players(t_wizard, 1)
+        mortal = create("mortal")
+        code.ContextManager.override_caller(mortal)
+        try:
+            with patch("moo.core._publish_to_players") as publish:
+                broadcast(room.contents.all(), {"event": "disconnect"})
+        finally:
+            code.ContextManager.pop_caller()
+    (objs, message), _ = publish.call_args
+    assert objs == [alice]
+    assert message == str({"event": "disconnect"})
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_broadcast_lets_player_tell_clear_the_responsible_list(t_init: Object, t_wizard: Object):
+    with code.ContextManager(t_wizard, lambda _: None):
+        _, (alice,) = _room_with_players(t_wizard, 1)
+        alice.set_property("responsible", [[[], ["old"]]])
+        heard = _heard(lambda: broadcast([alice], "hello"))
+        # ``this.responsible = []`` in the verb lands on the instance it ran on.
+        assert alice.responsible == []
+    assert heard == [f"ConnectionError({alice}): hello"]
@@ -3,77 +3,106 @@
 Tests for moo.sdk.objects.connected_players.
 """
 
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
 
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from moo.core import code
+from moo.core import presence
 from moo.core.models import Player
 from moo.core.tests.utils import ctx as _ctx
-from moo.sdk import connected_players, create
+from moo.sdk import connected_players, create, idle_seconds
+
+
+@pytest.fixture(autouse=True)
+def _clear_presence():
+    yield
+    presence._local.clear()  # pylint: disable=protected-access
+    cache.clear()
 
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
-def test_connected_players_includes_recent(t_init, t_wizard):
+def test_connected_players_includes_joined(t_init, t_wizard):
     with _ctx(t_wizard):
         avatar = create("Online Player")
     Player.objects.create(avatar=avatar)
-    with _ctx(t_wizard):
-        avatar.set_property("last_connected_time", datetime.now(timezone.utc))
+    presence.join(avatar.pk, avatar.site_id)
     with _ctx(t_wizard):
         result = connected_players()
     assert avatar in result
 
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
-def test_connected_players_excludes_stale(t_init, t_wizard):
+def test_connected_players_excludes_departed(t_init, t_wizard):
     with _ctx(t_wizard):
         avatar = create("Offline Player")
     Player.objects.create(avatar=avatar)
-    stale = datetime.now(timezone.utc) - timedelta(minutes=10)
+    presence.leave(presence.join(avatar.pk, avatar.site_id))
     with _ctx(t_wizard):
-        avatar.set_property("last_connected_time", stale)
+        result = connected_players()
+    assert avatar not in result
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_connected_players_excludes_expired_sessions(t_init, t_wizard, settings):
+    settings.MOO_PRESENCE_TTL = -1  # every heartbeat is already too old
+    with _ctx(t_wizard):
+        avatar = create("Crashed Player")
+    Player.objects.create(avatar=avatar)
+    presence.join(avatar.pk, avatar.site_id)
     with _ctx(t_wizard):
         result = connected_players()
     assert avatar not in result
 
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
-def test_connected_players_custom_window(t_init, t_wizard):
+def test_connected_players_within_window(t_init, t_wizard):
     with _ctx(t_wizard):
         avatar = create("Recent Player")
     Player.objects.create(avatar=avatar)
-    ten_min_ago = datetime.now(timezone.utc) - timedelta(minutes=10)
-    with _ctx(t_wizard):
-        avatar.set_property("last_connected_time", ten_min_ago)
+    presence.join(avatar.pk, avatar.site_id)
     with _ctx(t_wizard):
-        result = connected_players(within=timedelta(hours=1))
-    assert avatar in result
+        assert avatar in connected_players(within=timedelta(hours=1))
+        assert avatar not in connected_players(within=timedelta(seconds=-1))
 
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
 def test_connected_players_excludes_non_players(t_init, t_wizard):
     with _ctx(t_wizard):
         obj = create("Not A Player")
-        obj.set_property("last_connected_time", datetime.now(timezone.utc))
+    presence.join(obj.pk, obj.site_id)
     with _ctx(t_wizard):
         result = connected_players()
     assert obj not in result
 
 
 @pytest.mark.django_db(transaction=True, reset_sequences=True)
-def test_connected_players_precaches_property(t_init, t_wizard):
+def test_connected_players_reads_no_properties(t_init, t_wizard):
+    avatars = []
     with _ctx(t_wizard):
-        avatar = create("Cached Player")
-    Player.objects.create(avatar=avatar)
-    now = datetime.now(timezone.utc)
+        for i in range(5):
+            avatar = create(f"Player {i}")
+            Player.objects.create(avatar=avatar)
+            presence.join(avatar.pk, avatar.site_id)
+            avatars.append(avatar)
+        with CaptureQueriesContext(connection) as queries:
+            result = connected_players()
+    assert set(result) == set(avatars)
+    sql = [query["sql"] for query in queries.captured_queries]
+    assert not [q for q in sql if "core_property" in q]
+    assert len([q for q in sql if "core_object" in q]) == 1
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+def test_idle_seconds(t_init, t_wizard):
     with _ctx(t_wizard):
-        avatar.set_property("last_connected_time", now)
-
-    ctx = _ctx(t_wizard)
-    with ctx:
-        connected_players()
-        pcache = code.ContextManager.get_prop_lookup_cache()
-        assert (avatar.pk, "last_connected_time", True) in pcache
-        cached_value = pcache[(avatar.pk, "last_connected_time", True)]
-    assert cached_value == now
+        avatar = create("Idle Player")
+    Player.objects.create(avatar=avatar)
+    assert idle_seconds(avatar) is None
+    token = presence.join(avatar.pk, avatar.site_id)
+    presence.touch(token)
+    assert 0 <= idle_seconds(avatar) < 60
+    presence.leave(token)
+    assert idle_seconds(avatar) is None
@@ -310,12 +310,12 @@ def test_client_supports_reads_in_process_session_settings():
         assert output._client_supports(MagicMock(), "eor") is False
 
 
-def test_client_supports_falls_back_to_django_cache_for_celery_workers():
-    """In Celery the SSH server's ``_session_settings`` is empty; the cache mirror is the fallback."""
+def test_client_supports_falls_back_to_session_hash_for_celery_workers():
+    """In Celery the SSH server's ``_session_settings`` is empty; the shared session hash is the fallback."""
     user_pk = 4712
-    fake_cache = {f"moo:session:{user_pk}:iac": {"gmcp": True, "mssp": True}}
+    fake_hash = {user_pk: {"iac": {"gmcp": True, "mssp": True}}}
     with _patch_player_lookup(user_pk):
-        with patch("django.core.cache.cache.get", side_effect=fake_cache.get):
+        with patch("moo.core.session_settings.snapshot", side_effect=fake_hash.get):
             assert output._client_supports(MagicMock(), "gmcp") is True
             assert output._client_supports(MagicMock(), "mssp") is True
             assert output._client_supports(MagicMock(), "msp") is False
@@ -335,12 +335,12 @@ def test_client_supports_gmcp_package_reads_packages_dict():
         assert output._client_supports_gmcp_package(MagicMock(), "Room") is False
 
 
-def test_client_supports_gmcp_package_falls_back_to_cache():
-    """Cross-process: Celery workers read the cache-mirrored package map when in-process is empty."""
+def test_client_supports_gmcp_package_falls_back_to_session_hash():
+    """Cross-process: Celery workers read the mirrored package map when in-process is empty."""
     user_pk = 4714
-    fake_cache = {f"moo:session:{user_pk}:iac": {"gmcp_packages": {"Editor": 1}}}
+    fake_hash = {user_pk: {"iac": {"gmcp_packages": {"Editor": 1}}}}
     with _patch_player_lookup(user_pk):
-        with patch("django.core.cache.cache.get", side_effect=fake_cache.get):
+        with patch("moo.core.session_settings.snapshot", side_effect=fake_hash.get):
             assert output._client_supports_gmcp_package(MagicMock(), "Editor") is True
 
 
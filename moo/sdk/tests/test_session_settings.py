@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for reading session settings from the shared session hash.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from moo.core import code, session_settings
+from moo.core.models import Object, Player
+from moo.sdk import get_session_setting, set_session_setting
+
+
+@pytest.fixture()
+def user_pk(t_wizard):
+    pk = Player.objects.get(avatar=t_wizard).user_id
+    yield pk
+    session_settings.clear(pk)
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_settings_are_read_once_per_session(t_init: Object, t_wizard: Object, user_pk):
+    session_settings.store(user_pk, "prefixes_mode", True)
+    session_settings.store(user_pk, "terminal_width", 132)
+    with code.ContextManager(t_wizard, lambda _: None, player=t_wizard):
+        with patch("moo.core.session_settings.snapshot", wraps=session_settings.snapshot) as snapshot:
+            assert get_session_setting("prefixes_mode", False) is True
+            with CaptureQueriesContext(connection) as queries:
+                assert get_session_setting("terminal_width", 80) == 132
+                assert get_session_setting("quiet_mode", False) is False
+    snapshot.assert_called_once_with(user_pk)
+    assert not queries.captured_queries
+
+
+@pytest.mark.django_db(transaction=True, reset_sequences=True)
+@pytest.mark.parametrize("t_init", ["default"], indirect=True)
+def test_set_session_setting_updates_the_hash_and_the_snapshot(t_init: Object, t_wizard: Object, user_pk):
+    with code.ContextManager(t_wizard, lambda _: None, player=t_wizard):
+        assert get_session_setting("quiet_mode", False) is False
+        set_session_setting("quiet_mode", True)
+        assert get_session_setting("quiet_mode", False) is True
+    assert session_settings.snapshot(user_pk) == {"quiet_mode": True}
@@ -147,10 +147,71 @@ OPPOSITE_DIRECTIONS = {
 PREPOSITION_SPECIFIER_CHOICES = (("any", "any"), ("none", "none"))
 
 # TTL in seconds for cross-session attribute (verb/property) lookup caching.
-# Set to 0 to disable (e.g. in test environments where the cache backend is
-# in-process and does not reset between test cases).
+# Set to 0 to disable.
 MOO_ATTRIB_CACHE_TTL = 120
 
+# Capacity (in entries) of the per-process LRU that sits in front of the
+# cross-session attribute cache and holds materialized verbs and decoded
+# property values.  Entries are invalidated through a shared generation
+# counter, so this can be sized for the working set rather than for staleness.
+# Set to 0 to disable.
+MOO_ATTRIB_LOCAL_CACHE_SIZE = 4096
+
+# Capacity (in objects) of the per-process LRU of ancestor lists that
+# attribute generations are computed from.  An object's entry is dropped when
+# its own generation counter moves, which every re-parenting in its lineage
+# does.  Set to 0 to read ancestors from the database for every new session.
+MOO_ATTRIB_ANCESTRY_CACHE_SIZE = 4096
+
+# Capacity (in entries) of the per-process verb dispatch index used by the
+# command parser: one entry per object for its ancestor list and one per
+# object for the verbs defined on it.  Invalidated by the same generation
+# counters as the attribute caches.  Set to 0 to disable, which makes every
+# dispatch query the database.
+MOO_VERB_INDEX_SIZE = 2048
+
+# Keep each site's System Object and its plain ``$`` property values in
+# process memory, revalidated against the System Object's attribute
+# generation on every read.  Object-valued ``$`` names are remembered by pk
+# and always fetched fresh.  Set to False to query them on every lookup.
+MOO_SYSTEM_OBJECT_CACHE = True
+
+# Maximum number of avatars whose session routing (the user pks their output
+# is published to) is kept in process memory by ``_publish_to_player``.
+# Invalidated through the avatar's attribute generation whenever a Player is
+# bound to or released from it.  Set to 0 to query Players for every message.
+MOO_SESSION_ROUTE_CACHE_SIZE = 4096
+
+# How often, in seconds, the SSH server re-scores its sessions in the
+# presence registry (``moo.core.presence``), and how long a session that has
+# not been heard from stays listed as connected.  The TTL only matters when a
+# server dies without logging its sessions out; keep it a few heartbeats long.
+MOO_PRESENCE_HEARTBEAT = 30
+MOO_PRESENCE_TTL = 90
+
+# TTL in seconds for compiled ACLs (per-subject allow/deny bitmasks) shared
+# across processes.  Entries are deleted whenever a subject's Access rows or
+# owner change, so the TTL only bounds how long an unused entry is kept.
+# Set to 0 to disable; compiled ACLs are then kept for a single session only.
+MOO_ACL_CACHE_TTL = 300
+
+# When True, new Objects, Verbs and Properties carry the default ACL policy
+# (wizards and owners may do anything, everyone may read or execute) implicitly
+# instead of as three Access rows each, and only rules that deviate from it are
+# stored.  Entities created while this was False keep their rows and are
+# unaffected by the setting.
+MOO_IMPLICIT_DEFAULT_ACLS = True
+
+# Persistent store for compiled verb code, shared by every worker process so
+# that a restart or a fresh Celery worker does not re-run RestrictedPython's
+# transform for each verb.  Entries are keyed by a hash of the source, the
+# RestrictedPython version and the interpreter, so they never go stale.
+# MOO_BYTECODE_CACHE_DIR is a local directory (None to disable);
+# MOO_BYTECODE_CACHE_TTL is the lifetime in seconds of entries kept in the
+# cache backend (0 to disable).  ``moo_init`` precompiles every verb into it.
+MOO_BYTECODE_CACHE_DIR = None
+MOO_BYTECODE_CACHE_TTL = 7 * 24 * 60 * 60
+
 # Per-account broadcast flood limit (spec 200, item F): the most lines a single
 # account may have published to *other* players within MOO_BROADCAST_RATE_WINDOW
 # seconds before further broadcast lines are dropped.  Deliberately generous —
@@ -168,6 +229,18 @@ MOO_BROADCAST_RATE_WINDOW = 10
 # kill remains the outer bound. Set to 0 to disable.
 MOO_TICK_BUDGET = 5_000_000
 
+# Run player commands on a thread pool inside the SSH server process instead of
+# sending them through the broker to a Celery worker.  Saves the broker and
+# result-backend round trips, which dominate command latency on a single-node
+# deployment.  invoke(), delayed verbs and periodic tasks still use Celery, and
+# task_time_limit is enforced cooperatively (see moo.shell.local_worker).
+# MOO_LOCAL_COMMAND_WORKERS is the size of the pool. A verb that catches the
+# TimeLimitError raised at task_time_limit is killed
+# MOO_LOCAL_COMMAND_KILL_GRACE seconds later.
+MOO_LOCAL_COMMANDS = False
+MOO_LOCAL_COMMAND_WORKERS = 4
+MOO_LOCAL_COMMAND_KILL_GRACE = 1
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -17,12 +17,16 @@ DATABASES = {
 # All tests that move objects around while having enterfuncs and exitfuncs
 # need to run tasks eagerly to ensure that the enterfuncs and exitfuncs are
 # executed within the same test transaction.
-CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+# The backend also holds the compiled-verb store, so it needs room for more
+# than LocMemCache's default 300 entries.
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "OPTIONS": {"MAX_ENTRIES": 10000}}
+}
 
-# Disable cross-session attribute cache in tests: the in-process LocMemCache
-# does not reset between test cases, which would poison subsequent tests
-# when PKs are reused after sequence resets.
-MOO_ATTRIB_CACHE_TTL = 0
+# The attribute, ACL and compiled-verb caches all stay on, as they ship. The
+# ``_reset_caches`` fixture in moo/conftest.py empties them and the cache
+# backend before every test, so nothing a test cached is seen by the next one,
+# which reuses its primary keys.
 
 # Disable the broadcast flood limit for the suite by default — the LocMemCache
 # counter does not reset between tests, so a shared budget would drift and trip
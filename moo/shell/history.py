@@ -1,18 +1,21 @@
 # -*- coding: utf-8 -*-
 """
-Persistent per-player prompt history stored in the Django cache (Redis in prod).
+Persistent per-player prompt history stored in Redis.
 """
 
 from prompt_toolkit.history import History
 
+from ..core import store
+
 
 class RedisHistory(History):
     """
-    prompt_toolkit History backed by the Django cache, scoped per Django user.
+    prompt_toolkit History backed by a Redis list, scoped per Django user.
 
-    Entries are stored as a list under ``moo:history:{user_pk}``, capped at ``cap``
-    entries and refreshed with ``ttl`` seconds on every write so abandoned
-    accounts eventually expire.
+    Entries are pushed newest-first onto ``moo:history:{user_pk}``, capped at
+    ``cap`` entries and refreshed with ``ttl`` seconds on every write so
+    abandoned accounts eventually expire. Each write is a single round trip
+    (see :func:`moo.core.store.push`).
     """
 
     def __init__(self, user_pk: int, cap: int = 500, ttl: int = 90 * 86400):
@@ -23,21 +26,31 @@ class RedisHistory(History):
         self.key = f"moo:history:{user_pk}"
 
     def load_history_strings(self):
-        from django.core.cache import cache
-
-        entries = cache.get(self.key) or []
-        for entry in reversed(entries):
-            yield entry
+        entries = store.items(self.key)
+        if not entries and store.redis() is not None:
+            entries = self._adopt_cached_history()
+        yield from entries
+
+    def _adopt_cached_history(self) -> list:
+        """
+        Move history written by earlier releases into the Redis list.
+
+        Those kept the whole list, oldest first, as one Django cache value, so
+        it sits under the cache's prefixed and versioned key rather than
+        ``self.key``. It is read once, when the list is still empty, and then
+        deleted.
+        """
+        from django.core.cache import cache  # pylint: disable=import-outside-toplevel
+
+        legacy = cache.get(self.key)
+        if not legacy:
+            return []
+        legacy = legacy[-self.cap :]
+        store.push_many(self.key, legacy, maxlen=self.cap, timeout=self.ttl)
+        cache.delete(self.key)
+        return legacy[::-1]
 
     def store_string(self, string: str) -> None:
         if not string or not string.strip():
             return
-        from django.core.cache import cache
-
-        entries = cache.get(self.key) or []
-        if entries and entries[-1] == string:
-            return
-        entries.append(string)
-        if len(entries) > self.cap:
-            entries = entries[-self.cap :]
-        cache.set(self.key, entries, timeout=self.ttl)
+        store.push(self.key, string, maxlen=self.cap, timeout=self.ttl, distinct=True)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+In-process command execution for single-node deployments.
+
+Normally every command goes SSH server → broker → Celery worker → result
+backend → SSH server. On a small shard those hops cost more than the verb
+itself. With ``MOO_LOCAL_COMMANDS`` enabled, :class:`~moo.shell.prompt.MooPrompt`
+runs ``parse_command`` on a thread pool inside the SSH server process
+instead.
+
+The task body is unchanged: it runs through ``Task.apply()`` with its own
+task id, so ``parse_command`` builds the same ``ContextManager``, opens the
+same transaction and records its published events as it does in a worker.
+Nothing can kill a thread when ``task_time_limit`` passes, so the limit is
+enforced in two steps. :func:`moo.core.code.enforce_time_limit` makes a verb
+that runs past it raise ``TimeLimitError`` at its next verb call or loop
+iteration, so ``parse_command`` rolls the command back and reports the error.
+A verb that catches that error is stopped by
+:func:`moo.core.code.hard_time_limit` ``MOO_LOCAL_COMMAND_KILL_GRACE`` seconds
+later.
+``invoke()``, delayed verbs and periodic work still go through Celery.
+"""
+
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from ..celery import app
+from ..core import code, exceptions
+
+log = logging.getLogger(__name__)
+
+#: Output of a command killed by :func:`moo.core.code.hard_time_limit`.
+KILLED_MESSAGE = "Verb exceeded the task time limit and was killed."
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "MOO_LOCAL_COMMANDS", False)
+
+
+class LocalResult:
+    """
+    The parts of ``AsyncResult`` the shell uses, for a task running in this
+    process.
+    """
+
+    def __init__(self, task_id, future):
+        self.id = task_id
+        self.future = future
+
+    def ready(self) -> bool:
+        return self.future.done()
+
+    def maybe_throw(self, propagate=True):
+        """
+        Return the task's result, or raise its exception if `propagate` is set.
+        Blocks until the task has finished.
+        """
+        error = self.future.exception()
+        if error is None:
+            return self.future.result()
+        if propagate:
+            raise error
+        return error
+
+    def get(self, timeout=None, propagate=True):
+        self.future.exception(timeout)
+        return self.maybe_throw(propagate=propagate)
+
+
+def _get_executor():
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "MOO_LOCAL_COMMAND_WORKERS", 4),
+                thread_name_prefix="moo-command",
+            )
+        return _executor
+
+
+def _run(task, task_id, args):
+    # Pool threads keep their database connections between tasks; retire
+    # them on the same CONN_MAX_AGE / health-check rules as request threads.
+    close_old_connections()
+    limit = app.conf.task_time_limit
+    kill_after = limit + getattr(settings, "MOO_LOCAL_COMMAND_KILL_GRACE", 1) if limit else None
+    try:
+        with code.enforce_time_limit(limit), code.hard_time_limit(kill_after):
+            return task.apply(args=args, task_id=task_id, throw=True).result
+    except exceptions.TaskKilled:
+        # The exception unwound parse_command's transaction, so the command's
+        # writes are rolled back as they would be in a killed worker.
+        log.error(f"Task {task_id} killed {kill_after}s after it started")
+        return [f"[bold red]{KILLED_MESSAGE}[/bold red]"], 1, []
+    finally:
+        close_old_connections()
+
+
+def apply_async(task, *args) -> LocalResult:
+    """
+    Run `task` with `args` on the local pool and return a handle to its result.
+    """
+    task_id = str(uuid.uuid4())
+    return LocalResult(task_id, _get_executor().submit(_run, task, task_id, args))
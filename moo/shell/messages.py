@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Push-based delivery of Kombu session messages to SSH sessions.
+
+Each connected session used to poll its own ``messages.<user_pk>`` queue with
+``SimpleBuffer.get_nowait()`` every 50 ms, through a ``sync_to_async`` hop
+each time. With hundreds of idle sessions the server spent thousands of broker
+round trips a second on empty queues, and ``tell`` output waited for the next
+poll before it was seen.
+
+:class:`SessionMessageHub` replaces that with one consumer per process. A
+daemon thread owns a single broker connection and blocks in
+``drain_events()`` on every attached session's queue at once, the same way a
+Celery worker consumes. Each message body is pushed to its session's
+:class:`SessionInbox` on the session's event loop. A session waiting for
+output just awaits its inbox, so idle sessions cost nothing. The notices a
+worker sends when a command finishes (see :func:`moo.core._publish_task_done`)
+arrive on the same queue and wake the command waiting on that task instead.
+
+See :doc:`/explanation/shell-internals` § "The Kombu Message Bus".
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+
+from kombu import Consumer, Exchange, Queue
+
+from ..core import TASK_DONE_HEADER
+
+log = logging.getLogger(__name__)
+
+# Longest the consumer thread blocks before it picks up newly attached or
+# detached sessions. It is also passed as the transport's polling_interval,
+# which the Redis transport uses as its BRPOP timeout, so a newly attached
+# queue joins the blocking read within this long. Only the hub thread wakes
+# on this interval; sessions sleep until a message arrives.
+_WAKE_INTERVAL = 0.1
+
+# How many task-done notices an inbox remembers for commands that have not
+# started waiting yet (a fast task can finish before its waiter registers).
+_FINISHED_TASKS_KEPT = 32
+
+# Backoff between reconnection attempts after the broker connection fails.
+_RECONNECT_MIN = 0.5
+_RECONNECT_MAX = 10.0
+
+
+def session_queue(user_pk, channel=None) -> Queue:
+    """
+    Return the per-user message queue that ``_publish_to_player`` routes to.
+    """
+    return Queue(
+        f"messages.{user_pk}",
+        Exchange("moo", type="direct", channel=channel),
+        f"user-{user_pk}",
+        channel=channel,
+        auto_delete=True,
+    )
+
+
+class SessionInbox:
+    """
+    The receiving end of one session's queue, living on that session's
+    event loop.
+
+    Only the hub thread calls :meth:`deliver`; everything else runs on the
+    event loop.
+    """
+
+    def __init__(self, user_pk, loop):
+        self.user_pk = user_pk
+        self.loop = loop
+        self._bodies: deque = deque()
+        self._ready = asyncio.Event()
+        # Task id -> future resolved by that task's done notice.
+        self._waiters: dict = {}
+        self._finished: OrderedDict = OrderedDict()
+
+    def deliver(self, body) -> None:
+        """
+        Hand a raw message body over from the hub thread.
+        """
+        self.loop.call_soon_threadsafe(self._push, body)
+
+    def finish(self, task_id) -> None:
+        """
+        Hand a task-done notice over from the hub thread.
+        """
+        self.loop.call_soon_threadsafe(self._finish, task_id)
+
+    def expect(self, task_id) -> asyncio.Future:
+        """
+        Return a future that resolves when the done notice for `task_id`
+        arrives. Call :meth:`forget` once it is no longer needed.
+        """
+        future = self.loop.create_future()
+        if self._finished.pop(task_id, False):
+            future.set_result(None)
+        else:
+            self._waiters[task_id] = future
+        return future
+
+    def forget(self, task_id) -> None:
+        self._waiters.pop(task_id, None)
+
+    def _push(self, body) -> None:
+        self._bodies.append(body)
+        self._ready.set()
+
+    def _finish(self, task_id) -> None:
+        future = self._waiters.pop(task_id, None)
+        if future is None:
+            self._finished[task_id] = True
+            while len(self._finished) > _FINISHED_TASKS_KEPT:
+                self._finished.popitem(last=False)
+        elif not future.done():
+            future.set_result(None)
+
+    def drain(self) -> list:
+        """
+        Return every body delivered so far without waiting.
+        """
+        bodies = list(self._bodies)
+        self._bodies.clear()
+        self._ready.clear()
+        return bodies
+
+    async def wait(self, timeout=None) -> list:
+        """
+        Wait up to `timeout` seconds for at least one message, then return
+        everything delivered so far. Returns an empty list on timeout.
+        """
+        if not self._bodies:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        return self.drain()
+
+
+class SessionMessageHub:
+    """
+    One Kombu consumer per process, fanning messages out to session inboxes.
+
+    A queue has at most one inbox in a process. Attaching a second session
+    for the same user takes the queue over, so a zombie session left behind
+    by a dead channel stops receiving output instead of splitting it with
+    the live one.
+
+    :param connection_factory: returns a new, unconnected Kombu connection;
+        defaults to the Celery app's read connection
+    """
+
+    def __init__(self, connection_factory=None):
+        self._connection_factory = connection_factory
+        self._lock = threading.Lock()
+        self._pending: deque = deque()
+        # Routing key -> the one inbox consuming that queue in this process.
+        self._inboxes: dict[str, SessionInbox] = {}
+        self._thread = None
+        self._stopping = threading.Event()
+
+    async def attach(self, user_pk) -> SessionInbox:
+        """
+        Start consuming `user_pk`'s queue and return its inbox.
+
+        Returns once the queue is declared and consumed, so nothing
+        published after this returns can be missed.
+        """
+        loop = asyncio.get_running_loop()
+        inbox = SessionInbox(user_pk, loop)
+        await self._submit("attach", inbox)
+        return inbox
+
+    async def detach(self, inbox) -> None:
+        """
+        Stop delivering to `inbox`, and stop consuming its queue unless
+        another session has taken it over since.
+        """
+        await self._submit("detach", inbox)
+
+    def stop(self, timeout=None) -> None:
+        """
+        Stop the consumer thread and release its connection.
+        """
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    async def _submit(self, op, inbox):
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        with self._lock:
+            self._pending.append((op, inbox, loop, done))
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="moo-session-messages", daemon=True)
+                self._thread.start()
+        await done
+
+    def _connect(self):
+        if self._connection_factory is not None:
+            return self._connection_factory()
+        from ..celery import app  # pylint: disable=import-outside-toplevel
+
+        return app.connection_for_read(transport_options={"polling_interval": _WAKE_INTERVAL})
+
+    def _run(self):
+        delay = _RECONNECT_MIN
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                # Inside the try: a broker that is down at startup must not
+                # end the only consumer this process has.
+                conn = self._connect()
+                conn.connect()
+                channel = conn.channel()
+                consumer = Consumer(channel, queues=[], on_message=self._on_message, no_ack=True)
+                # After a reconnect, pick the attached queues back up.
+                for inbox in list(self._inboxes.values()):
+                    consumer.add_queue(session_queue(inbox.user_pk))
+                consumer.consume()
+                delay = _RECONNECT_MIN
+                while not self._stopping.is_set():
+                    self._apply_pending(consumer)
+                    try:
+                        conn.drain_events(timeout=_WAKE_INTERVAL)
+                    except TimeoutError:
+                        pass
+            except Exception as e:  # pylint: disable=broad-except
+                if conn is not None and isinstance(e, conn.connection_errors + conn.channel_errors):
+                    log.warning("Session message consumer lost its broker connection; reconnecting", exc_info=True)
+                else:
+                    log.exception("Session message consumer failed; restarting")
+                self._stopping.wait(delay)
+                delay = min(delay * 2, _RECONNECT_MAX)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.release()
+                    except Exception:  # pylint: disable=broad-except
+                        pass
+        # Nothing will run the remaining requests; release their waiters.
+        self._apply_pending(None)
+
+    def _apply_pending(self, consumer):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                op, inbox, loop, done = self._pending.popleft()
+            error = None
+            try:
+                if consumer is not None:
+                    self._apply(consumer, op, inbox)
+                elif op == "attach":
+                    error = ConnectionError("session message consumer is stopped")
+            except Exception as e:  # pylint: disable=broad-except
+                error = e
+            loop.call_soon_threadsafe(_resolve, done, error)
+            if error is not None and consumer is not None and op == "attach":
+                # Let the connection-level handler decide whether to reconnect.
+                raise error
+
+    def _apply(self, consumer, op, inbox):
+        queue = session_queue(inbox.user_pk)
+        if op == "attach":
+            if queue.routing_key not in self._inboxes:
+                consumer.add_queue(queue)
+                consumer.consume()
+            self._inboxes[queue.routing_key] = inbox
+        elif self._inboxes.get(queue.routing_key) is inbox:
+            del self._inboxes[queue.routing_key]
+            consumer.cancel_by_queue(queue.name)
+
+    def _on_message(self, message):
+        routing_key = message.delivery_info.get("routing_key")
+        inbox = self._inboxes.get(routing_key)
+        if inbox is None:
+            log.debug("Dropping message for detached queue %s", routing_key)
+            return
+        task_id = (message.headers or {}).get(TASK_DONE_HEADER)
+        if task_id is not None:
+            inbox.finish(task_id)
+        else:
+            inbox.deliver(message.body)
+
+
+def _resolve(future, error):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> SessionMessageHub:
+    """
+    Return this process's session message hub, creating it on first use.
+    """
+    global _hub  # pylint: disable=global-statement
+    with _hub_lock:
+        if _hub is None:
+            _hub = SessionMessageHub()
+        return _hub
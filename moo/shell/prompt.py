@@ -12,7 +12,7 @@ from datetime import datetime, timezone
 from typing import Any, Literal, Optional
 
 from asgiref.sync import sync_to_async
-from kombu import Exchange, Queue, simple
+from celery.exceptions import TimeoutError as TaskTimeoutError
 from prompt_toolkit import ANSI
 from prompt_toolkit.application import run_in_terminal
 from prompt_toolkit.application.current import get_app
@@ -27,7 +27,8 @@ from prompt_toolkit.styles import Style
 from rich.console import Console
 
 from ..celery import app
-from ..core import code, models, moojson, tasks
+from ..core import code, models, moojson, presence, session_settings, tasks
+from . import local_worker, messages
 from .history import RedisHistory
 from .osc import (
     OSC_133_COMMAND_START,
@@ -44,6 +45,25 @@ _session_settings: dict[int, dict] = {}
 MODE_RICH = "rich"
 MODE_RAW = "raw"
 
+# Seconds handle_command() waits for parse_command before reporting a timeout.
+COMMAND_TIMEOUT = 30
+
+# Backoff between result-backend reads in await_task_result() for tasks that
+# send no done notice (login confuncs): start short so a fast task is not held
+# back noticeably and double up to one read a second.
+_RESULT_POLL_MIN = 0.05
+_RESULT_POLL_GROWTH = 2
+_RESULT_POLL_MAX = 1.0
+
+# With a done notice expected, the backend is read when it arrives, and only
+# this often otherwise: the notice can go to another process's session of the
+# same user, or come from a worker that predates it.
+_RESULT_NOTICE_FALLBACK = 1.0
+
+# Longest process_messages() waits for output before it rechecks whether the
+# SSH channel has closed. The wait is on the session's inbox, not the broker.
+_CHANNEL_CHECK_INTERVAL = 0.5
+
 
 PROMPT_SHORTCUTS = {
     '"': 'say "%"',
@@ -75,6 +95,69 @@ def _make_key_bindings() -> KeyBindings:
     return kb
 
 
+def _poll_result(result, propagate):
+    """
+    Take one non-blocking look at a Celery result.
+
+    :returns: ``(True, value)`` once the task has finished, re-raising its
+        exception when `propagate` is set, or ``(False, None)`` while it runs
+    """
+    if not result.ready():
+        return False, None
+    # maybe_throw() reads the stored meta directly; unlike get() it never
+    # touches the backend's shared result consumer, so it is safe to call
+    # from any thread.
+    return True, result.maybe_throw(propagate=propagate)
+
+
+async def await_task_result(result, timeout, propagate=True, inbox=None):
+    """
+    Wait for a Celery task without holding a thread while it runs.
+
+    ``AsyncResult.get()`` blocks its thread for the whole task, and inside a
+    thread-sensitive ``sync_to_async`` that thread is shared by every session
+    in the process. Here the coroutine waits on the session's `inbox` for the
+    notice the worker sends once the result is stored (see
+    :func:`moo.core.tasks.announce_command_done`), then reads the result
+    backend once on the shared executor. Without an inbox the backend is
+    read with an exponential backoff instead.
+
+    :param inbox: the session's :class:`~moo.shell.messages.SessionInbox`
+    :raises celery.exceptions.TimeoutError: if the task has not finished
+        within `timeout` seconds
+    """
+    if isinstance(result, local_worker.LocalResult):
+        # Running in this process: wait on the future itself. asyncio.wait()
+        # leaves it running on timeout, as a worker would.
+        done, _ = await asyncio.wait({asyncio.wrap_future(result.future)}, timeout=timeout)
+        if not done:
+            raise TaskTimeoutError(f"Task {result.id} did not finish within {timeout}s")
+        return result.maybe_throw(propagate=propagate)
+    poll = sync_to_async(_poll_result, thread_sensitive=False)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    notice = inbox.expect(result.id) if inbox is not None else None
+    delay = _RESULT_POLL_MIN if notice is None else _RESULT_NOTICE_FALLBACK
+    try:
+        if notice is not None:
+            await asyncio.wait({notice}, timeout=min(delay, timeout))
+        while True:
+            done, value = await poll(result, propagate)
+            if done:
+                return value
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TaskTimeoutError(f"Task {result.id} did not finish within {timeout}s")
+            if notice is not None and not notice.done():
+                await asyncio.wait({notice}, timeout=min(delay, remaining))
+            else:
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * _RESULT_POLL_GROWTH, _RESULT_POLL_MAX)
+    finally:
+        if inbox is not None:
+            inbox.forget(result.id)
+
+
 async def embed(
     user: models.User,
     session=None,
@@ -178,12 +261,12 @@ class MooPrompt:
         # Rich-rendered ANSI blob of the connect-time confunc burst, flushed
         # via the rich prompt's pre_run callback or raw mode's _chan_write.
         self._pending_connect_output: str = ""
-        # Kombu session buffer — one consumer for the whole session. See
-        # :doc:`/explanation/shell-internals` § "Single-consumer invariant".
-        self._session_conn: Any = None
-        self._session_channel: Any = None
-        self._session_buffer: Any = None
-        self.last_property_write: datetime | None = None
+        # This session's inbox on the process-wide message hub, attached for
+        # the whole session. See :doc:`/explanation/shell-internals`
+        # § "Single-consumer invariant".
+        self._session_inbox: Any = None
+        # This session's token in the presence registry, set by _mark_connected.
+        self.presence_token: str | None = None
 
         self.output_prefix = None
         self.output_suffix = None
@@ -291,23 +374,21 @@ class MooPrompt:
         into ``_pending_connect_output`` — see
         :doc:`/explanation/shell-internals` § "Startup Choreography".
         """
-        from django.core.cache import cache
-
         _session_settings.pop(self.user.pk, None)
         _session_settings.setdefault(self.user.pk, {})["mode"] = self.mode
-        cache.set(f"moo:session:{self.user.pk}:mode", self.mode, timeout=86400)
+        session_settings.store(self.user.pk, "mode", self.mode)
         await self._mark_connected()
         await self._open_session_buffer()
         confunc_tasks = await self._fire_confunc()
         await self._await_tasks(confunc_tasks)
-        # Coalesce: Redis round-trip latency can split one tell() burst
-        # across multiple reads. Poll until the buffer is empty for three
-        # consecutive passes (or we hit the 2s deadline).
+        # Coalesce: broker latency can split one tell() burst across several
+        # deliveries. Collect until nothing arrives for three consecutive
+        # 50ms waits (or we hit the 2s deadline).
         empty_in_a_row = 0
         deadline = asyncio.get_event_loop().time() + 2.0
         pieces: list[str] = []
         while empty_in_a_row < 3 and asyncio.get_event_loop().time() < deadline:
-            to_write, events = await self._drain_session_buffer()
+            to_write, events = await self._wait_session_messages(0.05)
             for message in events:
                 if message.get("event") == "disconnect":
                     self.is_exiting = True
@@ -319,7 +400,6 @@ class MooPrompt:
                 pieces.extend(to_write)
             else:
                 empty_in_a_row += 1
-            await asyncio.sleep(0.05)
         if pieces:
             settings = _session_settings.get(self.user.pk, {})
             color_system: Optional[Literal["truecolor"]] = None if settings.get("quiet_mode", False) else "truecolor"
@@ -334,8 +414,6 @@ class MooPrompt:
 
     async def _repl_teardown(self) -> None:
         """Shared REPL shutdown: fire disfunc, release session state and the Kombu consumer."""
-        from django.core.cache import cache
-
         self.is_exiting = True
         self.disconnect_event.set()
         # Exit a live window Application so it restores the terminal cleanly.
@@ -350,18 +428,7 @@ class MooPrompt:
         if user_pk in _session_settings:
             del _session_settings[user_pk]
             log.debug(f"Cleared session settings for user {user_pk}")
-        for key in (
-            "mode",
-            "quiet_mode",
-            "output_prefix",
-            "output_suffix",
-            "output_global_prefix",
-            "output_global_suffix",
-            "color_system",
-            "iac",
-            "window_active",
-        ):
-            cache.delete(f"moo:session:{user_pk}:{key}")
+        session_settings.clear(user_pk)
         await self._close_session_buffer()
 
     async def process_commands_rich(self):
@@ -390,12 +457,10 @@ class MooPrompt:
         try:
             while not self.is_exiting:
                 try:
-                    from django.core.cache import cache as _cache
-
                     cols = get_app().output.get_size().columns
                     if _session_settings.get(self.user.pk, {}).get("terminal_width") != cols:
                         _session_settings.setdefault(self.user.pk, {})["terminal_width"] = cols
-                        _cache.set(f"moo:session:{self.user.pk}:terminal_width", cols, timeout=86400)
+                        session_settings.store(self.user.pk, "terminal_width", cols)
                 except Exception:  # pylint: disable=broad-except
                     pass
                 message = await self.generate_prompt()
@@ -570,13 +635,13 @@ class MooPrompt:
         through Kombu, before raw mode re-renders the next prompt.
 
         Kombu publish→consume has ~5-20ms broker latency, so we wait a brief
-        deadline for in-flight messages to arrive, then drain. Without this
+        deadline for in-flight messages to arrive. Without this
         the next prompt races the drain and lands above the verb's output.
         """
         deadline = asyncio.get_event_loop().time() + 0.15
         empty_in_a_row = 0
         while empty_in_a_row < 2 and asyncio.get_event_loop().time() < deadline:
-            to_write, events = await self._drain_session_buffer()
+            to_write, events = await self._wait_session_messages(0.02)
             for message in events:
                 if message.get("event") == "disconnect":
                     self.is_exiting = True
@@ -589,7 +654,6 @@ class MooPrompt:
                 empty_in_a_row = 0
             else:
                 empty_in_a_row += 1
-            await asyncio.sleep(0.02)
 
     def _editor_rejection_pieces(self) -> list[str]:
         """Build the "editor not available" error for raw mode (no TUI)."""
@@ -753,8 +817,6 @@ class MooPrompt:
         :param req: ``window_open`` request dict with ``height``/``title`` and
             optional callback fields
         """
-        from django.core.cache import cache
-
         from .window import WindowState, build_window_app
 
         settings = _session_settings.setdefault(self.user.pk, {})
@@ -771,11 +833,11 @@ class MooPrompt:
         self._window_app = window_app
 
         # Mark active both in-process (authoritative for the message loop) and
-        # in the cache (so Celery-side verbs can read window state).
+        # in the session hash (so Celery-side verbs can read window state).
         settings["window_active"] = True
         settings["window_height"] = state.height
         settings["window_title"] = state.title
-        cache.set(f"moo:session:{self.user.pk}:window_active", True, timeout=86400)
+        session_settings.store(self.user.pk, "window_active", True)
 
         async def _watch_disconnect():
             await self.disconnect_event.wait()
@@ -797,7 +859,7 @@ class MooPrompt:
             self._window_app = None
             self._window_state = None
             settings["window_active"] = False
-            cache.delete(f"moo:session:{self.user.pk}:window_active")
+            session_settings.discard(self.user.pk, "window_active")
             await self._dispatch_window_close_callback(req)
             # ^D inside window mode = quit the session, not just the window —
             # otherwise the user lands on the scrolling prompt and must ^D
@@ -915,17 +977,34 @@ class MooPrompt:
 
     @sync_to_async
     def _mark_connected(self):
-        """Set the ``is_connected()`` cache key before confunc fires."""
-        from django.core.cache import cache
-
-        cache.set(f"moo:connected:{self.user.pk}", True)
+        """
+        Join the presence registry before confunc fires, so ``is_connected()``
+        is already true for it, and record ``last_connected_time``.
+        """
+        caller = self._get_avatar()
+        if caller is None:
+            return
+        self.presence_token = presence.join(caller.pk, caller.site_id)
+        self._record_last_connected(caller)
 
     @sync_to_async
     def _mark_disconnected(self):
-        """Clear the ``is_connected()`` cache key after disfunc fires."""
-        from django.core.cache import cache
+        """Leave the presence registry after disfunc fires."""
+        if self.presence_token is None:
+            return
+        presence.leave(self.presence_token)
+        self.presence_token = None
+        caller = self._get_avatar()
+        if caller is not None:
+            self._record_last_connected(caller)
 
-        cache.delete(f"moo:connected:{self.user.pk}")
+    def _record_last_connected(self, caller):
+        """
+        Stamp ``last_connected_time`` for ``@lastlog``. Written at login and
+        logout only; who is online and for how long is the presence registry's.
+        """
+        with code.ContextManager(caller, lambda x: None, site=self.site):
+            caller.set_property("last_connected_time", datetime.now(timezone.utc))
 
     @sync_to_async
     def _fire_confunc(self):
@@ -955,12 +1034,11 @@ class MooPrompt:
             )
         return results
 
-    @sync_to_async
-    def _await_tasks(self, task_results):
-        """Block on Celery tasks, swallowing failures so a broken confunc cannot block the prompt."""
+    async def _await_tasks(self, task_results):
+        """Wait for Celery tasks, swallowing failures so a broken confunc cannot block the prompt."""
         for result in task_results:
             try:
-                result.get(timeout=10, propagate=False)
+                await await_task_result(result, timeout=10, propagate=False)
             except Exception:  # pylint: disable=broad-except
                 log.exception("confunc task failed")
 
@@ -995,47 +1073,58 @@ class MooPrompt:
         return [("class:pound", ">>> ")]
 
     @sync_to_async
-    def handle_command(self, line: str) -> tuple[list, list]:
+    def _dispatch_command(self, line: str):
+        """
+        Queue ``line`` for the parser and return its ``AsyncResult``, or a
+        :class:`~moo.shell.local_worker.LocalResult` when commands run in
+        this process (``MOO_LOCAL_COMMANDS``).
+
+        Runs on the thread-sensitive executor because it touches the ORM; it
+        returns as soon as the task is published.
+        """
+        caller = self._get_avatar()
+        if self.presence_token is not None:
+            presence.touch(self.presence_token)
+        log.debug(f"{caller}: {line}")
+        if local_worker.is_enabled():
+            return local_worker.apply_async(tasks.parse_command, caller.pk, line)
+        return tasks.parse_command.delay(caller.pk, line)
+
+    async def handle_command(self, line: str) -> tuple[list, list]:
         """
         Dispatch ``line`` to the parser and collect its output + published events.
 
+        Only the dispatch itself runs on the thread-sensitive executor. The
+        wait for the task is asynchronous, so a slow verb holds up its own
+        session's prompt and nobody else's.
+
         :param line: raw input string typed by the user
         :returns: ``(to_write, events)`` — Rich markup strings to print, and
             event-type strings (``"input_prompt"``, ``"editor"``, ``"paginator"``)
             the verb published during its Celery task.
         """
-        from django.core.cache import cache
-
-        caller = self._get_avatar()
-        now = datetime.now(timezone.utc)
-        # Rate-limit last_connected_time writes to avoid hammering the DB.
-        if self.last_property_write is None or (now - self.last_property_write).total_seconds() > 15:
-            with code.ContextManager(caller, lambda x: None, site=self.site):
-                caller.set_property("last_connected_time", now)
-            self.last_property_write = now
-        log.debug(f"{caller}: {line}")
+        ct = await self._dispatch_command(line)
 
-        user_pk = self.user.pk
-        settings = _session_settings.get(user_pk, {})
+        settings = _session_settings.get(self.user.pk, {})
         output_prefix = settings.get("output_prefix")
         output_suffix = settings.get("output_suffix")
         output_global_prefix = settings.get("output_global_prefix")
         output_global_suffix = settings.get("output_global_suffix")
 
-        ct = tasks.parse_command.delay(caller.pk, line)
         content = []
         exit_status = 0
+        events = []
         try:
-            output, exit_status = ct.get(timeout=30)
+            # Workers from before events were folded into the result still
+            # return ``(output, exit_status)``; treat that as "no events".
+            output, exit_status, *rest = await await_task_result(ct, COMMAND_TIMEOUT, inbox=self._session_inbox)
+            events = rest[0] if rest else []
             content.extend(output)
         except:  # pylint: disable=bare-except
             import traceback
 
             exit_status = 1
             content.append(f"[bold red]{traceback.format_exc()}[/bold red]")
-        events_key = f"moo:task_events:{ct.id}"
-        events = cache.get(events_key) or []
-        cache.delete(events_key)
         # Empty-content delimiter frames leave an unresolved run_in_terminal
         # future and hang process_commands — only wrap real output.
         to_write = []
@@ -1059,66 +1148,61 @@ class MooPrompt:
                 to_write.append(_RawAnsi(osc_133_command_end(exit_status)))
         return to_write, events
 
-    @sync_to_async
-    def _open_session_buffer(self):
-        """Open the per-session Kombu consumer. See :doc:`/explanation/shell-internals`."""
-        conn = app.connection_for_read()
-        conn.connect()
-        channel = conn.channel()
-        queue = Queue(
-            f"messages.{self.user.pk}",
-            Exchange("moo", type="direct", channel=channel),
-            f"user-{self.user.pk}",
-            channel=channel,
-            auto_delete=True,
-        )
-        sb = simple.SimpleBuffer(channel, queue, no_ack=True)
-        self._session_conn = conn
-        self._session_channel = channel
-        self._session_buffer = sb
+    async def _open_session_buffer(self):
+        """Attach this session's queue to the process's message hub. See :doc:`/explanation/shell-internals`."""
+        self._session_inbox = await messages.get_hub().attach(self.user.pk)
 
-    @sync_to_async
-    def _close_session_buffer(self):
-        """Release the session-long consumer held by ``_open_session_buffer``."""
-        sb = self._session_buffer
-        channel = self._session_channel
-        conn = self._session_conn
-        self._session_buffer = None
-        self._session_channel = None
-        self._session_conn = None
-        if sb is not None:
-            try:
-                sb.close()
-            except Exception:  # pylint: disable=broad-except
-                log.exception("Error closing session buffer")
-        if channel is not None:
-            try:
-                channel.close()
-            except Exception:  # pylint: disable=broad-except
-                log.exception("Error closing session channel")
-        if conn is not None:
+    async def _close_session_buffer(self):
+        """Detach the inbox attached by ``_open_session_buffer``."""
+        inbox = self._session_inbox
+        self._session_inbox = None
+        if inbox is not None:
             try:
-                conn.release()
+                await messages.get_hub().detach(inbox)
             except Exception:  # pylint: disable=broad-except
-                log.exception("Error releasing session connection")
+                log.exception("Error detaching session inbox")
+
+    async def _drain_session_buffer(self):
+        """
+        Return ``(to_write, other_events)`` for every message already
+        delivered, without waiting.
+        """
+        inbox = self._session_inbox
+        if inbox is None:
+            return [], []
+        bodies = inbox.drain()
+        if not bodies:
+            return [], []
+        return await self._decode_session_messages(bodies)
+
+    async def _wait_session_messages(self, timeout):
+        """
+        Like ``_drain_session_buffer``, but wait up to `timeout` seconds for
+        the first message to arrive.
+        """
+        inbox = self._session_inbox
+        if inbox is None:
+            await asyncio.sleep(timeout)
+            return [], []
+        bodies = await inbox.wait(timeout)
+        if not bodies:
+            return [], []
+        return await self._decode_session_messages(bodies)
 
     @sync_to_async
-    def _drain_session_buffer(self):
+    def _decode_session_messages(self, bodies):
         """
-        Drain pending Kombu messages; apply ``session_setting`` events in-place
+        Decode message bodies; apply ``session_setting`` events in-place
         and return ``(to_write, other_events)`` for the caller.
         """
         to_write = []
         events = []
-        sb = self._session_buffer
-        if sb is None:
-            return to_write, events
-        while True:
-            try:
-                msg = sb.get_nowait()
-            except sb.Empty:
-                break
-            content = moojson.loads(msg.body)
+        envelopes = []
+        for body in bodies:
+            content = moojson.loads(body)
+            # A task's output to one player arrives as one batch (moo.core.outbox).
+            envelopes.extend(content["batch"] if "batch" in content else [content])
+        for content in envelopes:
             message = content["message"]
             if isinstance(message, dict) and message.get("event") == "session_setting":
                 user_pk = self.user.pk
@@ -1339,9 +1423,10 @@ class MooPrompt:
 
     async def process_messages(self) -> None:
         """
-        Kombu consumer loop running alongside ``process_commands``.
+        Message loop running alongside ``process_commands``.
 
-        Drains the shared session buffer, routes ``editor`` / ``paginator`` /
+        Waits on the session's inbox, which the process-wide message hub
+        fills as messages arrive (see :mod:`moo.shell.messages`), routes ``editor`` / ``paginator`` /
         ``input_prompt`` events to their asyncio queues, and emits plain
         strings through ``writer``. Always signals ``process_commands`` to
         exit on teardown so the two coroutines terminate together. See
@@ -1364,13 +1449,12 @@ class MooPrompt:
                     self.is_exiting = True
                     self.disconnect_event.set()
                     break
-                to_write, events = await self._drain_session_buffer()
+                to_write, events = await self._wait_session_messages(_CHANNEL_CHECK_INTERVAL)
                 # Coalesce: one run_in_terminal per tell burst, not per message —
                 # avoids prompt-flash between every line.
                 if to_write or events:
                     for _ in range(10):
-                        await asyncio.sleep(0.02)
-                        more_write, more_events = await self._drain_session_buffer()
+                        more_write, more_events = await self._wait_session_messages(0.02)
                         if not more_write and not more_events:
                             break
                         to_write.extend(more_write)
@@ -1420,8 +1504,6 @@ class MooPrompt:
                             print_formatted_text(ANSI(b), end="")
 
                         await self._run_in_terminal_marked(_write_blob)
-                if not to_write and not events:
-                    await asyncio.sleep(0.05)
         except:  # pylint: disable=bare-except
             log.exception("Stopping message processing")
         finally:
@@ -21,6 +21,7 @@ from django.contrib.auth.models import User  # pylint: disable=imported-auth-use
 from prompt_toolkit.contrib.ssh import PromptToolkitSSHServer, PromptToolkitSSHSession
 from simplesshkey.models import UserKey
 
+from ..core import presence, session_settings
 from .iac import IacNegotiator, IacParser, is_known_mud_client
 from .prompt import embed
 
@@ -127,12 +128,10 @@ class MooPromptToolkitSSHSession(PromptToolkitSSHSession):
         if self.user is None:
             return
         try:
-            from django.core.cache import cache  # pylint: disable=import-outside-toplevel
-
             from .prompt import _session_settings  # pylint: disable=import-outside-toplevel
 
             _session_settings.get(self.user.pk, {}).pop("iac", None)
-            cache.delete(f"moo:session:{self.user.pk}:iac")
+            session_settings.discard(self.user.pk, "iac")
         except Exception:  # pylint: disable=broad-except
             log.exception("failed to clear stale IAC cache for user=%s", self.user)
 
@@ -213,8 +212,6 @@ class MooPromptToolkitSSHSession(PromptToolkitSSHSession):
         """
         if self.user is None:
             return
-        from django.core.cache import cache  # pylint: disable=import-outside-toplevel
-
         from .prompt import _session_settings  # pylint: disable=import-outside-toplevel
 
         caps = dict(self.iac_negotiator.capabilities)
@@ -222,8 +219,8 @@ class MooPromptToolkitSSHSession(PromptToolkitSSHSession):
         if isinstance(existing, dict) and "gmcp_packages" in existing:
             caps["gmcp_packages"] = existing["gmcp_packages"]
         _session_settings.setdefault(self.user.pk, {})["iac"] = caps
-        # Mirror to cache so Celery workers (separate process) can see it.
-        cache.set(f"moo:session:{self.user.pk}:iac", caps, timeout=86400)
+        # Mirror to the shared session hash so Celery workers (separate process) can see it.
+        session_settings.store(self.user.pk, "iac", caps)
 
     def _on_ttype(self, client_name: str, mtts: int) -> None:
         # Capability mirroring happens in data_received after handle() runs;
@@ -266,8 +263,6 @@ class MooPromptToolkitSSHSession(PromptToolkitSSHSession):
         """
         if not isinstance(data, list) or self.user is None:
             return
-        from django.core.cache import cache  # pylint: disable=import-outside-toplevel
-
         from .prompt import _session_settings  # pylint: disable=import-outside-toplevel
 
         settings = _session_settings.setdefault(self.user.pk, {})
@@ -292,7 +287,7 @@ class MooPromptToolkitSSHSession(PromptToolkitSSHSession):
             for entry in data:
                 if isinstance(entry, str) and entry:
                     pkgs.pop(entry.split(None, 1)[0], None)
-        cache.set(f"moo:session:{self.user.pk}:iac", iac, timeout=86400)
+        session_settings.store(self.user.pk, "iac", iac)
         log.info("GMCP %s user=%s pkgs=%r", module, self.user, pkgs)
 
     def _dispatch_editor_save(self, data: object) -> None:
@@ -352,7 +347,7 @@ class MooPromptToolkitSSHSession(PromptToolkitSSHSession):
         from django.conf import settings as django_settings  # pylint: disable=import-outside-toplevel
         from moo import __version__  # pylint: disable=import-outside-toplevel
 
-        players_online = str(len(_active_sessions))
+        players_online = str(len(presence.online(site_pk=self.site.pk if self.site is not None else None)))
         return {
             "NAME": getattr(django_settings, "MOO_NAME", "DjangoMOO"),
             "CODEBASE": "DjangoMOO",
@@ -534,6 +529,20 @@ async def _health_handler(reader: asyncio.StreamReader, writer: asyncio.StreamWr
     writer.close()
 
 
+async def _presence_heartbeat() -> None:
+    """
+    Re-score this server's sessions in the presence registry every
+    ``MOO_PRESENCE_HEARTBEAT`` seconds, so idle players stay listed and a
+    server that dies takes its sessions with it once they expire.
+    """
+    while True:
+        await asyncio.sleep(presence.heartbeat_interval())
+        try:
+            await sync_to_async(presence.beat, thread_sensitive=False)()
+        except Exception:  # pylint: disable=broad-except
+            log.exception("presence heartbeat failed")
+
+
 async def server(port=8022):
     """
     Create an AsyncSSH server on the requested port.
@@ -556,6 +565,9 @@ async def server(port=8022):
 
     loop.add_signal_handler(signal.SIGUSR2, _dump_state)
 
+    # Held for the life of the server; the loop only keeps weak references to tasks.
+    _heartbeat = loop.create_task(_presence_heartbeat())
+
     await asyncio.start_server(_health_handler, "", 8023)
     log.info("Health endpoint listening on port 8023")
 
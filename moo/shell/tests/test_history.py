@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import uuid
 from unittest.mock import patch
 
 import pytest
@@ -31,7 +32,7 @@ def test_dedupes_consecutive_repeats():
     h.store_string("look")
     h.store_string("get key")
     h.store_string("get key")
-    assert cache.get(h.key) == ["look", "get key"]
+    assert list(h.load_history_strings()) == ["get key", "look"]
 
 
 def test_non_consecutive_repeats_allowed():
@@ -40,7 +41,7 @@ def test_non_consecutive_repeats_allowed():
     h.store_string("look")
     h.store_string("north")
     h.store_string("look")
-    assert cache.get(h.key) == ["look", "north", "look"]
+    assert list(h.load_history_strings()) == ["look", "north", "look"]
 
 
 def test_skips_empty_and_whitespace():
@@ -50,7 +51,7 @@ def test_skips_empty_and_whitespace():
     h.store_string("   ")
     h.store_string("\t")
     h.store_string("\n  \t")
-    assert cache.get(h.key) is None
+    assert not list(h.load_history_strings())
 
 
 def test_caps_at_limit():
@@ -58,7 +59,7 @@ def test_caps_at_limit():
     h = RedisHistory(user_pk=1, cap=5)
     for i in range(8):
         h.store_string(f"cmd-{i}")
-    assert cache.get(h.key) == [f"cmd-{i}" for i in range(3, 8)]
+    assert list(h.load_history_strings()) == [f"cmd-{i}" for i in range(7, 2, -1)]
 
 
 def test_scoped_per_user():
@@ -79,3 +80,16 @@ def test_ttl_applied():
     mock_set.assert_called_once()
     _, kwargs = mock_set.call_args
     assert kwargs.get("timeout") == 1234
+
+
+def test_history_cached_by_earlier_releases_is_adopted(redis_cache):
+    """A whole-list history under the old cache key moves into the Redis list."""
+    h = RedisHistory(user_pk=uuid.uuid4().int)
+    cache.set(h.key, ["a", "b", "c"])
+    try:
+        assert list(h.load_history_strings()) == ["c", "b", "a"]
+        assert cache.get(h.key) is None
+        h.store_string("d")
+        assert list(h.load_history_strings()) == ["d", "c", "b", "a"]
+    finally:
+        redis_cache.delete(h.key)
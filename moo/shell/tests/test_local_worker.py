@@ -0,0 +1,139 @@
+# pylint: disable=protected-access
+"""Tests for in-process command execution (moo/shell/local_worker.py)."""
+
+import asyncio
+import time
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import pytest
+from celery.exceptions import TimeoutError as TaskTimeoutError
+
+from moo.core import code
+from moo.core.exceptions import TaskKilled, TimeLimitError
+from moo.shell import local_worker
+from moo.shell.prompt import MooPrompt, await_task_result
+
+
+class _RecordingTask:
+    """Stand-in for a Celery task that records how ``apply`` was called."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    def apply(self, args, task_id, throw):
+        self.calls.append(
+            {
+                "args": args,
+                "task_id": task_id,
+                "throw": throw,
+                "deadline": code._deadline.get(),
+                "kill_deadline": code._kill_deadline.get(),
+            }
+        )
+        if self.error is not None:
+            raise self.error
+        return MagicMock(result=self.result)
+
+
+def test_apply_async_runs_task_with_time_limit():
+    task = _RecordingTask(result=(["ok"], 0))
+    result = local_worker.apply_async(task, 7, "look")
+    assert result.get(timeout=5) == (["ok"], 0)
+    assert len(task.calls) == 1
+    call = task.calls[0]
+    assert call["args"] == (7, "look")
+    assert call["task_id"] == result.id
+    assert call["throw"] is True
+    assert call["deadline"] is not None and call["deadline"] > time.monotonic() - 60
+    assert call["kill_deadline"] is not None and call["kill_deadline"] > time.monotonic() - 60
+
+
+def test_local_result_maybe_throw_respects_propagate():
+    task = _RecordingTask(error=RuntimeError("boom"))
+    result = local_worker.apply_async(task)
+    with pytest.raises(RuntimeError):
+        result.get(timeout=5)
+    assert isinstance(result.maybe_throw(propagate=False), RuntimeError)
+
+
+def test_run_reports_a_killed_task():
+    task = _RecordingTask(error=TaskKilled())
+    output, exit_status, events = local_worker.apply_async(task, 7, "look").get(timeout=5)
+    assert exit_status == 1
+    assert local_worker.KILLED_MESSAGE in output[0]
+    assert events == []
+
+
+class _StubbornTask:
+    """Stand-in for a task whose verb catches ``TimeLimitError`` and keeps going."""
+
+    def __init__(self):
+        self.soft_at = None
+
+    def apply(self, args, task_id, throw):
+        start = time.monotonic()
+        while True:
+            code.check_killed()
+            try:
+                code.check_deadline()
+            except TimeLimitError:
+                if self.soft_at is None:
+                    self.soft_at = time.monotonic() - start
+            time.sleep(0.001)
+
+
+def test_run_kills_a_task_only_after_the_grace_period(settings):
+    settings.MOO_LOCAL_COMMAND_KILL_GRACE = 0.2
+    task = _StubbornTask()
+    original = local_worker.app.conf.task_time_limit
+    local_worker.app.conf.task_time_limit = 0.05
+    try:
+        start = time.monotonic()
+        output, exit_status, _ = local_worker.apply_async(task).get(timeout=5)
+        elapsed = time.monotonic() - start
+    finally:
+        local_worker.app.conf.task_time_limit = original
+    assert exit_status == 1
+    assert local_worker.KILLED_MESSAGE in output[0]
+    assert task.soft_at is not None and task.soft_at < 0.2
+    assert elapsed >= 0.25
+
+
+def test_await_task_result_waits_on_local_future():
+    future = Future()
+    result = local_worker.LocalResult("local-1", future)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, future.set_result, (["done"], 0))
+        return await await_task_result(result, timeout=5)
+
+    assert asyncio.run(scenario()) == (["done"], 0)
+
+
+def test_await_task_result_local_timeout_leaves_task_running():
+    future = Future()
+    future.set_running_or_notify_cancel()
+    result = local_worker.LocalResult("local-2", future)
+    with pytest.raises(TaskTimeoutError):
+        asyncio.run(await_task_result(result, timeout=0.01))
+    assert not future.cancelled()
+
+
+def test_dispatch_command_uses_local_worker_when_enabled(settings):
+    settings.MOO_LOCAL_COMMANDS = True
+    user = MagicMock()
+    user.pk = 1
+    prompt = MooPrompt(user)
+    avatar = MagicMock(pk=42)
+    prompt._get_avatar = lambda: avatar
+    with (
+        patch("moo.shell.prompt.local_worker.apply_async") as mock_apply,
+        patch("moo.shell.prompt.tasks.parse_command") as mock_task,
+    ):
+        asyncio.run(prompt._dispatch_command("look"))
+    mock_apply.assert_called_once_with(mock_task, 42, "look")
+    mock_task.delay.assert_not_called()
@@ -0,0 +1,127 @@
+"""Tests for the process-wide session message hub (moo/shell/messages.py)."""
+
+import asyncio
+
+from kombu import Connection, Producer
+
+from ...core import TASK_DONE_HEADER
+from ..messages import SessionMessageHub, session_queue
+
+
+def _memory_hub():
+    return SessionMessageHub(lambda: Connection("memory://", transport_options={"polling_interval": 0.01}))
+
+
+def _publish(user_pk, body, headers=None):
+    queue = session_queue(user_pk)
+    with Connection("memory://") as conn:
+        Producer(conn.channel()).publish(
+            body,
+            exchange=queue.exchange,
+            routing_key=queue.routing_key,
+            declare=[queue],
+            serializer="json",
+            headers=headers,
+        )
+
+
+def _run(coro_fn):
+    hub = _memory_hub()
+    try:
+        return asyncio.run(coro_fn(hub))
+    finally:
+        hub.stop(timeout=2)
+
+
+def test_attached_inbox_receives_published_messages():
+    async def scenario(hub):
+        inbox = await hub.attach(9101)
+        _publish(9101, "hello")
+        _publish(9101, "world")
+        received = []
+        while len(received) < 2:
+            bodies = await inbox.wait(timeout=2)
+            assert bodies, "timed out waiting for delivery"
+            received.extend(bodies)
+        await hub.detach(inbox)
+        return received
+
+    assert _run(scenario) == [b'"hello"', b'"world"']
+
+
+def test_idle_inbox_wait_times_out_empty():
+    async def scenario(hub):
+        inbox = await hub.attach(9102)
+        bodies = await inbox.wait(timeout=0.05)
+        await hub.detach(inbox)
+        return bodies
+
+    assert _run(scenario) == []
+
+
+def test_second_attach_takes_the_queue_over():
+    async def scenario(hub):
+        zombie = await hub.attach(9103)
+        live = await hub.attach(9103)
+        # Detaching the zombie must not stop the live session's consumer.
+        await hub.detach(zombie)
+        _publish(9103, "for the live session")
+        bodies = await live.wait(timeout=2)
+        await hub.detach(live)
+        return zombie.drain(), bodies
+
+    zombie_bodies, live_bodies = _run(scenario)
+    assert zombie_bodies == []
+    assert live_bodies == [b'"for the live session"']
+
+
+def test_detached_inbox_gets_nothing_more():
+    async def scenario(hub):
+        inbox = await hub.attach(9104)
+        await hub.detach(inbox)
+        _publish(9104, "too late")
+        return await inbox.wait(timeout=0.1)
+
+    assert _run(scenario) == []
+
+
+def test_task_done_notice_wakes_its_waiter_instead_of_the_output_stream():
+    async def scenario(hub):
+        inbox = await hub.attach(9105)
+        early = inbox.expect("task-1")
+        _publish(9105, "", headers={TASK_DONE_HEADER: "task-1"})
+        _publish(9105, "", headers={TASK_DONE_HEADER: "task-2"})
+        _publish(9105, "output")
+        await asyncio.wait_for(early, timeout=2)
+        bodies = await inbox.wait(timeout=2)
+        # A notice that beat its waiter is remembered.
+        late = inbox.expect("task-2")
+        await hub.detach(inbox)
+        return bodies, late.done()
+
+    assert _run(scenario) == ([b'"output"'], True)
+
+
+def test_consumer_survives_a_broker_that_is_down_at_startup(monkeypatch):
+    monkeypatch.setattr("moo.shell.messages._RECONNECT_MIN", 0.01)
+    attempts = []
+
+    def connection_factory():
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise ConnectionRefusedError("broker is down")
+        return Connection("memory://", transport_options={"polling_interval": 0.01})
+
+    async def scenario():
+        inbox = await hub.attach(9106)
+        _publish(9106, "after the outage")
+        bodies = await inbox.wait(timeout=2)
+        await hub.detach(inbox)
+        return bodies
+
+    hub = SessionMessageHub(connection_factory)
+    try:
+        assert asyncio.run(scenario()) == [b'"after the outage"']
+    finally:
+        hub.stop(timeout=2)
+    assert len(attempts) >= 3
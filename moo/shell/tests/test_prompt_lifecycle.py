@@ -7,7 +7,7 @@ Covers:
   - MooPrompt construction (queues, mode stamping, _chan plumbing)
   - process_commands() dispatch to rich/raw
   - _repl_setup / _repl_teardown lifecycle hooks
-  - handle_command() property-write throttling and event-cache draining
+  - handle_command() presence touch and event-cache draining
   - process_messages() dispatch (paginator + plain tell, raw vs rich)
   - _fire_confunc / _await_tasks login hooks
   - disconnect-event handling
@@ -15,12 +15,14 @@ Covers:
 
 import asyncio
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from celery.exceptions import TimeoutError as TaskTimeoutError
 
 import moo.shell.prompt as prompt_module
+from moo.shell.messages import SessionInbox
 from moo.shell.prompt import MODE_RAW, MODE_RICH, MooPrompt
 
 
@@ -49,7 +51,7 @@ def _make_handle_command_mocks():
     prompt = MooPrompt(user)
     prompt._get_avatar = lambda: avatar
     parse_result = MagicMock()
-    parse_result.get.return_value = ([], 0)
+    parse_result.maybe_throw.return_value = ([], 0, [])
     parse_result.id = "test-task-id"
     return prompt, avatar, parse_result
 
@@ -77,33 +79,27 @@ def _run_process_messages(prompt, messages):
     dispatch logic. After all messages are delivered, ``is_exiting`` is set
     so the loop terminates.
     """
-    MockEmpty = type("MockEmpty", (Exception,), {})
-    msg_iter = iter(messages)
-
-    def get_nowait():
-        try:
-            body_dict = next(msg_iter)
-            mock_msg = MagicMock()
-            mock_msg.body = json.dumps({"message": body_dict, "caller_id": None})
-            return mock_msg
-        except StopIteration as exc:
-            prompt.is_exiting = True
-            raise MockEmpty() from exc
+    bodies = [json.dumps({"message": body_dict, "caller_id": None}) for body_dict in messages]
 
-    mock_sb = MagicMock()
-    mock_sb.Empty = MockEmpty
-    mock_sb.get_nowait.side_effect = get_nowait
-    prompt._session_buffer = mock_sb
+    async def wait(timeout=None):  # pylint: disable=unused-argument
+        if not bodies:
+            prompt.is_exiting = True
+            return []
+        delivered = list(bodies)
+        bodies.clear()
+        return delivered
+
+    inbox = MagicMock()
+    inbox.wait.side_effect = wait
+    inbox.drain.return_value = []
+    prompt._session_inbox = inbox
     prompt.startup_drain_complete.set()
     prompt.prompt_app_ready.set()
     # The real _chan is a live SSH channel; MagicMock's auto-generated
     # is_closing() returns truthy and would short-circuit the loop.
     prompt._chan = None
 
-    with (
-        patch("asyncio.sleep", new=AsyncMock()),
-        patch("moo.shell.prompt.moojson.loads", side_effect=json.loads),
-    ):
+    with patch("moo.shell.prompt.moojson.loads", side_effect=json.loads):
         asyncio.run(prompt.process_messages())
 
 
@@ -122,7 +118,7 @@ def test_init():
     assert isinstance(prompt.paginator_queue, asyncio.Queue)
     assert isinstance(prompt.disconnect_event, asyncio.Event)
     assert not prompt.disconnect_event.is_set()
-    assert prompt.last_property_write is None
+    assert prompt.presence_token is None
     assert prompt.mode == MODE_RICH
     assert prompt_module._session_settings[user.pk]["mode"] == MODE_RICH
 
@@ -169,84 +165,144 @@ def test_process_commands_dispatches_to_raw():
 
 
 # ---------------------------------------------------------------------------
-# handle_command — property-write throttling + cache events
+# handle_command — presence + cache events
 # ---------------------------------------------------------------------------
 
 
-def test_handle_command_writes_property_on_first_command():
-    """handle_command() writes last_connected_time on the first command (last_property_write is None)."""
+def test_handle_command_touches_presence_without_writing_properties():
+    """handle_command() records activity in the presence registry, not through the ORM."""
     prompt, avatar, parse_result = _make_handle_command_mocks()
+    prompt.presence_token = "1:session"
     with (
         patch("moo.shell.prompt.tasks.parse_command") as mock_task,
-        patch("moo.shell.prompt.code.ContextManager") as mock_ctx,
+        patch("moo.shell.prompt.presence.touch") as mock_touch,
     ):
         mock_task.delay.return_value = parse_result
-        mock_ctx.return_value.__enter__ = MagicMock(return_value=None)
-        mock_ctx.return_value.__exit__ = MagicMock(return_value=False)
         asyncio.run(prompt.handle_command("look"))
-    avatar.set_property.assert_called_once()
-    args = avatar.set_property.call_args[0]
-    assert args[0] == "last_connected_time"
-    assert isinstance(args[1], datetime)
-    assert prompt.last_property_write is not None
+    mock_touch.assert_called_once_with("1:session")
+    avatar.set_property.assert_not_called()
 
 
-def test_handle_command_throttles_property_writes():
-    """handle_command() skips the property write when fewer than 15 seconds have elapsed."""
-    prompt, avatar, parse_result = _make_handle_command_mocks()
-    prompt.last_property_write = datetime.now(timezone.utc)
+def test_mark_connected_joins_and_disconnected_leaves_presence():
+    """The login/logout hooks join and leave the presence registry and stamp last_connected_time."""
+    user, avatar = _make_prompt_user("Wizard")
+    avatar.pk = 5
+    avatar.site_id = 1
+    prompt = MooPrompt(user)
+    prompt._get_avatar = lambda: avatar
     with (
-        patch("moo.shell.prompt.tasks.parse_command") as mock_task,
-        patch("moo.shell.prompt.code.ContextManager") as mock_ctx,
+        patch("moo.shell.prompt.presence.join", return_value="5:session") as mock_join,
+        patch("moo.shell.prompt.presence.leave") as mock_leave,
+        patch("moo.shell.prompt.code.ContextManager"),
     ):
-        mock_task.delay.return_value = parse_result
-        mock_ctx.return_value.__enter__ = MagicMock(return_value=None)
-        mock_ctx.return_value.__exit__ = MagicMock(return_value=False)
-        asyncio.run(prompt.handle_command("look"))
-    avatar.set_property.assert_not_called()
-
+        asyncio.run(prompt._mark_connected())
+        assert prompt.presence_token == "5:session"
+        asyncio.run(prompt._mark_disconnected())
+    mock_join.assert_called_once_with(5, 1)
+    mock_leave.assert_called_once_with("5:session")
+    assert prompt.presence_token is None
+    assert [c.args[0] for c in avatar.set_property.call_args_list] == ["last_connected_time"] * 2
+    assert all(isinstance(c.args[1], datetime) for c in avatar.set_property.call_args_list)
+
+
+def test_handle_command_returns_events_from_task_result():
+    """handle_command() returns the event list carried in parse_command's result, without touching the cache."""
+    prompt, _, parse_result = _make_handle_command_mocks()
+    parse_result.maybe_throw.return_value = (["output"], 0, ["input_prompt"])
 
-def test_handle_command_writes_after_15_seconds():
-    """handle_command() writes last_connected_time again after more than 15 seconds have elapsed."""
-    prompt, avatar, parse_result = _make_handle_command_mocks()
-    prompt.last_property_write = datetime.now(timezone.utc) - timedelta(seconds=16)
     with (
         patch("moo.shell.prompt.tasks.parse_command") as mock_task,
         patch("moo.shell.prompt.code.ContextManager") as mock_ctx,
+        patch("django.core.cache.cache.get") as mock_get,
+        patch("django.core.cache.cache.delete") as mock_delete,
     ):
         mock_task.delay.return_value = parse_result
         mock_ctx.return_value.__enter__ = MagicMock(return_value=None)
         mock_ctx.return_value.__exit__ = MagicMock(return_value=False)
-        asyncio.run(prompt.handle_command("look"))
-    avatar.set_property.assert_called_once()
-    args = avatar.set_property.call_args[0]
-    assert args[0] == "last_connected_time"
-    assert isinstance(args[1], datetime)
+        _to_write, events = asyncio.run(prompt.handle_command("look"))
+    assert events == ["input_prompt"]
+    mock_get.assert_not_called()
+    mock_delete.assert_not_called()
 
 
-def test_handle_command_reads_events_from_cache():
-    """handle_command() returns the event list stashed in the cache under the task id and clears the key."""
+def test_handle_command_accepts_result_without_events():
+    """A two-element ``(output, exit_status)`` result from an older worker means no events."""
     prompt, _, parse_result = _make_handle_command_mocks()
-    parse_result.id = "task-xyz"
+    parse_result.maybe_throw.return_value = (["output"], 0)
 
-    def _fake_cache_get(key):
-        if key == "moo:task_events:task-xyz":
-            return ["input_prompt"]
-        return None
-
-    delete_calls = []
     with (
         patch("moo.shell.prompt.tasks.parse_command") as mock_task,
         patch("moo.shell.prompt.code.ContextManager") as mock_ctx,
-        patch("django.core.cache.cache.get", side_effect=_fake_cache_get),
-        patch("django.core.cache.cache.delete", side_effect=delete_calls.append),
     ):
         mock_task.delay.return_value = parse_result
         mock_ctx.return_value.__enter__ = MagicMock(return_value=None)
         mock_ctx.return_value.__exit__ = MagicMock(return_value=False)
-        _to_write, events = asyncio.run(prompt.handle_command("look"))
-    assert events == ["input_prompt"]
-    assert "moo:task_events:task-xyz" in delete_calls
+        to_write, events = asyncio.run(prompt.handle_command("look"))
+    assert events == []
+    assert "output" in to_write
+
+
+def test_await_task_result_polls_until_ready():
+    """await_task_result() keeps polling the backend until the task has finished."""
+    result = MagicMock()
+    result.ready.side_effect = [False, False, True]
+    result.maybe_throw.return_value = "done"
+    assert asyncio.run(prompt_module.await_task_result(result, timeout=5)) == "done"
+    assert result.ready.call_count == 3
+    result.get.assert_not_called()
+
+
+def test_await_task_result_reads_the_backend_once_the_notice_arrives():
+    """With a session inbox, await_task_result() waits for the done notice instead of polling."""
+
+    async def scenario():
+        inbox = SessionInbox(1, asyncio.get_running_loop())
+        result = MagicMock(id="task-1")
+        result.ready.return_value = False
+        result.maybe_throw.return_value = "done"
+
+        async def finish():
+            await asyncio.sleep(0.2)
+            result.ready.return_value = True
+            inbox.finish("task-1")
+
+        finishing = asyncio.create_task(finish())
+        value = await prompt_module.await_task_result(result, timeout=5, inbox=inbox)
+        await finishing
+        return value, result.ready.call_count
+
+    assert asyncio.run(scenario()) == ("done", 1)
+
+
+def test_await_task_result_times_out():
+    """await_task_result() raises Celery's TimeoutError once the deadline passes."""
+    result = MagicMock()
+    result.ready.return_value = False
+    with pytest.raises(TaskTimeoutError):
+        asyncio.run(prompt_module.await_task_result(result, timeout=0.05))
+
+
+def test_slow_command_does_not_hold_up_other_sessions():
+    """A session waiting on a slow verb leaves every other session free to finish its command."""
+    slow_prompt, _, slow_result = _make_handle_command_mocks()
+    fast_prompt, _, fast_result = _make_handle_command_mocks()
+    slow_prompt._dispatch_command = AsyncMock(return_value=slow_result)
+    fast_prompt._dispatch_command = AsyncMock(return_value=fast_result)
+    slow_result.ready.return_value = False
+    fast_result.maybe_throw.return_value = (["fast output"], 0, [])
+
+    async def scenario():
+        slow = asyncio.create_task(slow_prompt.handle_command("slow"))
+        fast_write, _ = await asyncio.wait_for(fast_prompt.handle_command("fast"), timeout=2)
+        assert not slow.done()
+        slow_result.ready.return_value = True
+        slow_result.maybe_throw.return_value = (["slow output"], 0, [])
+        slow_write, _ = await asyncio.wait_for(slow, timeout=2)
+        return fast_write, slow_write
+
+    fast_write, slow_write = asyncio.run(scenario())
+    assert "fast output" in fast_write
+    assert "slow output" in slow_write
 
 
 # ---------------------------------------------------------------------------
@@ -279,13 +335,14 @@ def test_fire_confunc_skips_missing_verbs():
 
 
 def test_await_tasks_waits_for_each_result():
-    """_await_tasks() calls .get() on every task result."""
+    """_await_tasks() collects every task result without propagating failures."""
     user = MagicMock()
     prompt = MooPrompt(user)
     r1, r2 = MagicMock(), MagicMock()
     asyncio.run(prompt._await_tasks([r1, r2]))
-    r1.get.assert_called_once_with(timeout=10, propagate=False)
-    r2.get.assert_called_once_with(timeout=10, propagate=False)
+    r1.maybe_throw.assert_called_once_with(propagate=False)
+    r2.maybe_throw.assert_called_once_with(propagate=False)
+    r1.get.assert_not_called()
 
 
 def test_await_tasks_swallows_task_failure():
@@ -293,7 +350,7 @@ def test_await_tasks_swallows_task_failure():
     user = MagicMock()
     prompt = MooPrompt(user)
     bad_result = MagicMock()
-    bad_result.get.side_effect = Exception("confunc exploded")
+    bad_result.maybe_throw.side_effect = Exception("confunc exploded")
     asyncio.run(prompt._await_tasks([bad_result]))  # must not raise
 
 
@@ -238,8 +238,7 @@ def test_session_started_unknown_term_skips_iac():
 
 def test_session_started_clears_stale_iac_cache_for_vanilla_term():
     """A vanilla SSH session must wipe any leftover iac cache from a previous MUD-client session."""
-    from django.core.cache import cache
-
+    from moo.core import session_settings
     from moo.shell.iac import IacNegotiator, IacParser
     from moo.shell.prompt import _session_settings
 
@@ -247,7 +246,7 @@ def test_session_started_clears_stale_iac_cache_for_vanilla_term():
     user.pk = 7777
     # Simulate stale state from a prior MUD-client session.
     _session_settings.setdefault(user.pk, {})["iac"] = {"gmcp": True}
-    cache.set(f"moo:session:{user.pk}:iac", {"gmcp": True}, timeout=86400)
+    session_settings.store(user.pk, "iac", {"gmcp": True})
 
     session = MooPromptToolkitSSHSession.__new__(MooPromptToolkitSSHSession)
     session.iac_parser = IacParser()
@@ -263,10 +262,10 @@ def test_session_started_clears_stale_iac_cache_for_vanilla_term():
             session.session_started()
         assert session.iac_enabled is False
         assert "iac" not in _session_settings.get(user.pk, {})
-        assert cache.get(f"moo:session:{user.pk}:iac") is None
+        assert session_settings.get(user.pk, "iac") is None
     finally:
         _session_settings.pop(user.pk, None)
-        cache.delete(f"moo:session:{user.pk}:iac")
+        session_settings.clear(user.pk)
 
 
 def test_session_started_switches_encoding_policy_for_mud_clients():
@@ -41,36 +41,43 @@ def _make_handle_command_mocks():
     prompt = MooPrompt(user)
     prompt._get_avatar = lambda: avatar
     parse_result = MagicMock()
-    parse_result.get.return_value = ([], 0)
+    parse_result.maybe_throw.return_value = ([], 0, [])
     parse_result.id = "test-task-id"
     return prompt, avatar, parse_result
 
 
-def _install_mock_session_buffer(prompt, messages):
+class _ListInbox:
     """
-    Attach a MagicMock ``SimpleBuffer`` to ``prompt`` that yields ``messages``.
+    Stand-in for a hub ``SessionInbox`` that already holds ``bodies``.
 
-    Each item becomes ``content["message"]`` as seen by the dispatch logic;
-    once the iterator is exhausted, ``sb.Empty`` is raised to end the drain.
-    Returns the mock so tests can assert on it if needed.
+    ``on_empty`` is called whenever a wait finds nothing left to deliver.
     """
-    MockEmpty = type("MockEmpty", (Exception,), {})
-    msg_iter = iter(messages)
 
-    def get_nowait():
-        try:
-            body_dict = next(msg_iter)
-            mock_msg = MagicMock()
-            mock_msg.body = json.dumps({"message": body_dict, "caller_id": None})
-            return mock_msg
-        except StopIteration as exc:
-            raise MockEmpty() from exc
+    def __init__(self, bodies, on_empty=None):
+        self._bodies = list(bodies)
+        self._on_empty = on_empty
 
-    mock_sb = MagicMock()
-    mock_sb.Empty = MockEmpty
-    mock_sb.get_nowait.side_effect = get_nowait
-    prompt._session_buffer = mock_sb
-    return mock_sb
+    def drain(self):
+        bodies, self._bodies = self._bodies, []
+        return bodies
+
+    async def wait(self, timeout=None):  # pylint: disable=unused-argument
+        bodies = self.drain()
+        if not bodies and self._on_empty is not None:
+            self._on_empty()
+        return bodies
+
+
+def _install_mock_session_inbox(prompt, messages, on_empty=None):
+    """
+    Attach an inbox to ``prompt`` that delivers ``messages``.
+
+    Each item becomes ``content["message"]`` as seen by the dispatch logic.
+    Returns the inbox so tests can inspect it if needed.
+    """
+    bodies = [json.dumps({"message": body_dict, "caller_id": None}) for body_dict in messages]
+    prompt._session_inbox = _ListInbox(bodies, on_empty)
+    return prompt._session_inbox
 
 
 def _run_process_messages(prompt, messages):
@@ -81,26 +88,16 @@ def _run_process_messages(prompt, messages):
     dispatch logic. After all messages are delivered, the helper sets
     ``prompt.is_exiting = True`` so the loop exits cleanly.
     """
-    _install_mock_session_buffer(prompt, messages)
+
+    def stop():
+        prompt.is_exiting = True
+
+    _install_mock_session_inbox(prompt, messages, on_empty=stop)
     prompt.startup_drain_complete.set()
     prompt.prompt_app_ready.set()
     prompt._chan = None  # avoid MagicMock.is_closing() short-circuit
 
-    # Stop the loop as soon as the last message is drained.
-    real_drain = prompt._drain_session_buffer
-
-    async def stopping_drain():
-        result = await real_drain()
-        if not result[0] and not result[1]:
-            prompt.is_exiting = True
-        return result
-
-    prompt._drain_session_buffer = stopping_drain
-
-    with (
-        patch("asyncio.sleep", new=AsyncMock()),
-        patch("moo.shell.prompt.moojson.loads", side_effect=json.loads),
-    ):
+    with patch("moo.shell.prompt.moojson.loads", side_effect=json.loads):
         asyncio.run(prompt.process_messages())
 
 
@@ -111,7 +108,7 @@ def _run_drain_messages(prompt, messages):
     Each item in ``messages`` becomes ``content["message"]``.
     Returns the list of strings returned by _drain_messages().
     """
-    _install_mock_session_buffer(prompt, messages)
+    _install_mock_session_inbox(prompt, messages)
 
     with patch("moo.shell.prompt.moojson.loads", side_effect=json.loads):
         return asyncio.run(prompt._drain_messages())
@@ -195,7 +192,7 @@ def test_session_setting_message_updates_registry():
 def test_handle_command_emits_global_prefix_and_suffix():
     """handle_command() wraps output with output_global_prefix and output_global_suffix."""
     prompt, _, parse_result = _make_handle_command_mocks()
-    parse_result.get.return_value = (["room output"], 0)
+    parse_result.maybe_throw.return_value = (["room output"], 0, [])
     user_pk = prompt.user.pk
     _session_settings[user_pk] = {
         "output_global_prefix": ">>>",
@@ -223,7 +220,7 @@ def test_handle_command_emits_global_prefix_and_suffix():
 def test_handle_command_global_markers_are_outermost():
     """When PREFIX/SUFFIX and global markers are both set, global markers are outermost."""
     prompt, _, parse_result = _make_handle_command_mocks()
-    parse_result.get.return_value = (["room output"], 0)
+    parse_result.maybe_throw.return_value = (["room output"], 0, [])
     user_pk = prompt.user.pk
     _session_settings[user_pk] = {
         "output_global_prefix": "G_START",
@@ -347,6 +344,8 @@ def test_flush_command_calls_drain_messages():
 
     with (
         patch("moo.shell.prompt.PromptSession") as mock_ps,
+        patch.object(prompt, "_mark_connected", new=AsyncMock()),
+        patch.object(prompt, "_mark_disconnected", new=AsyncMock()),
         patch.object(prompt, "_fire_confunc", new=AsyncMock()),
         patch.object(prompt, "_fire_disfunc", new=AsyncMock()),
         patch.object(prompt, "generate_prompt", new=AsyncMock(return_value=[("", "$ ")])),
@@ -381,7 +380,7 @@ def test_startup_opens_session_buffer_before_firing_confunc():
         order.append("fire")
         return []
 
-    async def fake_drain():
+    async def fake_wait(timeout):  # pylint: disable=unused-argument
         return [], []
 
     async def fake_prompt(*args, **kwargs):  # pylint: disable=unused-argument
@@ -394,7 +393,7 @@ def test_startup_opens_session_buffer_before_firing_confunc():
         patch.object(prompt, "_close_session_buffer", new=AsyncMock()),
         patch.object(prompt, "_fire_confunc", new=fake_fire),
         patch.object(prompt, "_await_tasks", new=AsyncMock()),
-        patch.object(prompt, "_drain_session_buffer", new=fake_drain),
+        patch.object(prompt, "_wait_session_messages", new=fake_wait),
         patch.object(prompt, "_fire_disfunc", new=AsyncMock()),
         patch.object(prompt, "generate_prompt", new=AsyncMock(return_value=[("", "$ ")])),
     ):
@@ -425,7 +424,7 @@ def _run_handle_command(prompt, parse_result, line="look"):
 def test_handle_command_wraps_with_osc133_by_default():
     """handle_command() prepends OSC 133;C and appends ;D;0 when osc133 is on (default)."""
     prompt, _, parse_result = _make_handle_command_mocks()
-    parse_result.get.return_value = (["room output"], 0)
+    parse_result.maybe_throw.return_value = (["room output"], 0, [])
     user_pk = prompt.user.pk
     _session_settings.pop(user_pk, None)
     try:
@@ -442,7 +441,7 @@ def test_handle_command_wraps_with_osc133_by_default():
 def test_handle_command_wraps_with_exit_status_one_on_error():
     """handle_command() emits OSC 133;D;1 when parse_command reports exit_status=1."""
     prompt, _, parse_result = _make_handle_command_mocks()
-    parse_result.get.return_value = (["[bold red]oops[/bold red]"], 1)
+    parse_result.maybe_throw.return_value = (["[bold red]oops[/bold red]"], 1, [])
     user_pk = prompt.user.pk
     _session_settings.pop(user_pk, None)
     try:
@@ -456,7 +455,7 @@ def test_handle_command_wraps_with_exit_status_one_on_error():
 def test_handle_command_skips_osc133_when_disabled():
     """handle_command() omits OSC 133 wrappers when osc133_mode is False."""
     prompt, _, parse_result = _make_handle_command_mocks()
-    parse_result.get.return_value = (["room output"], 0)
+    parse_result.maybe_throw.return_value = (["room output"], 0, [])
     user_pk = prompt.user.pk
     _session_settings[user_pk] = {"osc133_mode": False}
     try: